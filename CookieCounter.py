@@ -0,0 +1,109 @@
+from array import array
+from collections.abc import Mapping
+
+from CookieInterner import CookieInterner
+
+
+
+class CookieCounter(Mapping):
+	'''
+	Class to count the occurences of the cookies of a day compactly, as a read-only mapping of cookie to count (in the order of first occurence) like the dict it replaces.
+	Cookies are interned to dense ids by a CookieInterner, and the count of each id is stored in an array("I") indexed by the id.
+	'''
+
+	def __init__(self):
+		'''
+		Class constructor to create an empty counter
+		'''
+		self.interner = CookieInterner()
+		# Variable to store the number of occurences of each cookie, indexed by its id
+		self.counts = array("I")
+
+
+	def add(self, cookie, count=1):
+		'''
+		Adds occurences of a cookie
+		Input:
+			cookie::str -- cookie string (ASCII)
+			count::int (default=1) -- number of occurences to add
+		Output: NA
+		'''
+		cookie_id = self.interner.lookup(cookie.encode(), insert=True)
+		if cookie_id == len(self.counts):
+			self.counts.append(count)
+		else:
+			self.counts[cookie_id] += count
+		return
+
+
+	def __setitem__(self, cookie, count):
+		'''
+		Sets the number of occurences of a cookie, so that counters can be merged like dicts
+		Input:
+			cookie::str -- cookie string (ASCII)
+			count::int -- number of occurences
+		Output: NA
+		'''
+		self.add(cookie, count - self.get(cookie, 0))
+		return
+
+
+	def get(self, cookie, default=None):
+		'''
+		Returns the number of occurences of a cookie
+		Input:
+			cookie::str -- cookie string
+			default::int (default=None) -- value returned if the cookie has not occured
+		Output: number of occurences of the cookie (int), default if it has not occured
+		'''
+		cookie_id = self.interner.lookup(cookie.encode())
+		return default if cookie_id is None else self.counts[cookie_id]
+
+
+	def __getitem__(self, cookie):
+		'''
+		Returns the number of occurences of a cookie
+		Input:
+			cookie::str -- cookie string
+		Output: number of occurences of the cookie (int), KeyError is raised if it has not occured
+		'''
+		count = self.get(cookie)
+		if count is None:
+			raise KeyError(cookie)
+		return count
+
+
+	def __iter__(self):
+		'''
+		Iterates over the cookies in the order of first occurence
+		Input: NA
+		Output: generator of cookie strings
+		'''
+		return (self.interner.get_cookie(cookie_id) for cookie_id in range(len(self.counts)))
+
+
+	def __len__(self):
+		'''
+		Returns the number of distinct cookies counted
+		Input: NA
+		Output: number of distinct cookies (int)
+		'''
+		return len(self.counts)
+
+
+	def values(self):
+		'''
+		Returns the numbers of occurences of the cookies in the order of first occurence, without decoding the cookies
+		Input: NA
+		Output: array("I") of numbers of occurences
+		'''
+		return self.counts
+
+
+	def items(self):
+		'''
+		Returns the (cookie, number of occurences) pairs in the order of first occurence
+		Input: NA
+		Output: generator of (cookie, count) tuples
+		'''
+		return zip(self, self.counts)
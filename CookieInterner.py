@@ -0,0 +1,123 @@
+from array import array
+import zlib
+
+
+
+class CookieInterner():
+	'''
+	Class to intern cookies, mapping each distinct cookie to a dense integer id (in the order of first occurence) without a Python object per cookie.
+	The cookies are stored back to back in a single bytearray and located with an open addressing hash table of ids in an array, so that each cookie costs its own bytes plus a few bytes of table and offset, instead of a str object and a dict entry.
+	While all the cookies have the same length, their offsets are implied by their ids and not stored.
+	'''
+
+	# Value of an empty slot of the hash table
+	empty_slot = 0xFFFFFFFF
+
+	# Initial number of slots of the hash table (a power of 2)
+	initial_capacity = 8
+
+	def __init__(self):
+		'''
+		Class constructor to create an empty interner
+		'''
+		# Variable to store the bytes of the cookies in the order of their ids
+		self.cookies = bytearray()
+		# Variable to store the common length of the cookies, until a cookie of a different length is interned
+		self.cookie_length = None
+		# Variable to store the end offset of each cookie in self.cookies, None while all the cookies have the same length
+		self.cookie_ends = None
+		# Open addressing hash table (linear probing) of cookie ids, at most 2/3 full
+		self.slots = array("I", [self.empty_slot]) * self.initial_capacity
+		self.count = 0
+
+
+	def __len__(self):
+		'''
+		Returns the number of distinct cookies interned
+		Input: NA
+		Output: number of distinct cookies (int)
+		'''
+		return self.count
+
+
+	def get_cookie_bytes(self, cookie_id):
+		'''
+		Returns the bytes of the cookie of an id
+		Input:
+			cookie_id::int -- id of the cookie
+		Output:
+			cookie::bytes -- bytes of the cookie
+		'''
+		if self.cookie_ends is None:
+			return bytes(self.cookies[cookie_id * self.cookie_length:(cookie_id + 1) * self.cookie_length])
+		return bytes(self.cookies[self.cookie_ends[cookie_id - 1] if cookie_id > 0 else 0:self.cookie_ends[cookie_id]])
+
+
+	def get_cookie(self, cookie_id):
+		'''
+		Returns the cookie of an id
+		Input:
+			cookie_id::int -- id of the cookie
+		Output:
+			cookie::str -- cookie string
+		'''
+		return self.get_cookie_bytes(cookie_id).decode()
+
+
+	def lookup(self, cookie, insert=False):
+		'''
+		Returns the id of a cookie, interning it first if it is new and insert is True
+		Input:
+			cookie::bytes -- bytes of the cookie
+			insert::bool (default=False) -- whether to intern the cookie if it is new
+		Output:
+			cookie_id::int -- id of the cookie, None if the cookie is new and not inserted
+		'''
+		slots = self.slots
+		mask = len(slots) - 1
+		slot = zlib.crc32(cookie) & mask
+		cookie_length = self.cookie_length
+		while True:
+			cookie_id = slots[slot]
+			if cookie_id == self.empty_slot:
+				break
+			if self.cookie_ends is None:
+				if len(cookie) == cookie_length and self.cookies[cookie_id * cookie_length:(cookie_id + 1) * cookie_length] == cookie:
+					return cookie_id
+			elif self.get_cookie_bytes(cookie_id) == cookie:
+				return cookie_id
+			slot = (slot + 1) & mask
+		if not(insert):
+			return None
+
+		cookie_id = self.count
+		if self.cookie_length is None:
+			self.cookie_length = len(cookie)
+		elif self.cookie_ends is None and len(cookie) != self.cookie_length:
+			# Offsets are stored from the first cookie of a different length on
+			self.cookie_ends = array("Q", range(self.cookie_length, (self.count + 1) * self.cookie_length, self.cookie_length))
+		self.cookies += cookie
+		if self.cookie_ends is not None:
+			self.cookie_ends.append(len(self.cookies))
+		slots[slot] = cookie_id
+		self.count += 1
+		if self.count * 3 >= len(slots) * 2:
+			self._resize()
+		return cookie_id
+
+
+	def _resize(self):
+		'''
+		Doubles the number of slots of the hash table and inserts all the ids again
+		Input: NA
+		Output: NA
+		'''
+		slots = array("I", [self.empty_slot]) * (len(self.slots) * 2)
+		mask = len(slots) - 1
+		for cookie_id in range(self.count):
+			slot = zlib.crc32(self.get_cookie_bytes(cookie_id)) & mask
+			while slots[slot] != self.empty_slot:
+				slot = (slot + 1) & mask
+			slots[slot] = cookie_id
+		self.slots = slots
+		return
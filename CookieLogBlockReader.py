@@ -0,0 +1,123 @@
+import queue
+import threading
+
+from CustomError import CustomError
+
+
+
+class CookieLogBlockReader():
+	'''
+	Class to read a byte range of a cookie log file in blocks of whole lines, with a background thread reading the next block while the previous one is parsed (double buffering).
+	The thread reads with readinto() into buffer_count preallocated buffers, which are handed to the reader in turn and handed back to the thread once parsed, so that waiting for the disk (e.g. a cold page cache or a network filesystem) overlaps with parsing. Reads release the GIL. The partial line at the end of a block is moved to the start of the next buffer, so that every block but the last one ends with a line terminator.
+	'''
+
+	# Number of preallocated buffers, i.e. one being parsed and one being read
+	buffer_count = 2
+
+	# Number of seconds after which the thread checks whether the reader was closed while waiting for a buffer
+	wait_timeout = 0.1
+
+	def __init__(self, filepath, start, end, block_size):
+		'''
+		Class constructor to start reading a byte range of a cookie log file in a background thread
+		Input:
+			filepath::str -- path of the cookie log file
+			start::int -- byte offset of a line start
+			end::int -- byte offset of a line start (or the end of file) at which to stop
+			block_size::int -- number of bytes read at once
+		'''
+		self.filepath = filepath
+		self.start = start
+		self.end = end
+		self.block_size = block_size
+		self.free_buffers = queue.Queue()
+		for _ in range(self.buffer_count):
+			self.free_buffers.put(bytearray(block_size))
+		# Queue of the (buffer, length of its block) read, an error raised by the reads, or None at the end of the byte range
+		self.blocks = queue.Queue()
+		self.stopped = threading.Event()
+		self.thread = threading.Thread(target=self._read, daemon=True)
+		self.thread.start()
+
+
+	def _get_free_buffer(self):
+		'''
+		Waits for a buffer handed back by the reader, unless the reader is closed
+		Input: NA
+		Output:
+			buffer::bytearray -- free buffer, None if the reader was closed
+		'''
+		while not(self.stopped.is_set()):
+			try:
+				return self.free_buffers.get(timeout=self.wait_timeout)
+			except queue.Empty:
+				continue
+		return None
+
+
+	def _read(self):
+		'''
+		Reads the byte range block by block into the free buffers, in the background thread. An error is passed to the reader through the queue
+		Input: NA
+		Output: NA
+		'''
+		try:
+			with open(self.filepath, "rb", buffering=0) as file_pointer:
+				file_pointer.seek(self.start)
+				remaining = self.end - self.start
+				partial_line = b""
+				while remaining > 0:
+					buffer = self._get_free_buffer()
+					if buffer is None:
+						return
+					if len(buffer) < len(partial_line) + self.block_size:
+						# A line longer than a block, the buffer is grown to hold it
+						buffer = bytearray(len(partial_line) + self.block_size)
+					buffer[:len(partial_line)] = partial_line
+					with memoryview(buffer) as view:
+						size = file_pointer.readinto(view[len(partial_line):len(partial_line) + min(self.block_size, remaining)])
+					if size == 0:
+						self.free_buffers.put(buffer)
+						break
+					remaining -= size
+					length = len(partial_line) + size
+					# Blocks end at the last line terminator, the partial line after it is moved to the next buffer. A "\r" at the end may be the first half of a "\r\n", so it does not end a block
+					block_length = max(buffer.rfind(b"\n", 0, length), buffer.rfind(b"\r", 0, length - 1)) + 1
+					partial_line = bytes(buffer[block_length:length])
+					self.blocks.put((buffer, block_length))
+				if len(partial_line) > 0:
+					self.blocks.put((bytearray(partial_line), len(partial_line)))
+		except OSError as e:
+			self.blocks.put(e)
+			return
+		self.blocks.put(None)
+		return
+
+
+	def __iter__(self):
+		'''
+		Iterates over the blocks of the byte range. A block is a view of a buffer which is handed back to the thread when the next block is requested, so it must be parsed (or copied) before then
+		Input: NA
+		Output:
+			block::memoryview -- generator yielding blocks of about block_size bytes, each ending with a line terminator except possibly the last one
+		'''
+		while True:
+			item = self.blocks.get()
+			if item is None:
+				return
+			if isinstance(item, BaseException):
+				raise CustomError(f"ERROR: The cookie log file {self.filepath} can not be read!")
+			buffer, block_length = item
+			if block_length > 0:
+				yield memoryview(buffer)[:block_length]
+			self.free_buffers.put(buffer)
+
+
+	def close(self):
+		'''
+		Stops the background thread
+		Input: NA
+		Output: NA
+		'''
+		self.stopped.set()
+		return
@@ -0,0 +1,186 @@
+from array import array
+from collections import Counter
+from datetime import date
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+
+
+class CookieLogCache():
+	'''
+	Class to convert a cookie log file into a compact columnar binary cache and to count cookies from it without parsing any text.
+	The cache file consists of a fixed size header followed by the day table, the cookie dictionary offsets, the cookie id column and the cookie dictionary:
+		- day table: (date ordinal, first row, number of rows) of each day, the rows being grouped by day (in the order of the logfile within a day)
+		- cookie id column: uint32 id of the cookie of each row, ids being assigned in the order of first occurence in the logfile
+		- cookie dictionary: cookies (ASCII) concatenated in the order of their ids, with the offset of each cookie
+	Columns are stored in native byte order and memory-mapped when the cache is loaded, so counting the cookies of a day is a single pass over a slice of the cookie id column.
+	'''
+
+	# Magic bytes and version of the cache file format
+	magic = b"CKC\0"
+	version = 1
+
+	# Header: magic, version, byte order, number of days, number of cookies, number of rows, number of non-blank lines, size, mtime (in nanoseconds) and digest of the logfile
+	header_format = "=4sHcxIIQQQQ32s"
+	header_size = struct.calcsize(header_format)
+
+	# Number of bytes at the beginning and at the end of the logfile hashed into the digest
+	sample_size = 1 << 16
+
+	def __init__(self, cache_path):
+		'''
+		Class constructor to set the cache file path
+		Input:
+			cache_path::str -- path of the cache file
+		'''
+		self.cache_path = cache_path
+		# Variable to store the number of non-blank lines of the converted logfile (excluding the header)
+		self.line_count = 0
+		# Variable to store the (first row, number of rows) of each day
+		self.days = {}
+		# Memory map of the cache file and views of its columns, set when the cache is loaded
+		self.mapped_file = None
+		self.cookie_offsets = None
+		self.cookie_ids = None
+		self.cookies = None
+
+
+	def get_signature(self, filepath):
+		'''
+		Computes the signature of a logfile, used to check that the cache is up to date. Only the beginning and the end of the logfile are hashed so that it is cheap to compute
+		Input:
+			filepath::str -- path of the logfile
+		Output:
+			signature::tuple -- size, mtime (in nanoseconds) and SHA-256 digest of the sampled logfile
+		'''
+		stat = os.stat(filepath)
+		digest = hashlib.sha256()
+		with open(filepath, "rb") as file_pointer:
+			digest.update(file_pointer.read(self.sample_size))
+			file_pointer.seek(max(0, stat.st_size - self.sample_size))
+			digest.update(file_pointer.read(self.sample_size))
+		return (stat.st_size, stat.st_mtime_ns, digest.digest())
+
+
+	def _get_padding(self, offset):
+		'''
+		Returns the number of bytes to add after a section so that the next one is 8-byte aligned
+		Input:
+			offset::int -- offset of the end of the section
+		Output: number of padding bytes (int)
+		'''
+		return -offset % 8
+
+
+	def write(self, signature, line_count, day_ids, cookies):
+		'''
+		Writes the cache file. The file is written to a temporary file first and then moved in place, so that a concurrent reader never sees a partial cache
+		Input:
+			signature::tuple -- signature of the converted logfile (see get_signature())
+			line_count::int -- number of non-blank lines of the converted logfile (excluding the header)
+			day_ids::dict -- date to array("I") of the cookie ids of the rows of that date, in the order of the logfile
+			cookies::list -- cookies in the order of their ids
+		Output: NA
+		'''
+		day_table = array("Q")
+		row_count = 0
+		for day, ids in day_ids.items():
+			day_table.extend([day.toordinal(), row_count, len(ids)])
+			row_count += len(ids)
+
+		cookie_bytes = [cookie.encode() for cookie in cookies]
+		cookie_offsets = array("Q", [0])
+		for cookie in cookie_bytes:
+			cookie_offsets.append(cookie_offsets[-1] + len(cookie))
+
+		header = struct.pack(self.header_format, self.magic, self.version, sys.byteorder[0].encode(), len(day_ids), len(cookies), row_count, line_count, *signature)
+		temporary_path = f"{self.cache_path}.{os.getpid()}.tmp"
+		with open(temporary_path, "wb") as file_pointer:
+			file_pointer.write(header + bytes(self._get_padding(len(header))))
+			day_table.tofile(file_pointer)
+			cookie_offsets.tofile(file_pointer)
+			for ids in day_ids.values():
+				ids.tofile(file_pointer)
+			file_pointer.write(bytes(self._get_padding(file_pointer.tell())))
+			file_pointer.writelines(cookie_bytes)
+		os.replace(temporary_path, self.cache_path)
+		return
+
+
+	def load(self, filepath):
+		'''
+		Memory-maps the cache file if it exists and is up to date with the logfile
+		Input:
+			filepath::str -- path of the logfile
+		Output:
+			bool -- True if the cache is loaded, False if it has to be (re)converted
+		'''
+		self.close()
+		try:
+			with open(self.cache_path, "rb") as file_pointer:
+				header = file_pointer.read(self.header_size)
+				magic, version, byteorder, day_count, cookie_count, row_count, line_count, *signature = struct.unpack(self.header_format, header)
+				if (magic, version, byteorder) != (self.magic, self.version, sys.byteorder[0].encode()) or tuple(signature) != self.get_signature(filepath):
+					return False
+				mapped_file = mmap.mmap(file_pointer.fileno(), 0, access=mmap.ACCESS_READ)
+		except (OSError, struct.error, ValueError):
+			return False
+
+		self.mapped_file = mapped_file
+		view = memoryview(mapped_file)
+		offset = self.header_size + self._get_padding(self.header_size)
+		day_table = view[offset:offset + 24 * day_count].cast("Q")
+		offset += 24 * day_count
+		self.cookie_offsets = view[offset:offset + 8 * (cookie_count + 1)].cast("Q")
+		offset += 8 * (cookie_count + 1)
+		self.cookie_ids = view[offset:offset + 4 * row_count].cast("I")
+		offset += 4 * row_count + self._get_padding(4 * row_count)
+		self.cookies = view[offset:]
+
+		self.line_count = line_count
+		self.days = {date.fromordinal(day_table[3 * index]): (day_table[3 * index + 1], day_table[3 * index + 2]) for index in range(day_count)}
+		day_table.release()
+		view.release()
+		return True
+
+
+	def close(self):
+		'''
+		Releases the views of the columns and unmaps the cache file
+		Input: NA
+		Output: NA
+		'''
+		if self.mapped_file is not None:
+			for column in [self.cookie_offsets, self.cookie_ids, self.cookies]:
+				column.release()
+			self.mapped_file.close()
+			self.mapped_file = self.cookie_offsets = self.cookie_ids = self.cookies = None
+		return
+
+
+	def get_cookie(self, cookie_id):
+		'''
+		Decodes the cookie of an id from the cookie dictionary
+		Input:
+			cookie_id::int -- id of the cookie
+		Output:
+			cookie::str -- cookie string
+		'''
+		return self.cookies[self.cookie_offsets[cookie_id]:self.cookie_offsets[cookie_id + 1]].tobytes().decode()
+
+
+	def get_day_counts(self, day):
+		'''
+		Counts the cookies of a day with a single pass over its slice of the cookie id column. Only the distinct cookies of the day are decoded
+		Input:
+			day::datetime.date -- date to count the cookies of
+		Output:
+			cookie_counts::dict -- cookie to number of occurences map of the date (in the order of first occurence), empty if the date is not in the logfile
+		'''
+		if day not in self.days:
+			return {}
+		first_row, row_count = self.days[day]
+		return {self.get_cookie(cookie_id): count for cookie_id, count in Counter(self.cookie_ids[first_row:first_row + row_count]).items()}
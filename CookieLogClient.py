@@ -0,0 +1,118 @@
+import json
+import socket
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from InputValidator import InputValidator
+from CustomError import CustomError
+
+
+
+class CookieLogClient():
+	'''
+	Thin client to query a CookieLogServer over a Unix socket or HTTP on localhost, without loading or parsing the cookie log file itself.
+	'''
+
+	# Host of the HTTP server
+	http_host = "127.0.0.1"
+
+	# Number of seconds to wait for the server
+	timeout = 60
+
+	def __init__(self, address):
+		'''
+		Class constructor to validate the server address
+		Input:
+			address::str -- address of the server, "unix:PATH" or "http:PORT"
+		'''
+		validation_flag, error_message = InputValidator().validate_address(address)
+		if not(validation_flag):
+			raise CustomError(f"Class::CookieLogClient() creation failed: {error_message}")
+		self.scheme, _, self.location = address.strip().partition(":")
+
+
+	def _get_query(self, args):
+		'''
+		Builds the query sent to the server from the command line arguments. Dates of the dates file are read by the client, as the file may not be accessible to the server
+		Input:
+			args::namespace -- command line arguments (see CookieLogProcessor.__init__())
+		Output:
+			query::dict -- command line options of the query (see CookieLogServer.answer())
+		'''
+		dates = list(args.date) if isinstance(args.date, list) else ([] if args.date is None else [args.date])
+		dates_file = getattr(args, "dates_file", None)
+		if dates_file is not None:
+			try:
+				with open(dates_file, "r") as file_pointer:
+					dates.extend(line.strip() for line in file_pointer if len(line.strip()) > 0)
+			except OSError:
+				raise CustomError(f"ERROR: The dates file {dates_file} does not exist!")
+		return {"logfilename": args.logfilename, "date": dates, "date_range": getattr(args, "date_range", None), "top": getattr(args, "top", None)}
+
+
+	def _send_unix(self, query):
+		'''
+		Sends a query as a line of JSON over the Unix socket and reads the response line
+		Input:
+			query::dict -- command line options of the query
+		Output:
+			response::dict -- {"lines": output lines} or {"error": error message}
+		'''
+		with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+			connection.settimeout(self.timeout)
+			connection.connect(self.location)
+			connection.sendall((json.dumps(query) + "\n").encode())
+			with connection.makefile("rb") as file_pointer:
+				return json.loads(file_pointer.readline())
+
+
+	def _send_http(self, query):
+		'''
+		Sends a query as an HTTP GET request and reads the response
+		Input:
+			query::dict -- command line options of the query
+		Output:
+			response::dict -- {"lines": output lines} or {"error": error message}
+		'''
+		parameters = [("logfilename", query["logfilename"])] + [("date", date) for date in query["date"]]
+		if query["date_range"] is not None:
+			parameters.append(("date_range", ",".join(query["date_range"])))
+		if query["top"] is not None:
+			parameters.append(("top", query["top"]))
+		url = f"http://{self.http_host}:{self.location}/?{urllib.parse.urlencode(parameters)}"
+		try:
+			with urllib.request.urlopen(url, timeout=self.timeout) as response:
+				return {"lines": response.read().decode().splitlines()}
+		except urllib.error.HTTPError as e:
+			return {"error": e.read().decode().strip()}
+
+
+	def query(self, args):
+		'''
+		Queries the server for the most active cookies
+		Input:
+			args::namespace -- command line arguments (see CookieLogProcessor.__init__())
+		Output:
+			lines::list -- output lines, as printed by CookieLogProcessor.print_most_active_cookie()
+		'''
+		query = self._get_query(args)
+		try:
+			response = self._send_unix(query) if self.scheme == "unix" else self._send_http(query)
+		except (OSError, ValueError):
+			raise CustomError(f"ERROR: Could not query the server at {self.scheme}:{self.location}!")
+		if "error" in response:
+			raise CustomError(response["error"])
+		return response["lines"]
+
+
+	def print_most_active_cookie(self, args):
+		'''
+		Prints the most active cookie values answered by the server, in the same format as CookieLogProcessor.print_most_active_cookie()
+		Input:
+			args::namespace -- command line arguments (see CookieLogProcessor.__init__())
+		Output: NA
+		'''
+		for line in self.query(args):
+			print(line)
+		return
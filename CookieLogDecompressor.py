@@ -0,0 +1,144 @@
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+import zlib
+
+from CustomError import CustomError
+
+
+
+class CookieLogDecompressor(io.RawIOBase):
+	'''
+	Class to read a compressed (gzip, bz2 or xz) cookie log file as a raw binary stream, decompressed by a background thread.
+	The thread decompresses blocks ahead of the reader into a bounded queue. The decompressors release the GIL while decompressing, so decompression overlaps with parsing the lines of the previous blocks, while at most queue_size blocks are held in memory.
+	Wrapped in io.TextIOWrapper(io.BufferedReader()), it reads lines exactly as open() does on the decompressed file.
+	'''
+
+	# Compressed file suffix to function opening the file
+	openers = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+	# Number of decompressed bytes of each block
+	block_size = 1 << 20
+
+	# Number of decompressed blocks the thread may be ahead of the reader
+	queue_size = 4
+
+	# Number of seconds after which the thread checks whether the reader was closed while the queue is full
+	put_timeout = 0.1
+
+	def __init__(self, filepath):
+		'''
+		Class constructor to start decompressing a compressed cookie log file in a background thread
+		Input:
+			filepath::str -- path of the compressed cookie log file
+		'''
+		super().__init__()
+		self.filepath = filepath
+		self.opener = self.openers[self.get_compression(filepath)]
+		self.blocks = queue.Queue(self.queue_size)
+		self.stopped = threading.Event()
+		# Variable to store the block being read and the position of the next byte to read in it
+		self.block = memoryview(b"")
+		self.position = 0
+		self.finished = False
+		self.thread = threading.Thread(target=self._decompress, daemon=True)
+		self.thread.start()
+
+
+	@classmethod
+	def get_compression(cls, filepath):
+		'''
+		Returns the compression of a file from its suffix
+		Input:
+			filepath::str -- path of the file
+		Output: compressed file suffix (one of openers), None if the file is not compressed (str)
+		'''
+		for suffix in cls.openers:
+			if str(filepath).endswith(suffix):
+				return suffix
+		return None
+
+
+	def _put(self, item):
+		'''
+		Puts an item in the queue of blocks, waiting while it is full unless the reader is closed
+		Input:
+			item::bytes or BaseException or None -- decompressed block, error raised by the decompression, or None at the end of the file
+		Output:
+			bool -- False if the reader was closed
+		'''
+		while not(self.stopped.is_set()):
+			try:
+				self.blocks.put(item, timeout=self.put_timeout)
+				return True
+			except queue.Full:
+				continue
+		return False
+
+
+	def _decompress(self):
+		'''
+		Decompresses the file block by block into the queue, in the background thread. An error is passed to the reader through the queue
+		Input: NA
+		Output: NA
+		'''
+		try:
+			with self.opener(self.filepath, "rb") as file_pointer:
+				while True:
+					block = file_pointer.read(self.block_size)
+					if len(block) == 0:
+						break
+					if not(self._put(block)):
+						return
+		except (OSError, EOFError, lzma.LZMAError, zlib.error) as e:
+			self._put(e)
+			return
+		self._put(None)
+		return
+
+
+	def readable(self):
+		'''
+		Returns whether the stream can be read
+		Input: NA
+		Output: bool -- True
+		'''
+		return True
+
+
+	def readinto(self, buffer):
+		'''
+		Reads decompressed bytes into a buffer, waiting for the next block if needed
+		Input:
+			buffer::bytearray or memoryview -- buffer to fill
+		Output: number of bytes read, 0 at the end of the file (int)
+		'''
+		while self.position >= len(self.block):
+			if self.finished:
+				return 0
+			item = self.blocks.get()
+			if item is None:
+				self.finished = True
+				return 0
+			if isinstance(item, BaseException):
+				self.finished = True
+				raise CustomError(f"ERROR: The cookie log file {self.filepath} can not be decompressed!")
+			self.block, self.position = memoryview(item), 0
+		size = min(len(buffer), len(self.block) - self.position)
+		buffer[:size] = self.block[self.position:self.position + size]
+		self.position += size
+		return size
+
+
+	def close(self):
+		'''
+		Stops the background thread and closes the stream
+		Input: NA
+		Output: NA
+		'''
+		self.stopped.set()
+		super().close()
+		return
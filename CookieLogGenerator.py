@@ -0,0 +1,159 @@
+from datetime import date, datetime, time, timedelta, timezone
+import itertools
+import random
+
+
+
+class CookieLogGenerator():
+	'''
+	Class to generate deterministic synthetic cookie log files for benchmarks, from a seed.
+	Lines are sorted by timestamp (newest first) like the real cookie logs, spread evenly over a number of consecutive days in UTC. Cookies are drawn from a fixed number of distinct cookies with a Zipf distribution (the cookie of rank k is drawn with a probability proportional to 1 / k^zipf_skew), each timestamp is written in an UTC offset drawn from a list of offsets (so that the instants stay sorted while the days in the offsets of the timestamps may not be), and a share of the lines are malformed in one of the ways the processor skips.
+	'''
+
+	# Characters and length of the generated cookies
+	cookie_alphabet = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+	cookie_length = 16
+
+	# Multiplier mapping ranks to cookies: close to 62^16 divided by the golden ratio, coprime with 62^16
+	cookie_multiplier = 29463164580155441848648728577
+
+	# Ways a line can be malformed
+	malformed_kinds = ["missing_comma", "bad_cookie", "bad_timestamp", "blank"]
+
+	# Number of cookies drawn at once
+	batch_size = 10000
+
+	# Number of bytes of a valid line, used to derive the number of lines from a file size
+	line_size = 43
+
+	def __init__(self, days=7, cookie_count=100000, zipf_skew=1.1, timezones=("+00:00",), malformed_ratio=0.0, end_date=date(2018, 12, 9), seed=0):
+		'''
+		Class constructor to set the parameters of the generated cookie logs
+		Input:
+			days::int (default=7) -- number of consecutive days of the lines
+			cookie_count::int (default=100000) -- number of distinct cookies (cardinality)
+			zipf_skew::float (default=1.1) -- exponent of the Zipf distribution of the cookies, 0 for a uniform distribution
+			timezones::list (default=("+00:00",)) -- UTC offsets (+HH:MM, -HH:MM or Z) drawn uniformly for each timestamp (repeat an offset to draw it more often)
+			malformed_ratio::float (default=0.0) -- share of malformed lines
+			end_date::datetime.date (default=2018-12-09) -- last (newest) day of the lines
+			seed::int (default=0) -- seed of the random number generator
+		'''
+		self.days = days
+		self.cookie_count = cookie_count
+		self.zipf_skew = zipf_skew
+		self.timezones = list(timezones)
+		# Variable to store the datetime.timezone of each UTC offset
+		self.tzinfos = {offset: self._get_tzinfo(offset) for offset in self.timezones}
+		self.malformed_ratio = malformed_ratio
+		self.end_date = end_date
+		self.seed = seed
+		# Cumulative weights of the Zipf distribution of the cookie ranks
+		self.cumulative_weights = list(itertools.accumulate(1 / rank ** zipf_skew for rank in range(1, cookie_count + 1)))
+		# Variable to memoize the cookies of the most frequent ranks
+		self.cookies = {}
+
+
+	def _get_tzinfo(self, offset):
+		'''
+		Returns the timezone of an UTC offset
+		Input:
+			offset::str -- UTC offset, +HH:MM, -HH:MM or Z
+		Output:
+			tzinfo::datetime.timezone -- timezone of the offset
+		'''
+		if offset == "Z":
+			return timezone.utc
+		return timezone((-1 if offset[0] == "-" else 1) * timedelta(hours=int(offset[1:3]), minutes=int(offset[4:6])))
+
+
+	def get_cookie(self, rank):
+		'''
+		Returns the cookie of a rank. Ranks are mapped to distinct cookies by a multiplication modulo the number of possible cookies (by cookie_multiplier, coprime with it, hence a bijection), so that the cookies look random
+		Input:
+			rank::int -- rank of the cookie (0 for the most frequent one)
+		Output:
+			cookie::str -- cookie string
+		'''
+		cookie = self.cookies.get(rank)
+		if cookie is not None:
+			return cookie
+		value = ((rank + 1) * self.cookie_multiplier + self.seed) % len(self.cookie_alphabet) ** self.cookie_length
+		characters = []
+		for _ in range(self.cookie_length):
+			value, digit = divmod(value, len(self.cookie_alphabet))
+			characters.append(self.cookie_alphabet[digit])
+		cookie = "".join(characters)
+		if len(self.cookies) < self.batch_size:
+			self.cookies[rank] = cookie
+		return cookie
+
+
+	def _get_malformed_line(self, generator, cookie, timestamp):
+		'''
+		Returns a malformed line, in one of the malformed_kinds
+		Input:
+			generator::random.Random -- random number generator
+			cookie::str -- cookie of the line
+			timestamp::str -- timestamp of the line
+		Output:
+			line::str -- malformed line (without newline)
+		'''
+		kind = generator.choice(self.malformed_kinds)
+		if kind == "missing_comma":
+			return f"{cookie} {timestamp}"
+		if kind == "bad_cookie":
+			return f"{cookie[:8]} {cookie[8:]},{timestamp}"
+		if kind == "bad_timestamp":
+			return f"{cookie},{timestamp[:5]}13{timestamp[7:]}"
+		return ""
+
+
+	def iter_lines(self, line_count):
+		'''
+		Generates the lines of a cookie log file, newest first
+		Input:
+			line_count::int -- number of lines (excluding the header)
+		Output:
+			line::str -- generator yielding the header and each line (with its newline)
+		'''
+		generator = random.Random(self.seed)
+		yield "cookie,timestamp\n"
+		# Last (newest) instant of the lines, in UTC
+		end_instant = datetime.combine(self.end_date, time(23, 59, 59), timezone.utc)
+		ranks = []
+		for index in range(line_count):
+			if len(ranks) == 0:
+				ranks = generator.choices(range(self.cookie_count), cum_weights=self.cumulative_weights, k=self.batch_size)
+			cookie = self.get_cookie(ranks.pop())
+			# Lines are spread evenly over the days, newest first, with decreasing instants written in the offset of the line
+			offset = generator.choice(self.timezones)
+			instant = end_instant - timedelta(seconds=index * self.days * 86400 // line_count)
+			timestamp = instant.astimezone(self.tzinfos[offset]).isoformat()
+			if offset == "Z":
+				timestamp = timestamp[:-6] + "Z"
+			if self.malformed_ratio > 0 and generator.random() < self.malformed_ratio:
+				yield self._get_malformed_line(generator, cookie, timestamp) + "\n"
+			else:
+				yield f"{cookie},{timestamp}\n"
+
+
+	def write(self, filepath, line_count=None, size=None):
+		'''
+		Writes a cookie log file of a number of lines, or of about a size
+		Input:
+			filepath::str -- path of the cookie log file
+			line_count::int (default=None) -- number of lines (excluding the header)
+			size::int (default=None) -- approximate number of bytes, used if line_count is None
+		Output:
+			line_count::int -- number of lines written (excluding the header)
+		'''
+		if line_count is None:
+			line_count = max(1, size // self.line_size)
+		with open(filepath, "w", buffering=1 << 20) as file_pointer:
+			lines = self.iter_lines(line_count)
+			while True:
+				batch = list(itertools.islice(lines, self.batch_size))
+				if len(batch) == 0:
+					break
+				file_pointer.writelines(batch)
+		return line_count
@@ -0,0 +1,169 @@
+from datetime import datetime
+import hashlib
+import json
+import os
+
+
+
+class CookieLogIndex():
+	'''
+	Class to maintain a persistent sidecar index of a cookie log file, holding the byte range and cookie counts of each day of the logfile.
+	The index file consists of a header line (JSON) followed by one line (JSON) of cookie counts per day, so that the counts of a day are read by seeking to its line without loading the whole index.
+	The index remembers the byte offset up to which the logfile is indexed, so that lines appended to the logfile afterwards can be added to the index without re-reading the logfile.
+	'''
+
+	# Version of the index file format
+	version = 4
+
+	# Number of bytes at the beginning of the logfile and before the indexed offset hashed into the prefix digest
+	sample_size = 1 << 16
+
+	def __init__(self, index_path):
+		'''
+		Class constructor to set the index file path
+		Input:
+			index_path::str -- path of the index file
+		'''
+		self.index_path = index_path
+		# Variable to store the size, mtime (in nanoseconds), indexed offset and prefix digest of the logfile when it was indexed. Only the complete lines before the indexed offset are indexed
+		self.signature = None
+		# Variable to store the number of non-blank lines of the indexed logfile (excluding the header)
+		self.line_count = 0
+		# Variable to store the byte range of the lines and the position of the cookie counts record in the index file of each day
+		self.days = {}
+		# Variable to store the size of the header line, after which the cookie counts records begin
+		self.header_size = 0
+
+
+	def get_prefix_digest(self, filepath, offset):
+		'''
+		Computes the digest of the first offset bytes of a logfile, used to verify that the indexed part of the logfile is unchanged when lines are appended to it. Only the length of the prefix, its beginning and the bytes just before the offset are hashed so that it is cheap to compute whatever the size of the logfile. A logfile changed without growing is detected by its size and mtime instead (see load())
+		Input:
+			filepath::str -- path of the logfile
+			offset::int -- number of bytes of the prefix
+		Output:
+			digest::str -- hexadecimal SHA-256 digest of the sampled prefix
+		'''
+		digest = hashlib.sha256(str(offset).encode())
+		with open(filepath, "rb") as file_pointer:
+			digest.update(file_pointer.read(min(offset, self.sample_size)))
+			file_pointer.seek(max(0, offset - self.sample_size))
+			digest.update(file_pointer.read(min(offset, self.sample_size)))
+		return digest.hexdigest()
+
+
+	def get_signature(self, filepath, offset):
+		'''
+		Computes the signature of a logfile indexed up to the given offset
+		Input:
+			filepath::str -- path of the logfile
+			offset::int -- byte offset up to which the logfile is indexed
+		Output:
+			signature::dict -- size, mtime (in nanoseconds), indexed offset and prefix digest of the logfile
+		'''
+		stat = os.stat(filepath)
+		return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "offset": offset, "prefix_digest": self.get_prefix_digest(filepath, offset)}
+
+
+	def load(self, filepath):
+		'''
+		Loads the header of the index file if it exists and the indexed prefix of the logfile is unchanged. Lines appended to the logfile after the indexed offset (self.signature["offset"]) are not indexed yet
+		Input:
+			filepath::str -- path of the logfile
+		Output:
+			bool -- True if the index is loaded, False if it has to be (re)built
+		'''
+		try:
+			with open(self.index_path, "rb") as file_pointer:
+				header_line = file_pointer.readline()
+			header = json.loads(header_line)
+			stat = os.stat(filepath)
+		except (OSError, ValueError):
+			return False
+
+		if header.get("version") != self.version:
+			return False
+		signature = header["signature"]
+		if stat.st_size < signature["offset"]:
+			# The logfile has been truncated
+			return False
+		if (stat.st_size, stat.st_mtime_ns) != (signature["size"], signature["mtime_ns"]):
+			if stat.st_size <= signature["size"]:
+				# The logfile has been rewritten in place
+				return False
+			if self.get_prefix_digest(filepath, signature["offset"]) != signature["prefix_digest"]:
+				# The logfile has changed other than by appending to it
+				return False
+
+		self.signature = signature
+		self.line_count = header["line_count"]
+		self.days = {datetime.strptime(date, "%Y-%m-%d").date(): day for date, day in header["days"].items()}
+		self.header_size = len(header_line)
+		return True
+
+
+	def save(self, signature, line_count, day_ranges, cookie_map):
+		'''
+		Writes the index file. Cookie counts records of the dates not in cookie_map are copied unchanged from the current index file, so that an update only serializes the dates which changed. The file is written to a temporary file first and then moved in place, so that a concurrent reader never sees a partial index
+		Input:
+			signature::dict -- signature of the indexed logfile (see get_signature())
+			line_count::int -- number of non-blank lines of the indexed logfile (excluding the header)
+			day_ranges::dict -- date to [start offset, end offset] of the lines of that date in the logfile, for all indexed dates
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day, for the dates which changed
+		Output: NA
+		'''
+		records = []
+		days = {}
+		record_offset = 0
+		current_index = open(self.index_path, "rb") if any(date not in cookie_map for date in day_ranges.keys()) else None
+		for date in day_ranges.keys():
+			if date in cookie_map:
+				record = (json.dumps(cookie_map[date], separators=(",", ":")) + "\n").encode()
+			else:
+				record = self._read_record(current_index, date)
+			days[date.isoformat()] = {"range": day_ranges[date], "record": [record_offset, len(record)]}
+			records.append(record)
+			record_offset += len(record)
+		if current_index is not None:
+			current_index.close()
+
+		header = (json.dumps({"version": self.version, "signature": signature, "line_count": line_count, "days": days}, separators=(",", ":")) + "\n").encode()
+		temporary_path = f"{self.index_path}.{os.getpid()}.tmp"
+		with open(temporary_path, "wb") as file_pointer:
+			file_pointer.write(header)
+			file_pointer.writelines(records)
+		os.replace(temporary_path, self.index_path)
+
+		self.signature = signature
+		self.line_count = line_count
+		self.days = {date: days[date.isoformat()] for date in day_ranges.keys()}
+		self.header_size = len(header)
+		return
+
+
+	def _read_record(self, file_pointer, date):
+		'''
+		Reads the raw cookie counts record of a day from the index file
+		Input:
+			file_pointer::file -- index file opened in binary mode
+			date::datetime.date -- date to read the record of
+		Output:
+			record::bytes -- JSON line of the cookie counts of the date
+		'''
+		record_offset, record_length = self.days[date]["record"]
+		file_pointer.seek(self.header_size + record_offset)
+		return file_pointer.read(record_length)
+
+
+	def get_day_counts(self, date):
+		'''
+		Reads the cookie counts of a day from the index file
+		Input:
+			date::datetime.date -- date to read the cookie counts of
+		Output:
+			cookie_counts::dict -- cookie to number of occurences map of the date (in the order of first occurence), empty if the date is not in the logfile
+		'''
+		if date not in self.days:
+			return {}
+		with open(self.index_path, "rb") as file_pointer:
+			return json.loads(self._read_record(file_pointer, date))
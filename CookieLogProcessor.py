@@ -1,9 +1,35 @@
-from datetime import datetime
+from argparse import Namespace
+from array import array
+from datetime import date as datetime_date, datetime, timedelta
+import collections
+import contextlib
+import copy
+import functools
+import glob
+import io
+import json
+import multiprocessing
+import math
+import mmap
+import operator
+import heapq
 import re
 import os
+import sys
+import time
 
 from InputValidator import InputValidator
 from CustomError import CustomError
+from TimestampDecoder import TimestampDecoder
+from CookieLogIndex import CookieLogIndex
+from CookieLogCache import CookieLogCache
+from CookieCounter import CookieCounter
+from CookieSketch import CookieSketch
+from CookiePartitioner import CookiePartitioner
+from HyperLogLog import HyperLogLog
+from CookieLogDecompressor import CookieLogDecompressor
+from CookieLogStats import CookieLogStats
+from CookieLogBlockReader import CookieLogBlockReader
 
 
 
@@ -12,30 +38,237 @@ class CookieLogProcessor():
 	Class to process input cookie log file.
 	'''
 
+	# Datetime format of the timestamps in the cookie log file
+	log_datetime_format = "%Y-%m-%dT%H:%M:%S%z"
+
+	# Compiled pattern matching a line with a valid cookie (RFC 6265 characters other than ",") and a non-empty timestamp without whitespaces, each optionally surrounded by whitespaces and followed by any other items
+	entry_pattern = re.compile(r"\s*([a-zA-Z0-9!#$%&'*+\-.^_`|~]+)\s*,\s*([^\s,]+)\s*(?:,|\Z)")
+
+	# Number of bytes read at once when scanning a byte range of the cookie log file
+	block_size = 1 << 22
+
+	# Minimum number of bytes of a chunk of the cookie log file scanned by a worker process
+	min_chunk_size = 1 << 20
+
+	# Compiled bytes pattern matching a line (without the line terminator) in the common format, i.e. a valid cookie and a YYYY-MM-DDTHH:MM:SS+HH:MM (or Z) timestamp with range checked fields, each optionally surrounded by whitespaces and followed by any other items. The cookie and date prefix are captured
+	byte_entry_pattern = re.compile(rb"[ \t\r\f\v]*([a-zA-Z0-9!#$%&'*+\-.^_`|~]+)[ \t\r\f\v]*,[ \t\r\f\v]*([0-9]{4}-[0-9]{2}-[0-9]{2})T(?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9](?:[+-](?:[01][0-9]|2[0-3]):[0-5][0-9]|Z)[ \t\r\f\v]*(?:,|\Z)")
+
+	# Compiled multiline bytes pattern matching each whole line within a block of lines without lone "\r" line terminators, as used by the regex engine. The cookie and date prefix of a line in the common format (as byte_entry_pattern) are captured, else the whole line (without the "\r" of its "\r\n") is captured on its own
+	byte_line_pattern = re.compile(rb"^(?:[ \t\r\f\v]*([a-zA-Z0-9!#$%&'*+\-.^_`|~]+)[ \t\r\f\v]*,[ \t\r\f\v]*([0-9]{4}-[0-9]{2}-[0-9]{2})T(?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9](?:[+-](?:[01][0-9]|2[0-3]):[0-5][0-9]|Z)[ \t\r\f\v]*(?:,[^\n]*)?|([^\r\n]*)\r?)$", re.MULTILINE)
+
+	# Compiled bytes pattern matching a line (captured) along with its line terminator "\r\n", "\r" or "\n", if any
+	line_pattern = re.compile(rb"([^\r\n]*)(?:\r\n|\r|\n|\Z)")
+
+	# Compiled bytes pattern matching a "\r" which is not part of a "\r\n" line terminator
+	lone_carriage_return_pattern = re.compile(rb"\r(?!\n)")
+
+	# Engines to scan the cookie log file: "text" decodes and parses each line, "mmap" works on the bytes of the memory-mapped file, "numpy" parses blocks of lines into arrays (falling back to "mmap" if NumPy is not installed), "regex" extracts the lines in the common format from blocks of lines with a single pattern
+	engines = ["text", "mmap", "numpy", "regex"]
+
+	# Bytes of a cookie character (RFC 6265 characters other than ",") and of the timestamp of a line in the common format YYYY-MM-DDTHH:MM:SS+HH:MM, as used by the numpy engine
+	cookie_characters = b"!#$%&'*+-.0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ^_`abcdefghijklmnopqrstuvwxyz|~"
+	timestamp_template = b"0000-00-00T00:00:00+00:00"
+
+	# Maximum length of a cookie parsed by the numpy engine, longer cookies are parsed by _parse_entry()
+	numpy_max_cookie_length = 64
+
+	# Reasons for which a line of the cookie log file is skipped
+	SKIP_MISSING_COMMA = "missing_comma"
+	SKIP_WHITESPACE = "whitespace"
+	SKIP_EMPTY = "empty"
+	SKIP_BAD_CHARACTERS = "bad_characters"
+	SKIP_BAD_TIMESTAMP = "bad_timestamp"
+
+	# Number of cookies tracked by the CookieSketch of each queried date in approx mode, unless set by an error or memory budget
+	default_approx_capacity = 10000
+
+	# Lowest memory budget of the exact counts
+	min_memory_budget = 1 << 20
+
+	# Number of seconds to wait between checks of a followed cookie log file for appended lines
+	follow_poll_interval = 0.5
+
 	def __init__(self, args):
 		'''
-		Class constructor to validate command line arguments and set datetime_format, query_date, logfilename and filepath if validations are True, else None object is returned
+		Class constructor to validate command line arguments and set datetime_format, query_date, query_dates, logfilename and filepath if validations are True, else None object is returned
 		Input:
 			args::namespace -- command line arguments
-			args.date::str -- queried date
-			args.logfilename::str -- cookie log filename
+			args.date::str or list -- queried date, or list of queried dates
+			args.logfilename::str or list -- cookie log filename (.csv, or compressed .csv.gz, .csv.bz2 or .csv.xz), or list of cookie log filenames, directories (of cookie log files) and glob patterns, relative to the current working directory or absolute. The cookie log files are counted one by one (by a pool of args.workers processes) and their counts merged, as if they were concatenated in the given order. "-" reads the cookie log from args.stream, or from the standard input
+			args.stream::file or iterable (optional, default=None) -- with logfilename "-", stream to read the cookie log from instead of the standard input (see from_stream())
+			args.date_range::list (optional) -- [start date, end date] of an inclusive range of queried dates
+			args.dates_file::str (optional) -- name of a file with one queried date per line
+			args.sorted_log::bool (optional, default=False) -- use the ordering of a logfile sorted by timestamp (newest first) to read only the block of the queried date
+			args.top::int (optional, default=None) -- number of top cookies (with counts) to print instead of only the most active cookies
+			args.workers::int (optional, default=1) -- number of worker processes scanning chunks of the logfile in parallel
+			args.engine::str (optional, default="text") -- engine to scan the logfile with, one of CookieLogProcessor.engines
+			args.index::bool (optional, default=False) -- answer queries from a sidecar index of the logfile (<logfile>.idx), which is built on first use, updated with the lines appended to the logfile and rebuilt when the logfile changes otherwise
+			args.cache::bool (optional, default=False) -- answer queries from a columnar binary cache of the logfile (<logfile>.ckc), which is converted on first use and whenever the logfile changes
+			args.low_memory::bool (optional, default=False) -- count the cookies of each date in a CookieCounter (interned cookies and array-backed counts) instead of a dict, using several times less memory for logfiles with many distinct cookies. The logfile is scanned by the text engine
+			args.approx::bool (optional, default=False) -- count the cookies of each date in a CookieSketch (Space-Saving heavy hitters) of fixed size instead of a dict, so that memory does not grow with the number of distinct cookies. The logfile is scanned serially by the text engine
+			args.approx_error::float (optional, default=None) -- with approx, highest error of the counts as a fraction of the number of lines of a date, which sets the number of tracked cookies to 1 / approx_error
+			args.approx_memory::str (optional, default=None) -- with approx, memory budget for the sketches of all the queried dates, in bytes with an optional K, M or G suffix (e.g. "64M"), which sets the number of tracked cookies
+			args.memory_budget::str (optional, default=None) -- memory budget of the exact counts, in bytes with an optional K, M or G suffix (e.g. "512M"). Once it is reached, the counts are spilled to hash partitioned temporary files which are aggregated one at a time (see CookiePartitioner). The cookies tied for the highest count are held in memory in addition. The logfile is scanned serially by the text engine
+			args.distinct::bool (optional, default=False) -- also estimate the number of distinct cookies of each queried date with a HyperLogLog sketch updated in the same scan (see get_distinct_cookie_counts())
+			args.all_dates::bool (optional, default=False) -- allow no queried date to be provided, for processors aggregating all the dates of the logfile (query_date is None then)
+			args.interval::int (optional, default=None) -- number of seconds after which the most active cookies are printed again in follow mode even if they did not change
+			args.pipeline::bool (optional, default=False) -- read the logfile in large blocks with a background thread (see CookieLogBlockReader) while the previous block is parsed, instead of alternating blocking reads and parsing. Applies to the text, numpy and regex engines on uncompressed logfiles
+			args.stats::bool (optional, default=False) -- collect statistics of the queries in a CookieLogStats: seconds spent in each stage, lines read, accepted and skipped by reason, and bytes processed (see get_stats())
 		'''
 		self.error_message = ""
-		if self._validate_commandline_inputs(args.date, args.logfilename):
+		# Stream of the cookie log, None if the cookie log files are read
+		self.stream = None
+		if args.logfilename == "-":
+			self.stream = getattr(args, "stream", None)
+			if self.stream is None:
+				self.stream = getattr(sys.stdin, "buffer", sys.stdin)
+		dates = self._collect_query_dates(args)
+		logfilenames = self._collect_logfilenames(args) if dates is not None else None
+		if logfilenames is not None and self._validate_commandline_inputs(dates, logfilenames if len(logfilenames) > 1 else logfilenames[0]) and self._validate_options(args, logfilenames):
 			self.datetime_format = "%Y-%m-%d"
-			self.query_date = self._process_date(args.date)
-			self.logfilename = args.logfilename
-			self.filepath = os.path.join(os.getcwd(), self.logfilename)
+			# All queried dates (without duplicates) in the order provided, the first of which is the query_date used by get_most_active_cookie()
+			self.query_dates = list(dict.fromkeys(self._process_date(date) for date in dates))
+			self.query_date = self.query_dates[0] if len(self.query_dates) > 0 else None
+			# All the cookie log files (after expanding directories and glob patterns) in the order provided, the first of which is the logfile of the methods working on a single logfile
+			self.logfilenames = logfilenames
+			self.filepaths = [os.path.join(os.getcwd(), logfilename) for logfilename in logfilenames]
+			self.logfilename = self.logfilenames[0]
+			self.filepath = self.filepaths[0]
+			# Whether the logfile can be assumed to be sorted by timestamp (newest first)
+			self.sorted_log = getattr(args, "sorted_log", False)
+			# Decoder of the timestamps of the logfile into days
+			self.timestamp_decoder = TimestampDecoder(self.log_datetime_format)
+			# Number of top cookies (with counts) to print instead of only the most active cookies
+			self.top = getattr(args, "top", None)
+			# Number of worker processes scanning chunks of the logfile in parallel
+			self.workers = getattr(args, "workers", None) or 1
+			# Engine to scan the logfile with
+			self.engine = getattr(args, "engine", None) or "text"
+			# Whether to use (and build on first use) the sidecar index of the logfile, stored at index_path
+			self.use_index = getattr(args, "index", False)
+			self.index_path = self.filepath + ".idx"
+			# Whether to use (and convert the logfile to on first use) the columnar binary cache of the logfile, stored at cache_path
+			self.use_cache = getattr(args, "cache", False)
+			self.cache_path = self.filepath + ".ckc"
+			# Whether to count the cookies of each date in a compact CookieCounter instead of a dict
+			self.low_memory = getattr(args, "low_memory", False)
+			# Whether to count the cookies of each date in a CookieSketch of approx_capacity tracked cookies instead of a dict
+			self.approx = bool(getattr(args, "approx", False) or getattr(args, "approx_error", None) is not None or getattr(args, "approx_memory", None) is not None)
+			self.approx_capacity = self._get_approx_capacity(args)
+			# Number of bytes of the exact counts held in memory before spilling them to partition files, None for no budget
+			self.memory_budget = InputValidator().parse_memory_size(args.memory_budget) if getattr(args, "memory_budget", None) is not None else None
+			# Whether to estimate the number of distinct cookies of each queried date, from the HyperLogLog sketches of distinct_map updated by _get_cookie_map()
+			self.distinct = getattr(args, "distinct", False)
+			self.distinct_map = {}
+			# Number of seconds after which the most active cookies are printed again in follow mode, None to print them only when they change
+			self.follow_interval = getattr(args, "interval", None)
+			# Whether to read the logfile with a background thread while parsing
+			self.pipeline = getattr(args, "pipeline", False)
+			# Statistics of the queries, None unless enabled so that the scans are not instrumented
+			self.stats = CookieLogStats() if getattr(args, "stats", False) else None
 		else:
 			raise CustomError(f"Class::CookieLogProcessor() creation failed: {self.error_message}")
 
 
+	@classmethod
+	def from_stream(cls, stream, date, **options):
+		'''
+		Creates a processor reading the cookie log from a stream instead of a file, e.g. to query the lines of a log extract without writing them to disk first. The stream is read sequentially by the text engine (options needing a file, such as index or cache, are not available), once per query
+		Input:
+			stream::file or iterable -- text or binary file object, or iterable of lines (str or bytes), starting with the header line like a cookie log file. Binary lines are decoded as UTF-8. The stream is not closed
+			date::str or list -- queried date, or list of queried dates
+			options -- other command line arguments of the processor (see __init__()), e.g. top=3
+		Output:
+			processor::CookieLogProcessor -- processor object
+		'''
+		return cls(Namespace(logfilename="-", date=date, stream=stream, **options))
+
+
+	def _collect_query_dates(self, args):
+		'''
+		Collects the queried date strings from the date argument(s), the date range and the dates file. Returns None and sets error_message in case the date range or dates file can not be used
+		Input:
+			args::namespace -- command line arguments (see __init__())
+		Output:
+			dates::list -- queried date strings, None in case of an error
+		'''
+		dates = []
+		if isinstance(args.date, list):
+			dates.extend(args.date)
+		elif args.date is not None:
+			dates.append(args.date)
+
+		date_range = getattr(args, "date_range", None)
+		if date_range is not None:
+			start_date, end_date = date_range
+			try:
+				start_date = datetime.strptime(str(start_date).strip(), "%Y-%m-%d").date()
+				end_date = datetime.strptime(str(end_date).strip(), "%Y-%m-%d").date()
+			except ValueError:
+				# Endpoints which are not dates are reported by the date validation
+				dates.extend(date_range)
+			else:
+				if start_date > end_date:
+					self.error_message = "ERROR: Start date of the date range is after its end date!"
+					return None
+				dates.extend((start_date + timedelta(days=day)).isoformat() for day in range((end_date - start_date).days + 1))
+
+		dates_file = getattr(args, "dates_file", None)
+		if dates_file is not None:
+			if not(os.path.isfile(os.path.join(os.getcwd(), str(dates_file)))):
+				self.error_message = f"ERROR: The dates file {dates_file} does not exist!"
+				return None
+			with open(os.path.join(os.getcwd(), str(dates_file)), "r") as file_pointer:
+				dates.extend(line.strip() for line in file_pointer if not(self._is_empty_string(line.strip())))
+
+		if len(dates) == 0 and not(getattr(args, "all_dates", False)):
+			self.error_message = "ERROR: No date provided!"
+			return None
+		return dates
+
+
+	def _collect_logfilenames(self, args):
+		'''
+		Collects the cookie log filenames from the logfilename argument(s), expanding directories into the (possibly compressed) .csv files they contain and glob patterns into the files they match (both in sorted order). Duplicate files are counted once. Returns None and sets error_message in case a directory or glob pattern has no file
+		Input:
+			args::namespace -- command line arguments (see __init__())
+		Output:
+			logfilenames::list -- cookie log filenames (absolute for the expanded ones), None in case of an error
+		'''
+		if self.stream is not None:
+			return ["-"]
+		logfilenames = []
+		for logfilename in (args.logfilename if isinstance(args.logfilename, list) else [args.logfilename]):
+			pattern = str(logfilename).strip()
+			if pattern == "-":
+				self.error_message = "ERROR: The standard input (-) can not be read along with cookie log files!"
+				return None
+			path = os.path.join(os.getcwd(), pattern)
+			if len(pattern) > 0 and os.path.isdir(path):
+				matches = sorted(match for extension in [".csv"] + [".csv" + suffix for suffix in CookieLogDecompressor.openers] for match in glob.glob(os.path.join(glob.escape(path), "*" + extension)))
+			elif any(character in pattern for character in "*?["):
+				matches = sorted(glob.glob(path))
+			else:
+				# Plain filenames are validated by InputValidator.validate_filename()
+				logfilenames.append(logfilename)
+				continue
+			if len(matches) == 0:
+				self.error_message = f"ERROR: No cookie log file found in {pattern}!"
+				return None
+			logfilenames.extend(matches)
+
+		unique_logfilenames = {}
+		for logfilename in logfilenames:
+			unique_logfilenames.setdefault(os.path.normpath(os.path.join(os.getcwd(), str(logfilename).strip())), logfilename)
+		return list(unique_logfilenames.values())
+
+
 	def _validate_commandline_inputs(self, date, filename):
 		'''
 		Validates command line input arguments using InputValidator object and returns True if they are both valid, else False
 		Input: 
-			date::str -- command line argument of queried date
-			filename::str -- command line argument of the cookie log filename
+			date::str or list -- command line argument of queried date, or list of queried dates
+			filename::str or list -- command line argument of the cookie log filename, or list of cookie log filenames
 		Output:
 			bool -- boolean result of whether the command line arguments are valid or not
 		'''
@@ -44,15 +277,26 @@ class CookieLogProcessor():
 
 		error_messages = []
 
-		# Perform cookie logfile name validation
-		filename_validation_flag, error_message_filename = validator.validate_filename(filename)
-		error_message_filename = str(error_message_filename) if error_message_filename is not None else ""
-		error_messages.append(error_message_filename)
+		# Perform cookie logfile name validation of every cookie logfile
+		filename_validation_flag = True
+		for filename_ in (filename if isinstance(filename, list) else [filename]):
+			if self.stream is not None:
+				# The cookie log is read from a stream instead of a file
+				continue
+			validation_flag, error_message_filename = validator.validate_filename(filename_)
+			if not(validation_flag):
+				filename_validation_flag = False
+				error_messages.append(f"{str(error_message_filename)} ({filename_})" if isinstance(filename, list) else str(error_message_filename))
+		if filename_validation_flag:
+			error_messages.append("")
 		
-		# Perform query date validation
-		date_validation_flag, error_message_date = validator.validate_date(date)
-		error_message_date = str(error_message_date) if error_message_date is not None else ""
-		error_messages.append(error_message_date)
+		# Perform query date validation of every queried date
+		date_validation_flag = True
+		for date_ in (date if isinstance(date, list) else [date]):
+			validation_flag, error_message_date = validator.validate_date(date_)
+			if not(validation_flag):
+				date_validation_flag = False
+				error_messages.append(f"{str(error_message_date)} ({date_})" if isinstance(date, list) else str(error_message_date))
 		
 		self.error_message = "\n".join(error_messages)
 
@@ -60,6 +304,111 @@ class CookieLogProcessor():
 		return filename_validation_flag and date_validation_flag
 
 
+	def _validate_options(self, args, logfilenames):
+		'''
+		Validates the optional command line arguments using InputValidator object and returns True if they are all valid, else False
+		Input:
+			args::namespace -- command line arguments (see __init__())
+			logfilenames::list -- cookie log file names the options apply to
+		Output:
+			bool -- boolean result of whether the optional command line arguments are valid or not
+		'''
+		validator = InputValidator()
+
+		for option, name in [("top", "--top"), ("workers", "--workers"), ("interval", "--interval")]:
+			if getattr(args, option, None) is not None:
+				validation_flag, error_message = validator.validate_positive_integer(getattr(args, option), name)
+				if not(validation_flag):
+					self.error_message = error_message
+					return False
+
+		if getattr(args, "approx_error", None) is not None and getattr(args, "approx_memory", None) is not None:
+			self.error_message = "ERROR: Only one of --approx-error and --approx-memory can be provided!"
+			return False
+		if getattr(args, "approx_error", None) is not None:
+			validation_flag, error_message = validator.validate_fraction(args.approx_error, "--approx-error")
+			if not(validation_flag):
+				self.error_message = error_message
+				return False
+		if getattr(args, "approx_memory", None) is not None:
+			validation_flag, error_message = validator.validate_memory_size(args.approx_memory, "--approx-memory", CookieSketch.counter_size)
+			if not(validation_flag):
+				self.error_message = error_message
+				return False
+
+		if getattr(args, "memory_budget", None) is not None:
+			validation_flag, error_message = validator.validate_memory_size(args.memory_budget, "--memory-budget", self.min_memory_budget)
+			if not(validation_flag):
+				self.error_message = error_message
+				return False
+
+		if self.stream is not None and (getattr(args, "index", False) or getattr(args, "cache", False)):
+			self.error_message = "ERROR: --index and --cache need a cookie log file, not a stream!"
+			return False
+		if getattr(args, "index", False) and any(CookieLogDecompressor.get_compression(logfilename) is not None for logfilename in logfilenames):
+			# Byte offsets are not available in a compressed logfile
+			self.error_message = "ERROR: --index needs an uncompressed cookie log file!"
+			return False
+
+		if getattr(args, "engine", None) is not None and args.engine not in self.engines:
+			self.error_message = "ERROR: --engine should be one of: {}".format(", ".join(self.engines))
+			return False
+
+		return True
+
+
+	def _get_approx_capacity(self, args):
+		'''
+		Returns the number of cookies tracked by the CookieSketch of each queried date in approx mode, set by the highest error of the counts (args.approx_error) or by the memory budget of the sketches of all the queried dates (args.approx_memory)
+		Input:
+			args::namespace -- command line arguments (see __init__())
+		Output: number of tracked cookies (int)
+		'''
+		if getattr(args, "approx_error", None) is not None:
+			# The counts are overestimated by at most the number of lines of a date divided by the number of tracked cookies
+			return math.ceil(1 / args.approx_error)
+		if getattr(args, "approx_memory", None) is not None:
+			memory_budget = InputValidator().parse_memory_size(args.approx_memory)
+			return max(1, memory_budget // (CookieSketch.counter_size * max(1, len(self.query_dates))))
+		return self.default_approx_capacity
+
+
+	def _open_logfile(self):
+		'''
+		Opens the cookie logfile for reading as text. A compressed logfile (.csv.gz, .csv.bz2 or .csv.xz) is decompressed by a background thread while its lines are read (see CookieLogDecompressor). The lines of a stream are read by _iter_stream()
+		Input: NA
+		Output:
+			file_pointer::file -- cookie logfile opened as text (an iterator of the text lines of a stream)
+		'''
+		if self.stream is not None:
+			return contextlib.closing(self._iter_stream())
+		if CookieLogDecompressor.get_compression(self.filepath) is None:
+			return open(self.filepath, "r")
+		return io.TextIOWrapper(io.BufferedReader(CookieLogDecompressor(self.filepath)))
+
+
+	def _iter_stream(self):
+		'''
+		Lazily reads the lines of the cookie log stream as text. A binary file object is decoded as UTF-8 (like the lines read in binary mode), with the same line terminators as a file opened as text. The stream is not closed
+		Input: NA
+		Output:
+			line::str -- generator yielding each line of the stream
+		'''
+		if isinstance(self.stream, (io.RawIOBase, io.BufferedIOBase)):
+			buffered_stream = io.BufferedReader(self.stream) if isinstance(self.stream, io.RawIOBase) else self.stream
+			text_stream = io.TextIOWrapper(buffered_stream, encoding="utf-8", errors="replace")
+			try:
+				yield from text_stream
+			finally:
+				# Detaching the wrappers, so that they do not close the stream
+				text_stream.detach()
+				if buffered_stream is not self.stream:
+					buffered_stream.detach()
+			return
+		for line in self.stream:
+			yield self._decode_line(line) if isinstance(line, bytes) else line
+
+
 	def _read_logfile(self):
 		'''
 		Reads cookie logfile
@@ -67,7 +416,7 @@ class CookieLogProcessor():
 		Output:
 			data::list -- containing each line in file as a list item
 		'''
-		file_pointer = open(self.filepath, "r")
+		file_pointer = self._open_logfile()
 		file_data = file_pointer.read().strip()
 		file_pointer.close()
 		
@@ -76,6 +425,60 @@ class CookieLogProcessor():
 		return data
 
 
+	def _iter_logfile(self):
+		'''
+		Lazily reads cookie logfile line by line so that only the current line is held in memory, irrespective of the logfile size. In pipeline mode, an uncompressed logfile is read in blocks by a background thread (see _iter_byte_range()) instead
+		Input: NA
+		Output:
+			line::str -- generator yielding each line in file (ignoring the header on the first line)
+		'''
+		if self.pipeline and self.stream is None and CookieLogDecompressor.get_compression(self.filepath) is None:
+			yield from self._iter_byte_range(*self._get_chunk_ranges(1)[0])
+			return
+		with self._open_logfile() as file_pointer:
+			header_skipped = False
+			for line in file_pointer:
+				if not(header_skipped):
+					# Blank lines before the header are ignored, same as strip() on the whole file in _read_logfile()
+					if self._is_empty_string(line.strip()):
+						continue
+					header_skipped = True
+					continue
+				yield line
+		if self.stats is not None and self.stream is None:
+			# Bytes of the scanned byte range, from the end of the header (all the bytes of a compressed logfile)
+			with open(self.filepath, "rb") as file_pointer:
+				file_size = file_pointer.seek(0, os.SEEK_END)
+				self.stats.byte_count += file_size if CookieLogDecompressor.get_compression(self.filepath) is not None else file_size - self._get_data_offset(file_pointer)
+
+
+	def _iter_logfiles(self):
+		'''
+		Lazily reads all the cookie logfiles line by line, one after the other in the order of self.filepaths, as if they were concatenated (ignoring the header of each logfile)
+		Input: NA
+		Output:
+			line::str -- generator yielding each line of the logfiles
+		'''
+		for filepath in self.filepaths:
+			yield from self._for_logfile(filepath)._iter_logfile()
+
+
+	def _for_logfile(self, filepath):
+		'''
+		Returns a copy of the processor working on a single cookie logfile, with its own sidecar index and columnar binary cache, and counting it serially (e.g. in a worker process counting one of several logfiles)
+		Input:
+			filepath::str -- path of the cookie logfile
+		Output:
+			processor::CookieLogProcessor -- copy of the processor
+		'''
+		processor = copy.copy(self)
+		processor.logfilenames, processor.filepaths = [filepath], [filepath]
+		processor.logfilename, processor.filepath = filepath, filepath
+		processor.index_path, processor.cache_path = filepath + ".idx", filepath + ".ckc"
+		processor.workers = 1
+		return processor
+
+
 	def _process_date(self, date):
 		'''
 		Parse the date string in appropriate format. self.datetime_format is updated within any function based on the requirement
@@ -198,80 +601,1478 @@ class CookieLogProcessor():
 		return max(input_dict.values())
 
 
-	def get_most_active_cookie(self):
+	def _parse_entry(self, entry):
 		'''
-		Extracts the most active cookie from the logfile (i.e. file_data) corresponding to the queried date (i.e., self.query_date)
-		Input: NA
-		Output: 
-			most_active_cookies::list -- containing all most active cookies corresponding to the input query date
+		Parses a raw line from the cookie log file into its cookie and date in a single pass. Lines accepted and skipped are the same as with _skip_entry(), but the common case of a valid line needs only one compiled pattern match and one memoized timestamp decode
+		Input:
+			entry::str -- a raw line from the cookie log file
+		Output:
+			cookie::str -- cookie of the line, None if the line is skipped
+			date::datetime.date -- date of the timestamp of the line, None if the line is skipped
+			skip_reason::str -- one of the SKIP_* reasons if the line is skipped, else None
+		'''
+		match = self.entry_pattern.match(entry)
+		if match is None:
+			# The line is malformed, hence determining the reason with the individual checks
+			return self._parse_malformed_entry(entry)
+		date = self.timestamp_decoder.decode(match.group(2))
+		if date is None:
+			# The date corresponding to the current entry is not in the required datetime format, hence skipping it
+			return None, None, self.SKIP_BAD_TIMESTAMP
+		return match.group(1), date, None
+
+
+	def _parse_malformed_entry(self, entry):
+		'''
+		Parses a line not matching entry_pattern by running the same checks as _skip_entry() one by one, to find the reason for skipping the line
+		Input:
+			entry::str -- a raw line from the cookie log file
+		Output:
+			cookie::str -- cookie of the line, None if the line is skipped
+			date::datetime.date -- date of the timestamp of the line, None if the line is skipped
+			skip_reason::str -- one of the SKIP_* reasons if the line is skipped, else None
+		'''
+		# Selecting the first two items: cookie and datetime in case some line comprises of more than two items
+		if "," not in entry:
+			return None, None, self.SKIP_MISSING_COMMA
+		cookie, timestamp = self._preprocess_line(entry.split(",")[:2])
+
+		# Skip the current line if its cookie or date contains whitespaces or is empty
+		for item in [cookie, timestamp]:
+			if self._has_whitespace(item):
+				return None, None, self.SKIP_WHITESPACE
+			if self._is_empty_string(item):
+				return None, None, self.SKIP_EMPTY
+
+		# Skip the current line if the cookie string has any non-alphanumeric characters
+		if not(self._check_cookie_string_characters(cookie)):
+			return None, None, self.SKIP_BAD_CHARACTERS
+
+		date = self.timestamp_decoder.decode(timestamp)
+		if date is None:
+			return None, None, self.SKIP_BAD_TIMESTAMP
+		return cookie, date, None
+
+
+	def _count_skipped_entry(self, entry, skip_reason):
+		'''
+		Counts a skipped line in the statistics (if enabled) and returns whether it is counted as a line read. Blank lines do not make the logfile non-empty
+		Input:
+			entry::str -- a raw line from the cookie log file
+			skip_reason::str -- one of the SKIP_* reasons for which the line is skipped
+		Output: 0 if the line is blank, else 1 (int)
+		'''
+		blank = skip_reason == self.SKIP_MISSING_COMMA and self._is_empty_string(entry.strip())
+		if self.stats is not None:
+			self.stats.add_skip(skip_reason, blank)
+		return 0 if blank else 1
+
+
+	def _time_stage(self, stage, nested_stages=()):
+		'''
+		Returns a context manager timing a stage in the statistics if they are enabled, else doing nothing
+		Input:
+			stage::str -- timed stage (one of CookieLogStats.stages)
+			nested_stages::list (default=()) -- stages timed within the stage, whose seconds are not added to the stage
+		Output: context manager
+		'''
+		if self.stats is None:
+			return contextlib.nullcontext()
+		return self.stats.time(stage, nested_stages)
+
+
+	def _instrument_lines(self, lines):
+		'''
+		Returns the lines and the function parsing them, timed around each line as the read and parse stages if the statistics are enabled
+		Input:
+			lines::iterable -- lines of the cookie log file
+		Output:
+			lines::iterable -- the lines, timed if the statistics are enabled
+			parse_entry::callable -- _parse_entry(), timed if the statistics are enabled
+		'''
+		if self.stats is None:
+			return lines, self._parse_entry
+		return self.stats.time_iterator("read", lines), self.stats.time_function("parse", self._parse_entry)
+
+
+	def _run_with_stats(self, method_name, *args, **kwargs):
+		'''
+		Calls a method with new statistics, in a worker process whose statistics are sent back to be merged by the parent process
+		Input:
+			method_name::str -- name of the method
+			args, kwargs -- arguments of the method
+		Output:
+			result -- result of the method
+			stats::CookieLogStats -- statistics collected by the method
+		'''
+		self.stats = CookieLogStats()
+		return getattr(self, method_name)(*args, **kwargs), self.stats
+
+
+	def _count_cookies(self, lines, query_dates=None):
+		'''
+		Counts the occurences of each cookie on each date for the given lines of the cookie log file. Only the queried dates are aggregated, so that memory is not spent on the other dates of the logfile. If self.approx (or self.low_memory) is set, the cookies of each date are counted in a CookieSketch (or a CookieCounter) instead of a dict
+		Input:
+			lines::iterable -- lines of the cookie log file (excluding the header)
+			query_dates::set (default=None) -- dates to count the cookies of, None to count all dates
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day
+			line_count::int -- number of non-blank lines read
 		'''
-		# Defining datetime format expected
-		self.datetime_format = "%Y-%m-%dT%H:%M:%S%z"
-		
-		# Variable to store date to cookie map along with number of occurences of each cookie on a given day
 		cookie_map = {}
-		# Variable to store most active cookies for queried date
-		most_active_cookies = []
-		# Variable to store cookie log file contents
-		data = []
-
-		# Read the cookie logfile a
-		data = self._read_logfile()
-		if len(data) == 0:
-			# raise CustomError("Input cookie logfile is empty!")
-			print("ERROR: Input cookie logfile is empty!")
-			return []
-	
+		line_count = 0
+
+		# Reading and parsing are timed around each line, the rest of the loop is aggregation
+		lines, parse_entry = self._instrument_lines(lines)
+
 		# Parse the timestamp string (with timezone) into a date object and associate it with cookie
-		for entry in data:
-			
-			# Selecting the first two items: cookie and datetime in case some line comprises of more than two items
-			if "," not in entry:
+		with self._time_stage("aggregate", ["read", "parse"]):
+			for entry in lines:
+				cookie, date, skip_reason = parse_entry(entry)
+				if skip_reason is not None:
+					line_count += self._count_skipped_entry(entry, skip_reason)
+					continue
+				line_count += 1
+				if query_dates is not None and date not in query_dates:
+					continue
+
+				if self.approx:
+					if date not in cookie_map.keys():
+						cookie_map[date] = CookieSketch(self.approx_capacity)
+					cookie_map[date].add(cookie)
+					if self.distinct:
+						# The sketch does not keep all the cookies, so they are counted as they are read
+						self._add_distinct_cookie(date, cookie)
+					continue
+				if self.low_memory:
+					if date not in cookie_map.keys():
+						cookie_map[date] = CookieCounter()
+					cookie_map[date].add(cookie)
+					continue
+
+				if date not in cookie_map.keys():
+					cookie_map[date] = {}
+				if cookie not in cookie_map[date].keys():
+					cookie_map[date][cookie] = 0
+				cookie_map[date][cookie] += 1
+
+		return cookie_map, line_count
+
+
+	def _get_data_offset(self, file_pointer):
+		'''
+		Returns the byte offset of the first line after the header of a cookie log file opened in binary mode
+		Input:
+			file_pointer::file -- cookie log file opened in binary mode
+		Output:
+			offset::int -- byte offset at which the log entries begin
+		'''
+		file_pointer.seek(0)
+		offset = 0
+		for line in file_pointer:
+			# Like the text mode in which _iter_logfile() reads, "\r\n" and "\r" are also line terminators
+			for match in self.line_pattern.finditer(line):
+				if len(match.group()) == 0:
+					continue
+				offset += match.end() - match.start()
+				# Blank lines before the header are ignored, same as in _iter_logfile()
+				if len(match.group(1).strip()) > 0:
+					file_pointer.seek(offset)
+					return offset
+		return offset
+
+
+	def _decode_line(self, line):
+		'''
+		Decodes a line read from the cookie log file in binary mode
+		Input:
+			line::bytes or memoryview -- raw line
+		Output: decoded line (str)
+		'''
+		return str(line, "utf-8", errors="replace")
+
+
+	def _parse_entry_instant(self, entry):
+		'''
+		Parses a raw line from the cookie log file like _parse_entry(), also decoding the instant in UTC of its timestamp
+		Input:
+			entry::str -- a raw line from the cookie log file
+		Output:
+			cookie::str -- cookie of the line, None if the line is skipped
+			date::datetime.date -- date of the timestamp of the line (in its own UTC offset), None if the line is skipped
+			instant::int -- instant of the timestamp of the line (see TimestampDecoder.decode_instant()), None if the line is skipped
+		'''
+		cookie, date, skip_reason = self._parse_entry(entry)
+		if skip_reason is not None:
+			return None, None, None
+		match = self.entry_pattern.match(entry)
+		timestamp = match.group(2) if match is not None else self._preprocess_line(entry.split(",")[:2])[1]
+		return cookie, date, self.timestamp_decoder.decode_instant(timestamp)
+
+
+	def _find_first_line_instant(self, file_pointer, offset):
+		'''
+		Finds the first valid log entry starting at or after the given byte offset, re-syncing to the start of the next line if the offset falls within a line
+		Input:
+			file_pointer::file -- cookie log file opened in binary mode
+			offset::int -- byte offset to start searching from
+		Output:
+			line_offset::int -- byte offset of the first line start at or after the offset
+			instant::int -- instant in UTC of the first valid entry from line_offset onwards, None if there is no valid entry till the end of file
+		'''
+		if offset > 0:
+			# Skip the remainder of the line containing byte (offset - 1), so that the file pointer is at a line start
+			file_pointer.seek(offset - 1)
+			file_pointer.readline()
+		else:
+			file_pointer.seek(0)
+		line_offset = file_pointer.tell()
+		for line in iter(file_pointer.readline, b""):
+			# Lines read in binary mode may hold several text lines separated by "\r"
+			for entry in self._split_block_lines(line):
+				cookie, date, instant = self._parse_entry_instant(entry)
+				if instant is not None:
+					return line_offset, instant
+		return line_offset, None
+
+
+	def _count_sorted_logfile(self, query_date):
+		'''
+		Counts the cookies of the queried date in a cookie log file sorted by timestamp (newest first). Timestamps are ordered by their instant in UTC, so the lines of the queried date (in their own UTC offsets, of less than a day) lie within the day before and the day after it in UTC. The byte offset at which this window begins is binary searched on disk, and only the lines of the window are read, stopping at the first older instant. The ordering is spot-checked at the probes of the binary search and verified across the lines read, the rest of the logfile being assumed sorted
+		Input:
+			query_date::datetime.date -- queried date
+		Output:
+			cookie_map::dict -- date to cookie map for the queried date, None if the logfile turns out not to be sorted (or has no valid entries) and a full scan is required
+		'''
+		cookie_map = {}
+		# Instants in UTC between which the timestamps of the queried date lie, exclusive
+		window_start = (query_date.toordinal() - 1) * 86400
+		window_end = (query_date.toordinal() + 2) * 86400
+		with open(self.filepath, "rb") as file_pointer:
+			data_offset = self._get_data_offset(file_pointer)
+			file_size = file_pointer.seek(0, os.SEEK_END)
+
+			# Binary search for the smallest offset after which no entry is newer than the window. (offset, instant) of every probe is kept to verify the ordering
+			probes = []
+			low, high = data_offset, file_size
+			while low < high:
+				middle = (low + high) // 2
+				line_offset, instant = self._find_first_line_instant(file_pointer, middle)
+				if instant is None or instant < window_end:
+					high = middle
+				else:
+					low = middle + 1
+				if instant is not None:
+					probes.append((line_offset, instant))
+
+			# Instants of the probes must not increase with the byte offset, else the logfile is not sorted
+			probes.sort(key=lambda probe: probe[0])
+			for index in range(1, len(probes)):
+				if probes[index][1] > probes[index - 1][1]:
+					return None
+
+			# Read the lines of the window starting at the line found above, verifying that their instants do not increase
+			found_valid_entry = False
+			window_passed = False
+			previous_instant = None
+			file_pointer.seek(self._find_first_line_instant(file_pointer, low)[0])
+			for line in iter(file_pointer.readline, b""):
+				if window_passed:
+					break
+				if self.stats is not None:
+					self.stats.byte_count += len(line)
+				for entry in self._split_block_lines(line):
+					cookie, date, instant = self._parse_entry_instant(entry)
+					if instant is None:
+						continue
+					found_valid_entry = True
+					if instant >= window_end or (previous_instant is not None and instant > previous_instant):
+						# An instant newer than the window after the binary searched offset, or newer than the line before, hence the logfile is not sorted
+						return None
+					previous_instant = instant
+					if instant <= window_start:
+						window_passed = True
+						break
+					if date != query_date:
+						continue
+
+					if date not in cookie_map.keys():
+						cookie_map[date] = {}
+					if cookie not in cookie_map[date].keys():
+						cookie_map[date][cookie] = 0
+					cookie_map[date][cookie] += 1
+
+		if len(probes) == 0 and not(found_valid_entry):
+			# There are no valid entries in the logfile, so its ordering can not be used
+			return None
+
+		return cookie_map
+
+
+	def _get_chunk_ranges(self, chunk_count):
+		'''
+		Splits the log entries of the cookie log file into byte ranges aligned to line starts
+		Input:
+			chunk_count::int -- maximum number of byte ranges
+		Output:
+			chunk_ranges::list -- (start offset, end offset) of each byte range in the order of the logfile
+		'''
+		with open(self.filepath, "rb") as file_pointer:
+			data_offset = self._get_data_offset(file_pointer)
+			file_size = file_pointer.seek(0, os.SEEK_END)
+
+			chunk_count = max(1, min(chunk_count, (file_size - data_offset) // self.min_chunk_size))
+			boundaries = [data_offset]
+			for index in range(1, chunk_count):
+				offset = data_offset + (file_size - data_offset) * index // chunk_count
+				# Move the boundary forward to the start of the next line
+				file_pointer.seek(offset - 1)
+				file_pointer.readline()
+				if boundaries[-1] < file_pointer.tell() < file_size:
+					boundaries.append(file_pointer.tell())
+			boundaries.append(file_size)
+
+		return [(boundaries[index], boundaries[index + 1]) for index in range(len(boundaries) - 1)]
+
+
+	def _iter_byte_blocks(self, start, end):
+		'''
+		Lazily reads a byte range of the cookie log file in large blocks of whole lines. In pipeline mode, the blocks are read by a background thread while the previous block is parsed
+		Input:
+			start::int -- byte offset of a line start
+			end::int -- byte offset of a line start (or the end of file) at which to stop
+		Output:
+			block::bytes -- generator yielding blocks of about self.block_size bytes, each ending with a newline except possibly the last one. In pipeline mode, a block is a memoryview of a buffer reused once the next block is requested
+		'''
+		if self.pipeline:
+			reader = CookieLogBlockReader(self.filepath, start, end, self.block_size)
+			try:
+				for block in reader:
+					if self.stats is not None:
+						self.stats.byte_count += len(block)
+					yield block
+			finally:
+				reader.close()
+			return
+
+		with open(self.filepath, "rb") as file_pointer:
+			file_pointer.seek(start)
+			remaining = end - start
+			partial_line = b""
+			while remaining > 0:
+				block = file_pointer.read(min(self.block_size, remaining))
+				if len(block) == 0:
+					break
+				remaining -= len(block)
+				if self.stats is not None:
+					self.stats.byte_count += len(block)
+				block = partial_line + block
+				# Blocks are only split at the last line terminator, the remainder is prefixed to the next block
+				last_newline = self._get_last_line_end(block)
+				block, partial_line = block[:last_newline], block[last_newline:]
+				if len(block) > 0:
+					yield block
+			if len(partial_line) > 0:
+				yield partial_line
+
+
+	def _get_last_line_end(self, block):
+		'''
+		Finds the end of the last line of a block terminated by "\n", "\r\n" or "\r". A "\r" at the end of the block may be the first half of a "\r\n", so it does not terminate a line
+		Input:
+			block::bytes or bytearray -- block of lines
+		Output:
+			offset::int -- offset just after the last line terminator in the block, 0 if there is none
+		'''
+		return max(block.rfind(b"\n"), block.rfind(b"\r", 0, len(block) - 1)) + 1
+
+
+	def _iter_byte_range(self, start, end):
+		'''
+		Lazily reads the lines of a byte range of the cookie log file in large blocks
+		Input:
+			start::int -- byte offset of a line start
+			end::int -- byte offset of a line start (or the end of file) at which to stop
+		Output:
+			line::str -- generator yielding each line in the byte range (without the line terminator)
+		'''
+		for block in self._iter_byte_blocks(start, end):
+			yield from self._split_block_lines(block)
+
+
+	def _split_block_lines(self, block):
+		'''
+		Splits a block of whole lines into lines (see _split_lines()). A block ending with a line terminator is followed by an empty string, which is not a line
+		Input:
+			block::bytes or memoryview -- block of lines
+		Output:
+			lines::list -- lines of the block (without the line terminators)
+		'''
+		lines = self._split_lines(block)
+		return lines[:-1] if block[-1:] in [b"\n", b"\r"] else lines
+
+
+	def _split_lines(self, block):
+		'''
+		Decodes a block of lines read in binary mode and splits it into lines. Like the text mode in which _iter_logfile() reads, "\r\n" and "\r" are also line terminators
+		Input:
+			block::bytes or memoryview -- block of lines
+		Output:
+			lines::list -- lines of the block (without the line terminators)
+		'''
+		text = self._decode_line(block)
+		if "\r" in text:
+			text = text.replace("\r\n", "\n").replace("\r", "\n")
+		return text.split("\n")
+
+
+	def _count_byte_range(self, start, end, query_dates):
+		'''
+		Counts the cookies of the queried dates in a byte range of the cookie log file. This is run by the worker processes
+		Input:
+			start::int -- byte offset of a line start
+			end::int -- byte offset of a line start (or the end of file) at which to stop
+			query_dates::set -- dates to count the cookies of, None to count all dates
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day
+			line_count::int -- number of non-blank lines read
+		'''
+		if self.low_memory or self.approx:
+			# Only the text engine counts in CookieCounter and CookieSketch objects
+			return self._count_cookies(self._iter_byte_range(start, end), query_dates)
+		if self.engine == "numpy" and self._import_numpy() is not None:
+			return self._count_numpy_range(start, end, query_dates)
+		if self.engine == "regex":
+			return self._count_regex_range(start, end, query_dates)
+		if self.engine in ["mmap", "numpy"]:
+			# Lines are read, parsed and counted in a single loop, timed as parsing (except the lines of a byte range read as text lines, timed on their own)
+			with self._time_stage("parse", ["read", "parse", "aggregate"]):
+				return self._count_mmap_range(start, end, query_dates)
+		return self._count_cookies(self._iter_byte_range(start, end), query_dates)
+
+
+	def _count_mmap_range(self, start, end, query_dates):
+		'''
+		Counts the cookies of the queried dates in a byte range of the memory-mapped cookie log file, working directly on bytes. Lines are matched in place with byte_entry_pattern, cookies are counted by their bytes and only the distinct counted cookies are decoded at the end. Lines not matching the pattern are decoded and parsed by _parse_entry(), so that the result is the same as with the text engine
+		Input:
+			start::int -- byte offset of a line start
+			end::int -- byte offset of a line start (or the end of file) at which to stop
+			query_dates::set -- dates to count the cookies of, None to count all dates
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day
+			line_count::int -- number of non-blank lines read
+		'''
+		if start >= end:
+			return {}, 0
+
+		cookie_map = {}
+		line_count = 0
+		# Variable to memoize the day (or None if invalid) of each date prefix, the time and offset being range checked by the pattern
+		days = {}
+		decode_date_prefix = self.timestamp_decoder.decode_date_prefix
+
+		with open(self.filepath, "rb") as file_pointer, mmap.mmap(file_pointer.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+			if self.lone_carriage_return_pattern.search(mapped_file, start, end) is not None:
+				# "\r" is a line terminator in text mode, so such a byte range is read as text lines instead
+				return self._count_cookies(self._iter_byte_range(start, end), query_dates)
+
+			if self.stats is not None:
+				self.stats.byte_count += end - start
+
+			match_entry = self.byte_entry_pattern.match
+			find = mapped_file.find
+			position = start
+			while position < end:
+				line_end = find(b"\n", position, end)
+				if line_end == -1:
+					line_end = end
+
+				match = match_entry(mapped_file, position, line_end)
+				if match is not None:
+					line_count += 1
+					cookie, date_prefix = match.group(1, 2)
+					if date_prefix not in days:
+						days[date_prefix] = decode_date_prefix(date_prefix)
+					date = days[date_prefix]
+					if date is None and self.stats is not None:
+						self.stats.add_skip(self.SKIP_BAD_TIMESTAMP, False)
+				else:
+					entry = self._decode_line(mapped_file[position:line_end])
+					cookie, date, skip_reason = self._parse_entry(entry)
+					if skip_reason is None:
+						line_count += 1
+						# Valid cookies only have ASCII characters
+						cookie = cookie.encode()
+					else:
+						line_count += self._count_skipped_entry(entry, skip_reason)
+				position = line_end + 1
+
+				if date is None or (query_dates is not None and date not in query_dates):
+					continue
+				if date not in cookie_map:
+					cookie_map[date] = {}
+				date_cookie_counts = cookie_map[date]
+				date_cookie_counts[cookie] = date_cookie_counts.get(cookie, 0) + 1
+
+		# Decode the distinct cookies counted
+		return {date: {cookie.decode(): count for cookie, count in cookie_counts.items()} for date, cookie_counts in cookie_map.items()}, line_count
+
+
+	def _import_numpy(self):
+		'''
+		Imports NumPy on first use by the numpy engine, so that importing it does not slow down the start of the queries of the other engines
+		Input: NA
+		Output:
+			numpy::module -- the numpy module, None if NumPy is not installed
+		'''
+		try:
+			import numpy
+		except ImportError:
+			# NumPy is optional, the numpy engine falls back to the mmap engine without it
+			return None
+		return numpy
+
+
+	def _count_numpy_range(self, start, end, query_dates):
+		'''
+		Counts the cookies of the queried dates in a byte range of the cookie log file with NumPy, a block of lines at a time (see _count_numpy_block())
+		Input:
+			start::int -- byte offset of a line start
+			end::int -- byte offset of a line start (or the end of file) at which to stop
+			query_dates::set -- dates to count the cookies of, None to count all dates
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day
+			line_count::int -- number of non-blank lines read
+		'''
+		cookie_map = {}
+		line_count = 0
+		blocks = self._iter_byte_blocks(start, end)
+		if self.stats is not None:
+			blocks = self.stats.time_iterator("read", blocks)
+		for block in blocks:
+			if self.lone_carriage_return_pattern.search(block) is not None:
+				# "\r" is a line terminator in text mode, so such a block is read as text lines instead
+				block_cookie_map, block_line_count = self._count_cookies(self._split_block_lines(block), query_dates)
+			else:
+				# Lines of the block are parsed and counted at once, timed as parsing
+				with self._time_stage("parse"):
+					block_cookie_map, block_line_count = self._count_numpy_block(block, query_dates)
+			with self._time_stage("aggregate"):
+				self._merge_cookie_maps(cookie_map, block_cookie_map)
+			line_count += block_line_count
+		return cookie_map, line_count
+
+
+	def _count_numpy_block(self, block, query_dates):
+		'''
+		Counts the cookies of the queried dates in a block of lines with vectorized operations. Line boundaries, the first comma of each line and the timestamp fields are found and checked on arrays for all the lines at once, and the cookie characters for the lines of the queried dates. Lines in the common format (a valid cookie followed by a YYYY-MM-DDTHH:MM:SS+HH:MM timestamp with range checked fields and a valid date, without whitespaces) are accepted, every other line is decoded and parsed by _parse_entry(), so that the result is the same as with the text engine. Cookies of the queried dates are factorized into codes with numpy.unique(), and the (day, cookie code) pairs counted with numpy.unique() as well, keeping the order of first occurence
+		Input:
+			block::bytes or memoryview -- block of lines without lone "\r" line terminators
+			query_dates::set -- dates to count the cookies of, None to count all dates
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day
+			line_count::int -- number of non-blank lines read
+		'''
+		np = self._import_numpy()
+		epoch = datetime_date(1970, 1, 1)
+		template = np.frombuffer(self.timestamp_template, dtype=np.uint8)
+		# The block is padded so that a window of the longest cookie fits after any line start
+		block_size = len(block)
+		data = np.zeros(block_size + self.numpy_max_cookie_length, dtype=np.uint8)
+		data[:block_size] = np.frombuffer(block, dtype=np.uint8)
+
+		# Lines end at each newline, and at the end of the block if it does not end with a newline
+		newlines = np.flatnonzero(data[:block_size] == ord("\n"))
+		line_ends = newlines if block[-1:] == b"\n" else np.append(newlines, block_size)
+		line_starts = np.concatenate(([0], newlines + 1))[:len(line_ends)]
+		# "\r\n" line terminators
+		line_ends = line_ends - ((line_ends > line_starts) & (data[np.maximum(line_ends - 1, 0)] == ord("\r")))
+
+		# Candidate lines have a cookie of at most numpy_max_cookie_length bytes before their first comma, followed by a timestamp of the length of the common format
+		commas = np.flatnonzero(data[:block_size] == ord(","))
+		first_commas = np.append(commas, block_size)[np.searchsorted(commas, line_starts)]
+		cookie_lengths = first_commas - line_starts
+		fast = (first_commas < line_ends) & (line_ends - first_commas - 1 == len(template)) & (cookie_lengths > 0) & (cookie_lengths <= self.numpy_max_cookie_length)
+		rows = np.flatnonzero(fast)
+
+		# Timestamp fields, with the offset sign being "+" or "-" and the other separators as in the template
+		timestamps = np.lib.stride_tricks.sliding_window_view(data, len(template))[first_commas[rows] + 1]
+		digits = timestamps.astype(np.int32) - ord("0")
+		is_digit = template == ord("0")
+		is_separator = ~is_digit
+		is_separator[19] = False
+		valid = np.all((digits[:, is_digit] >= 0) & (digits[:, is_digit] <= 9), axis=1) & np.all(timestamps[:, is_separator] == template[is_separator], axis=1)
+		valid &= (timestamps[:, 19] == ord("+")) | (timestamps[:, 19] == ord("-"))
+		def field(position):
+			return digits[:, position] * 10 + digits[:, position + 1]
+		years, months, days = field(0) * 100 + field(2), field(5), field(8)
+		valid &= (field(11) <= 23) & (field(14) <= 59) & (field(17) <= 59) & (field(20) <= 23) & (field(23) <= 59)
+		# Calendar date, with the number of days of the month accounting for leap years
+		month_lengths = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[np.clip(months - 1, 0, 11)] + ((months == 2) & (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0)))
+		valid &= (years >= 1) & (months >= 1) & (months <= 12) & (days >= 1) & (days <= month_lengths)
+		fast[rows[~valid]] = False
+		rows, years, months, days = rows[valid], years[valid], months[valid], days[valid]
+		# Days since 1970-01-01
+		day_numbers = ((years - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (months - 1)).astype("datetime64[D]").astype(np.int64) + (days - 1)
+		# Every line with a valid timestamp is counted, whether its cookie is valid or not
+		line_count = len(rows)
+
+		queried_days = None if query_dates is None else np.array([(query_date - epoch).days for query_date in query_dates], dtype=np.int64)
+		if queried_days is not None and self.stats is None:
+			queried = np.isin(day_numbers, queried_days)
+			rows, day_numbers = rows[queried], day_numbers[queried]
+
+		# Every byte of the cookie is a cookie character
+		maximum_length = int(cookie_lengths[rows].max()) if len(rows) > 0 else 1
+		cookie_bytes = np.lib.stride_tricks.sliding_window_view(data, maximum_length)[line_starts[rows]].copy()
+		is_padding = np.arange(maximum_length) >= cookie_lengths[rows][:, None]
+		cookie_bytes[is_padding] = 0
+		is_cookie_character = np.zeros(256, dtype=bool)
+		is_cookie_character[np.frombuffer(self.cookie_characters, dtype=np.uint8)] = True
+		valid = np.all(is_cookie_character[cookie_bytes] | is_padding, axis=1)
+		# Lines with an invalid cookie are parsed by _parse_entry() below, which counts them again
+		line_count -= int(np.count_nonzero(~valid))
+		fast[rows[~valid]] = False
+		rows, day_numbers, cookie_bytes = rows[valid], day_numbers[valid], cookie_bytes[valid]
+		if queried_days is not None and self.stats is not None:
+			# The cookies of all the dates are checked, so that the lines with an invalid cookie are parsed above and their skip reasons counted
+			queried = np.isin(day_numbers, queried_days)
+			rows, day_numbers, cookie_bytes = rows[queried], day_numbers[queried], cookie_bytes[queried]
+
+		# Cookie codes
+		cookies, codes = np.unique(cookie_bytes.view(f"S{maximum_length}").ravel(), return_inverse=True)
+		cookies = [cookie.decode() for cookie in cookies.tolist()]
+
+		# Lines not in the common format
+		cookie_codes = None
+		slow_rows, slow_day_numbers, slow_codes = [], [], []
+		for row in np.flatnonzero(~fast).tolist():
+			entry = self._decode_line(block[line_starts[row]:line_ends[row]])
+			cookie, date, skip_reason = self._parse_entry(entry)
+			if skip_reason is not None:
+				line_count += self._count_skipped_entry(entry, skip_reason)
 				continue
-			items = self._preprocess_line(entry.split(",")[:2])
+			line_count += 1
+			if query_dates is not None and date not in query_dates:
+				continue
+			if cookie_codes is None:
+				cookie_codes = {cookie: code for code, cookie in enumerate(cookies)}
+			if cookie not in cookie_codes:
+				cookie_codes[cookie] = len(cookies)
+				cookies.append(cookie)
+			slow_rows.append(row)
+			slow_day_numbers.append((date - epoch).days)
+			slow_codes.append(cookie_codes[cookie])
+
+		rows = np.concatenate((rows, np.array(slow_rows, dtype=np.int64)))
+		day_numbers = np.concatenate((day_numbers, np.array(slow_day_numbers, dtype=np.int64)))
+		codes = np.concatenate((codes.ravel().astype(np.int64), np.array(slow_codes, dtype=np.int64)))
+
+		# Count the (day, cookie code) pairs in the order of the lines
+		order = np.argsort(rows, kind="stable")
+		keys = day_numbers[order] * max(1, len(cookies)) + codes[order]
+		keys, first_indices, counts = np.unique(keys, return_index=True, return_counts=True)
+		order = np.argsort(first_indices, kind="stable")
+		cookie_map = {}
+		dates = {}
+		for key, count in zip(keys[order].tolist(), counts[order].tolist()):
+			day_number, code = divmod(key, max(1, len(cookies)))
+			if day_number not in dates:
+				dates[day_number] = epoch + timedelta(days=day_number)
+				cookie_map[dates[day_number]] = {}
+			cookie_map[dates[day_number]][cookies[code]] = count
+		return cookie_map, line_count
+
+
+	def _count_regex_range(self, start, end, query_dates):
+		'''
+		Counts the cookies of the queried dates in a byte range of the cookie log file, a block of lines at a time (see _count_regex_block())
+		Input:
+			start::int -- byte offset of a line start
+			end::int -- byte offset of a line start (or the end of file) at which to stop
+			query_dates::set -- dates to count the cookies of, None to count all dates
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day
+			line_count::int -- number of non-blank lines read
+		'''
+		cookie_map = {}
+		line_count = 0
+		blocks = self._iter_byte_blocks(start, end)
+		if self.stats is not None:
+			blocks = self.stats.time_iterator("read", blocks)
+		for block in blocks:
+			if self.lone_carriage_return_pattern.search(block) is not None:
+				# "\r" is a line terminator in text mode, so such a block is read as text lines instead
+				block_cookie_map, block_line_count = self._count_cookies(self._split_block_lines(block), query_dates)
+			else:
+				# Lines of the block are extracted and counted at once, timed as parsing
+				with self._time_stage("parse"):
+					block_cookie_map, block_line_count = self._count_regex_block(block, query_dates)
+			with self._time_stage("aggregate"):
+				self._merge_cookie_maps(cookie_map, block_cookie_map)
+			line_count += block_line_count
+		return cookie_map, line_count
+
+
+	def _count_regex_block(self, block, query_dates):
+		'''
+		Counts the cookies of the queried dates in a block of lines with a single scan of byte_line_pattern, which extracts the (cookie, date prefix) pairs of the lines in the common format, and the other lines whole. The matches are counted with a Counter, keeping the order of first occurence, so that only the distinct pairs are decoded and the distinct other lines are parsed by _parse_entry(), the result being the same as with the text engine
+		Input:
+			block::bytes or memoryview -- block of lines without lone "\r" line terminators
+			query_dates::set -- dates to count the cookies of, None to count all dates
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day
+			line_count::int -- number of non-blank lines read
+		'''
+		matches = collections.Counter(self.byte_line_pattern.findall(block))
+		if block[-1:] == b"\n":
+			# The pattern also matches the empty string after the last line terminator, which is not a line
+			matches[(b"", b"", b"")] -= 1
 
-			# Check if the line has valid entries
-			if self._skip_entry(items):
+		cookie_map = {}
+		line_count = 0
+		decode_date_prefix = self.timestamp_decoder.decode_date_prefix
+		# Variable to memoize the day (or None if invalid) of each date prefix, the time and offset being range checked by the pattern
+		days = {}
+		for (cookie, date_prefix, line), count in matches.items():
+			if len(cookie) == 0:
+				# A line not in the common format
+				entry = self._decode_line(line)
+				cookie, date, skip_reason = self._parse_entry(entry)
+				if skip_reason is not None:
+					for _ in range(count):
+						line_count += self._count_skipped_entry(entry, skip_reason)
+					continue
+				line_count += count
+			else:
+				line_count += count
+				if date_prefix not in days:
+					days[date_prefix] = decode_date_prefix(date_prefix)
+				date = days[date_prefix]
+				if date is None:
+					if self.stats is not None:
+						for _ in range(count):
+							self.stats.add_skip(self.SKIP_BAD_TIMESTAMP, False)
+					continue
+				cookie = cookie.decode()
+			if query_dates is not None and date not in query_dates:
 				continue
+			if date not in cookie_map:
+				cookie_map[date] = {}
+			# A cookie of a line not in the common format may also be in lines in the common format
+			cookie_map[date][cookie] = cookie_map[date].get(cookie, 0) + count
+		return cookie_map, line_count
+
 
-			cookie = items[0]
-			date = self._process_date(items[1])
-			
+	def _merge_cookie_maps(self, cookie_map, other_cookie_map):
+		'''
+		Adds the counts of a cookie map to another one. Merging the cookie maps of consecutive parts of the logfile in order keeps the cookies in the order of their first occurence in the logfile
+		Input:
+			cookie_map::dict -- date to cookie map to add the counts to
+			other_cookie_map::dict -- date to cookie map of the counts to add
+		Output:
+			cookie_map::dict -- the updated cookie_map
+		'''
+		for date, cookie_counts in other_cookie_map.items():
 			if date not in cookie_map.keys():
-				cookie_map[date] = {}
-			if cookie not in cookie_map[date].keys():
-				cookie_map[date][cookie] = 0
-			cookie_map[date][cookie] += 1
+				cookie_map[date] = cookie_counts
+				continue
+			date_cookie_counts = cookie_map[date]
+			for cookie, count in cookie_counts.items():
+				date_cookie_counts[cookie] = date_cookie_counts.get(cookie, 0) + count
+		return cookie_map
+
+
+	def _count_parallel(self, query_dates):
+		'''
+		Counts the cookies of the queried dates by splitting the logfile into chunks aligned to line starts, which are scanned by a pool of self.workers processes. The counts of the chunks are merged in the order of the logfile, giving the same result as a serial scan
+		Input:
+			query_dates::set -- dates to count the cookies of, None to count all dates
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day
+			line_count::int -- number of non-blank lines read
+		'''
+		cookie_map = {}
+		line_count = 0
+		# A few chunks per worker balance the load in case the chunks are not equally costly to parse
+		chunk_ranges = self._get_chunk_ranges(self.workers * 4)
+		# The statistics of the workers are sent back along with their counts
+		count_range = self._count_byte_range if self.stats is None else functools.partial(self._run_with_stats, "_count_byte_range")
+		with multiprocessing.Pool(min(self.workers, len(chunk_ranges))) as pool:
+			for result in pool.starmap(count_range, [(start, end, query_dates) for start, end in chunk_ranges]):
+				if self.stats is not None:
+					result, worker_stats = result
+					self.stats.merge(worker_stats)
+				chunk_cookie_map, chunk_line_count = result
+				with self._time_stage("aggregate"):
+					self._merge_cookie_maps(cookie_map, chunk_cookie_map)
+				line_count += chunk_line_count
+		return cookie_map, line_count
+
+
+	def _count_indexed_range(self, file_pointer, start, end, cookie_map, day_ranges):
+		'''
+		Counts the cookies of all dates in a byte range of the cookie log file, also recording the byte range of the lines of each date
+		Input:
+			file_pointer::file -- cookie log file opened in binary mode
+			start::int -- byte offset of a line start
+			end::int -- byte offset at which to stop
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day, updated with the counts of the byte range
+			day_ranges::dict -- date to [start offset, end offset] of the lines of that date, updated with the lines of the byte range
+		Output:
+			line_count::int -- number of non-blank lines read
+		'''
+		line_count = 0
+		if self.stats is not None:
+			self.stats.byte_count += max(0, end - start)
+		file_pointer.seek(start)
+		offset = start
+		# Lines are read, parsed and counted in a fused loop, timed as parsing
+		with self._time_stage("parse"):
+			for line in file_pointer:
+				if offset >= end:
+					break
+				line = line[:end - offset]
+				next_offset = offset + len(line)
+				for entry in self._split_block_lines(line):
+					cookie, date, skip_reason = self._parse_entry(entry)
+					if skip_reason is not None:
+						line_count += self._count_skipped_entry(entry, skip_reason)
+						continue
+					line_count += 1
+
+					if date not in cookie_map.keys():
+						cookie_map[date] = {}
+						day_ranges[date] = [offset, next_offset]
+					if cookie not in cookie_map[date].keys():
+						cookie_map[date][cookie] = 0
+					cookie_map[date][cookie] += 1
+					day_ranges[date] = [min(day_ranges[date][0], offset), max(day_ranges[date][1], next_offset)]
+				offset = next_offset
+		return line_count
+
+
+	def _get_complete_lines_end(self, file_pointer, start, end):
+		'''
+		Finds the end of the last complete (newline terminated) line in a byte range of the cookie log file. Like the text mode in which _iter_logfile() reads, "\r" is also a line terminator
+		Input:
+			file_pointer::file -- cookie log file opened in binary mode
+			start::int -- byte offset of a line start
+			end::int -- byte offset at which to stop
+		Output:
+			offset::int -- byte offset just after the last newline (or "\r") in the byte range, start if there is none
+		'''
+		block_end = end
+		while block_end > start:
+			block_start = max(start, block_end - self.block_size)
+			file_pointer.seek(block_start)
+			last_newline = self._get_last_line_end(file_pointer.read(block_end - block_start))
+			if last_newline > 0:
+				return block_start + last_newline
+			block_end = block_start
+		return start
+
+
+	def _update_index(self, index):
+		'''
+		Brings the sidecar index of the cookie log file up to date. If the index is loaded and the indexed prefix of the logfile is unchanged, only the complete lines appended after the indexed offset are parsed and their counts added to the index, else the index is built from scratch. A trailing line without a newline (possibly still being written) is not indexed
+		Input:
+			index::CookieLogIndex -- index to update
+		Output:
+			cookie_map::dict -- date to cookie map of the dates which changed, along with number of occurences of each cookie on a given day
+		'''
+		loaded = index.load(self.filepath)
+		if loaded and self.stats is not None:
+			# The lines counted in the index are not parsed again, so why they were skipped is unknown
+			self.stats.skip_counts_known = False
+		with open(self.filepath, "rb") as file_pointer:
+			start = index.signature["offset"] if loaded else self._get_data_offset(file_pointer)
+			file_size = file_pointer.seek(0, os.SEEK_END)
+			end = self._get_complete_lines_end(file_pointer, start, file_size)
+			if loaded and end == start:
+				return {}
+
+			cookie_map = {}
+			day_ranges = {}
+			line_count = self._count_indexed_range(file_pointer, start, end, cookie_map, day_ranges)
+
+		if loaded:
+			# Add the counts and byte ranges of the appended lines to those of the index
+			appended_day_ranges = day_ranges
+			day_ranges = {date: day["range"] for date, day in index.days.items()}
+			for date, (range_start, range_end) in appended_day_ranges.items():
+				if date in day_ranges:
+					cookie_map[date] = self._merge_cookie_maps({date: index.get_day_counts(date)}, {date: cookie_map[date]})[date]
+					range_start, range_end = min(day_ranges[date][0], range_start), max(day_ranges[date][1], range_end)
+				day_ranges[date] = [range_start, range_end]
+			line_count += index.line_count
+
+		index.save(index.get_signature(self.filepath, end), line_count, day_ranges, cookie_map)
+		return cookie_map
+
+
+	def _add_distinct_cookie(self, date, cookie):
+		'''
+		Adds a cookie to the HyperLogLog sketch of the distinct cookies of its date
+		Input:
+			date::datetime.date -- date of the cookie
+			cookie::str -- cookie string
+		Output: NA
+		'''
+		if date not in self.distinct_map:
+			self.distinct_map[date] = HyperLogLog()
+		self.distinct_map[date].add(cookie)
+		return
+
+
+	def _update_distinct_map(self, cookie_map):
+		'''
+		Adds the cookies of the complete cookie counts of each date to the HyperLogLog sketches of the distinct cookies, for the dates whose sketches were not updated during the scan (i.e. which were counted exactly)
+		Input:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day
+		Output: NA
+		'''
+		for date, cookie_counts in cookie_map.items():
+			if date in self.distinct_map:
+				continue
+			sketch = self.distinct_map[date] = HyperLogLog()
+			for cookie in cookie_counts:
+				sketch.add(cookie)
+		return
+
+
+	def get_distinct_cookie_counts(self):
+		'''
+		Returns the estimated number of distinct cookies of each queried date, from the HyperLogLog sketches updated by the last count of the logfile (e.g. by get_most_active_cookie()) if self.distinct is set
+		Input: NA
+		Output:
+			distinct_cookie_counts::dict -- queried date to estimated number of distinct cookies, in the order of self.query_dates
+		'''
+		return {query_date: self.distinct_map[query_date].estimate() if query_date in self.distinct_map else 0 for query_date in self.query_dates}
+
+
+	def _count_with_memory_budget(self, query_dates, top=None):
+		'''
+		Counts the cookies of the queried dates of the logfile(s) exactly within self.memory_budget with a CookiePartitioner, which spills the counts to hash partitioned temporary files (next to the logfile) once the budget is reached. Only the candidates of each date are returned, which give the same most active cookies (or top cookies) as the complete counts
+		Input:
+			query_dates::set -- dates to count the cookies of
+			top::int (default=None) -- number of top cookies to be extracted from the counts, None if only the most active cookies are
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each candidate cookie on a given day
+			line_count::int -- number of non-blank lines read
+		'''
+		partitioner = CookiePartitioner(self.memory_budget, top, os.path.dirname(self.filepath))
+		line_count = 0
+		lines, parse_entry = self._instrument_lines(self._iter_logfiles())
+		for entry in lines:
+			cookie, date, skip_reason = parse_entry(entry)
+			if skip_reason is not None:
+				line_count += self._count_skipped_entry(entry, skip_reason)
+				continue
+			line_count += 1
+			if date in query_dates:
+				partitioner.add(date, cookie)
+				if self.distinct:
+					# Only the candidates are kept, so the cookies are counted as they are read
+					self._add_distinct_cookie(date, cookie)
+		return partitioner.get_cookie_map(), line_count
+
+
+	def _count_with_index(self, query_dates):
+		'''
+		Counts the cookies of the queried dates from the sidecar index of the cookie log file (self.index_path). The index is built first if it does not exist or the logfile has changed, or updated with only the lines appended to the logfile since it was last indexed
+		Input:
+			query_dates::set -- dates to count the cookies of
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on the queried dates
+			line_count::int -- number of non-blank lines of the logfile
+		'''
+		index = CookieLogIndex(self.index_path)
+		changed_cookie_map = self._update_index(index)
+		cookie_map = {date: changed_cookie_map[date] if date in changed_cookie_map else index.get_day_counts(date) for date in index.days.keys() if date in query_dates}
+		line_count = index.line_count
+
+		# Count the trailing line without a newline, which is not indexed
+		with open(self.filepath, "rb") as file_pointer:
+			file_size = file_pointer.seek(0, os.SEEK_END)
+			if index.signature["offset"] < file_size:
+				trailing_cookie_map = {}
+				line_count += self._count_indexed_range(file_pointer, index.signature["offset"], file_size, trailing_cookie_map, {})
+				self._merge_cookie_maps(cookie_map, {date: cookie_counts for date, cookie_counts in trailing_cookie_map.items() if date in query_dates})
+
+		return cookie_map, line_count
+
+
+	def _build_cache(self, cache):
+		'''
+		Converts the cookie log file into the columnar binary cache, assigning each cookie an id in the order of first occurence and grouping the cookie ids of the rows by day
+		Input:
+			cache::CookieLogCache -- cache to write
+		Output: NA
+		'''
+		signature = cache.get_signature(self.filepath)
+		cookie_ids = {}
+		day_ids = {}
+		line_count = 0
+
+		lines, parse_entry = self._instrument_lines(self._iter_logfile())
+		with self._time_stage("aggregate", ["read", "parse"]):
+			for entry in lines:
+				cookie, date, skip_reason = parse_entry(entry)
+				if skip_reason is not None:
+					line_count += self._count_skipped_entry(entry, skip_reason)
+					continue
+				line_count += 1
+
+				if cookie not in cookie_ids:
+					cookie_ids[cookie] = len(cookie_ids)
+				if date not in day_ids:
+					day_ids[date] = array("I")
+				day_ids[date].append(cookie_ids[cookie])
+
+		cache.write(signature, line_count, day_ids, list(cookie_ids.keys()))
+		return
+
+
+	def _count_with_cache(self, query_dates):
+		'''
+		Counts the cookies of the queried dates from the columnar binary cache of the cookie log file (self.cache_path), without parsing the logfile. The cache is converted first if it does not exist or the logfile has changed
+		Input:
+			query_dates::set -- dates to count the cookies of
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on the queried dates
+			line_count::int -- number of non-blank lines of the logfile
+		'''
+		cache = CookieLogCache(self.cache_path)
+		if not(cache.load(self.filepath)):
+			self._build_cache(cache)
+			cache.load(self.filepath)
+		elif self.stats is not None:
+			# The lines counted in the cache are not parsed again, so why they were skipped is unknown
+			self.stats.skip_counts_known = False
+		try:
+			return {date: cache.get_day_counts(date) for date in cache.days.keys() if date in query_dates}, cache.line_count
+		finally:
+			cache.close()
+
 
-		# print(cookie_map[self.query_date])
-		if self.query_date not in cookie_map.keys():
+	def _get_cookie_map(self, query_dates, top=None):
+		'''
+		Counts the cookies of all the queried dates in a single pass over the logfile(s) (or from the sidecar index or the columnar binary cache, or with a binary search for each date if the logfile is sorted)
+		Input:
+			query_dates::list -- queried dates
+			top::int (default=None) -- number of top cookies to be extracted from the counts, None if only the most active cookies are. With a memory budget, only the cookies which may be extracted are counted
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on the queried dates, None if the logfile is empty
+		'''
+		# The sketches of the distinct cookies are updated during the scan if the counts do not keep all the cookies, else from the counts below
+		self.distinct_map = {}
+
+		with self._time_stage("count"):
+			if len(self.filepaths) > 1 and (self.use_index or self.use_cache or not(self.approx or self.memory_budget is not None)):
+				# Count each logfile on its own and merge the counts
+				cookie_map, line_count = self._count_logfiles(set(query_dates), top)
+			else:
+				cookie_map, line_count = self._count_logfile(query_dates, top)
+		if self.stats is not None:
+			self.stats.add_lines(line_count)
+		if line_count == 0:
+			# raise CustomError("Input cookie logfile is empty!")
+			print("ERROR: Input cookie logfile is empty!")
+			return None
+
+		if self.distinct:
+			self._update_distinct_map(cookie_map)
+		return cookie_map
+
+
+	def _count_logfile(self, query_dates, top=None):
+		'''
+		Counts the cookies of all the queried dates of the logfile (or of all the logfiles read one after the other in approx or memory budget mode), with the method selected by the options
+		Input:
+			query_dates::list -- queried dates
+			top::int (default=None) -- number of top cookies to be extracted from the counts, None if only the most active cookies are
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on the queried dates
+			line_count::int -- number of non-blank lines read, None if only the blocks of the queried dates of a sorted logfile were read
+		'''
+		# A compressed logfile (or a stream) has no byte offsets to index, binary search or split into chunks, and is streamed by the text engine
+		compressed = CookieLogDecompressor.get_compression(self.filepath) is not None or self.stream is not None
+
+		if self.use_index:
+			# Counts are read from the sidecar index, which is built on first use
+			return self._count_with_index(set(query_dates))
+		if self.use_cache:
+			# Counts are read from the columnar binary cache, which is built on first use
+			return self._count_with_cache(set(query_dates))
+
+		if self.sorted_log and len(self.filepaths) == 1 and not(compressed):
+			# Only the block of each queried date is read. None is returned if the logfile is found to be not sorted, in which case a full scan is performed below
+			cookie_map = {}
+			for query_date in query_dates:
+				date_cookie_map = self._count_sorted_logfile(query_date)
+				if date_cookie_map is None:
+					cookie_map = None
+					break
+				cookie_map.update(date_cookie_map)
+			if cookie_map is not None:
+				return cookie_map, None
+
+		if self.memory_budget is not None and not(self.approx):
+			# Aggregate the whole cookie logfile within the memory budget, spilling to partition files
+			# The lines are read and parsed in the loop of the partitioner, the rest of which is aggregation
+			with self._time_stage("aggregate", ["read", "parse"]):
+				return self._count_with_memory_budget(set(query_dates), top)
+		if self.workers > 1 and not(self.approx) and not(compressed):
+			# Scan chunks of the whole cookie logfile in parallel. Sketches are not merged, so the logfile is scanned serially in approx mode
+			return self._count_parallel(set(query_dates))
+		if self.engine == "text" or self.low_memory or self.approx or compressed:
+			# Stream the whole cookie logfile
+			return self._count_cookies(self._iter_logfiles(), set(query_dates))
+		# Scan the whole cookie logfile as a single byte range
+		return self._count_byte_range(*self._get_chunk_ranges(1)[0], set(query_dates))
+
+
+	def _count_file(self, filepath, query_dates, top=None):
+		'''
+		Counts the cookies of all the queried dates of one of the logfiles, in a worker process
+		Input:
+			filepath::str -- path of the cookie logfile
+			query_dates::set -- queried dates
+			top::int (default=None) -- number of top cookies to be extracted from the counts, None if only the most active cookies are
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on the queried dates
+			line_count::int -- number of non-blank lines read, None if only the blocks of the queried dates of a sorted logfile were read
+		'''
+		return self._for_logfile(filepath)._count_logfile(query_dates, top)
+
+
+	def _count_logfiles(self, query_dates, top=None):
+		'''
+		Counts the cookies of the queried dates of each logfile on its own, by a pool of self.workers processes, and merges the counts in the order of self.filepaths, giving the same result as counting the concatenated logfiles. The counts of a logfile are merged as soon as they are available, so that the counts of at most a few logfiles are held in memory besides the merged counts
+		Input:
+			query_dates::set -- queried dates
+			top::int (default=None) -- number of top cookies to be extracted from the counts, None if only the most active cookies are
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on the queried dates
+			line_count::int -- number of non-blank lines read, None if unknown for one of the logfiles
+		'''
+		cookie_map = {}
+		line_count = 0
+		pool = multiprocessing.Pool(min(self.workers, len(self.filepaths))) if self.workers > 1 else None
+		# The statistics of the workers are sent back along with their counts, while the copies of the processor counting serially share its statistics
+		with_stats = pool is not None and self.stats is not None
+		count_file = functools.partial(self._run_with_stats, "_count_file") if with_stats else self._count_file
+		count_file = functools.partial(count_file, query_dates=query_dates, top=top)
+		try:
+			# Logfiles are sent to the workers in batches, as there may be thousands of small logfiles
+			for result in (pool.imap(count_file, self.filepaths, chunksize=max(1, len(self.filepaths) // (self.workers * 4))) if pool is not None else map(count_file, self.filepaths)):
+				if with_stats:
+					result, worker_stats = result
+					self.stats.merge(worker_stats)
+				file_cookie_map, file_line_count = result
+				with self._time_stage("aggregate"):
+					self._merge_cookie_maps(cookie_map, file_cookie_map)
+				line_count = None if line_count is None or file_line_count is None else line_count + file_line_count
+		finally:
+			if pool is not None:
+				pool.terminate()
+		return cookie_map, line_count
+
+
+	def _get_most_active_from_counts(self, cookie_counts):
+		'''
+		Extracts all the cookies tied for the highest number of occurences from the cookie counts of a date in linear time, without sorting or copying the counts. Tied cookies are in the order of their first occurence in the logfile
+		Input:
+			cookie_counts::dict -- cookie to number of occurences map of a date (in the order of first occurence)
+		Output:
+			most_active_cookies::list -- containing all cookies with the highest number of occurences
+		'''
+		if len(cookie_counts) == 0:
 			# This condition will be satisfied when there are no cookies corresponding to the queried date in the log file
 			# In that case just return empty list
-			return most_active_cookies
+			return []
 
-		# Sort the sub-dictionary within the cookie_map corresponding to the query date based on values of sub-dictionary in descending order
-		sorted_cookie_map = self._get_sorted_mapping(cookie_map[self.query_date], reverse_ordering=True)
+		# Extract the count of the highest occurences of any cookie on the date
+		highest_frequency = max(cookie_counts.values())
 
-		# Extract the count of the highest occurences of any cookie on the queried date
-		highest_frequency = self._get_maximum_dict_value(sorted_cookie_map)
-		
 		# Collecting all cookies whose frequency of occurence is equal to the highest_frequency
-		for cookie_key in sorted_cookie_map.keys():
-			if int(sorted_cookie_map[cookie_key]) == highest_frequency:
-				most_active_cookies.append(cookie_key)
-			else:
-				break;
+		return [cookie for cookie, count in cookie_counts.items() if count == highest_frequency]
+
+
+	def _get_top_from_counts(self, cookie_counts, top):
+		'''
+		Extracts the top cookies by number of occurences from the cookie counts of a date using a heap, i.e. in O(n log top) time. Cookies with the same number of occurences are in the order of their first occurence in the logfile
+		Input:
+			cookie_counts::dict -- cookie to number of occurences map of a date (in the order of first occurence)
+			top::int -- number of cookies to extract
+		Output:
+			top_cookies::list -- (cookie, count) tuples in descending order of count
+		'''
+		# heapq.nlargest() is equivalent to a stable sort in descending order, hence ties keep the order of first occurence
+		return heapq.nlargest(top, cookie_counts.items(), key=operator.itemgetter(1))
+
+
+	def get_most_active_cookie(self):
+		'''
+		Extracts the most active cookie from the logfile corresponding to the queried date (i.e., self.query_date)
+		Input: NA
+		Output: 
+			most_active_cookies::list -- containing all most active cookies corresponding to the input query date
+		'''
+		cookie_map = self._get_cookie_map([self.query_date])
+		if cookie_map is None:
+			return []
+		with self._time_stage("extract"):
+			return self._get_most_active_from_counts(cookie_map.get(self.query_date, {}))
+
+
+	def get_most_active_cookies(self):
+		'''
+		Extracts the most active cookies from the logfile corresponding to each of the queried dates (i.e., self.query_dates) in a single scan of the logfile
+		Input: NA
+		Output:
+			most_active_cookies::dict -- queried date to list of all most active cookies on that date, in the order of self.query_dates
+		'''
+		cookie_map = self._get_cookie_map(self.query_dates)
+		if cookie_map is None:
+			cookie_map = {}
+		with self._time_stage("extract"):
+			return {query_date: self._get_most_active_from_counts(cookie_map.get(query_date, {})) for query_date in self.query_dates}
 
-		return most_active_cookies
+
+	def get_top_cookies(self, top=None):
+		'''
+		Extracts the top cookies by number of occurences from the logfile corresponding to each of the queried dates (i.e., self.query_dates) in a single scan of the logfile
+		Input:
+			top::int (default=None) -- number of cookies to extract for each date, self.top if None
+		Output:
+			top_cookies::dict -- queried date to list of (cookie, count) tuples in descending order of count, in the order of self.query_dates
+		'''
+		top = self.top if top is None else top
+		cookie_map = self._get_cookie_map(self.query_dates, top)
+		if cookie_map is None:
+			cookie_map = {}
+		with self._time_stage("extract"):
+			return {query_date: self._get_top_from_counts(cookie_map.get(query_date, {}), top) for query_date in self.query_dates}
+
+
+	def _get_results_from_counts(self, cookie_map, query_dates):
+		'''
+		Extracts the most active cookies (or the top cookies along with their counts if self.top is set) of the given dates from the cookie counts
+		Input:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on a given day
+			query_dates::list -- dates to extract the cookies of
+		Output:
+			results::dict -- date to list of most active cookies (or of (cookie, count) tuples)
+		'''
+		with self._time_stage("extract"):
+			if self.top is not None:
+				return {query_date: self._get_top_from_counts(cookie_map.get(query_date, {}), self.top) for query_date in query_dates}
+			return {query_date: self._get_most_active_from_counts(cookie_map.get(query_date, {})) for query_date in query_dates}
+
+
+	def get_stats(self):
+		'''
+		Returns the statistics collected over the queries of the processor if args.stats was set (see CookieLogStats.to_dict())
+		Input: NA
+		Output:
+			stats::dict -- seconds spent in each stage, lines read, accepted, skipped by reason and blank, and bytes processed, None if statistics are not enabled
+		'''
+		if self.stats is None:
+			return None
+		return self.stats.to_dict()
+
+
+	def _format_results(self, results):
+		'''
+		Formats the most active cookies (or the top cookies) of the queried dates into output lines. In case of multiple queried dates, each cookie is prefixed with its date as "date,cookie". If self.top is set, the top cookies are formatted along with their counts as "cookie,count" (or "date,cookie,count")
+		Input:
+			results::dict -- queried date to list of most active cookies (or of (cookie, count) tuples if self.top is set)
+		Output:
+			lines::list -- output lines
+		'''
+		lines = []
+		for query_date, cookies in results.items():
+			for cookie in cookies:
+				line = ",".join(map(str, cookie)) if self.top is not None else cookie
+				lines.append(line if len(self.query_dates) == 1 else f"{query_date.isoformat()},{line}")
+		return lines
 
 
 	def print_most_active_cookie(self):
 		'''
-		Prints the most active cookie values
+		Prints the most active cookie values. In case of multiple queried dates, each cookie is printed along with its date as "date,cookie". If self.top is set, the top cookies are printed along with their counts as "cookie,count" (or "date,cookie,count"). In approx mode, the error guarantees of each date are printed to stderr (see _format_approx_guarantees()), as well as the estimated number of distinct cookies of each date if self.distinct is set, and the statistics of the query as JSON if they are enabled
 		Input: NA
 		Output: NA
 		'''
-		cookies = self.get_most_active_cookie()
-		for cookie in cookies:
-			print(cookie)
-		return
\ No newline at end of file
+		if self.approx:
+			cookie_map = self._get_cookie_map(self.query_dates, self.top) or {}
+			results = self._get_results_from_counts(cookie_map, self.query_dates)
+		elif self.top is not None:
+			results = self.get_top_cookies()
+		elif len(self.query_dates) == 1:
+			results = {self.query_date: self.get_most_active_cookie()}
+		else:
+			results = self.get_most_active_cookies()
+
+		for line in self._format_results(results):
+			print(line)
+		if self.approx:
+			# The guarantees are printed to stderr so that the output format is unchanged
+			for line in self._format_approx_guarantees(cookie_map, results):
+				print(line, file=sys.stderr)
+		if self.distinct:
+			for query_date, distinct_cookie_count in self.get_distinct_cookie_counts().items():
+				print(f"{query_date.isoformat()}: {distinct_cookie_count} distinct cookies (estimated)", file=sys.stderr)
+		if self.stats is not None:
+			print(json.dumps(self.get_stats()), file=sys.stderr)
+		return
+
+
+	def _format_approx_guarantees(self, cookie_map, results):
+		'''
+		Formats the error guarantees of the most active cookies (or the top cookies) of the queried dates extracted in approx mode, one line per date stating whether the extracted cookies are provably exact or else by how much their counts may be overestimated
+		Input:
+			cookie_map::dict -- date to CookieSketch (or cookie map) of the queried dates
+			results::dict -- queried date to list of most active cookies (or of (cookie, count) tuples if self.top is set)
+		Output:
+			lines::list -- output lines
+		'''
+		lines = []
+		for query_date, cookies in results.items():
+			sketch = cookie_map.get(query_date)
+			if self.top is not None:
+				cookies = [cookie for cookie, _ in cookies]
+			if not(isinstance(sketch, CookieSketch)) or sketch.is_exact(cookies):
+				lines.append(f"{query_date.isoformat()}: exact")
+			else:
+				lines.append(f"{query_date.isoformat()}: approximate, counts may be overestimated by up to {sketch.get_error_bound()} of {sketch.total} occurences ({sketch.capacity} cookies tracked)")
+		return lines
+
+
+	def _open_followed_logfile(self):
+		'''
+		Opens the followed cookie log file in binary mode at its beginning, so that its header is skipped by _read_followed_lines()
+		Input: NA
+		Output: NA
+		'''
+		self.follow_file = open(self.filepath, "rb")
+		self.follow_header_pending = True
+		return
+
+
+	def _read_followed_lines(self):
+		'''
+		Reads the complete (terminated by "\n", "\r\n" or "\r") lines of the followed cookie log file from the current position, skipping the header (and blank lines before it) if it has not been read yet. The position is left after the last complete line, so that a line which is still being written is read once it is complete. A "\r" at the end of the file may be the first half of a "\r\n", so the line it ends is read once more bytes are appended
+		Input: NA
+		Output:
+			line::str -- generator yielding each complete line read (ignoring the header)
+		'''
+		partial_line = b""
+		while True:
+			block = self.follow_file.read(self.block_size)
+			if len(block) == 0:
+				break
+			block = partial_line + block
+			last_line_end = self._get_last_line_end(block)
+			block, partial_line = block[:last_line_end], block[last_line_end:]
+			for line in self._split_block_lines(block):
+				if self.follow_header_pending:
+					# Blank lines before the header are ignored, same as in _iter_logfile()
+					if not(self._is_empty_string(line.strip())):
+						self.follow_header_pending = False
+					continue
+				yield line
+		self.follow_file.seek(-len(partial_line), os.SEEK_CUR)
+
+
+	def _poll_followed_logfile(self, cookie_map):
+		'''
+		Counts the cookies of the queried dates in the lines appended to the followed cookie log file since the last poll, like tail -F. If the logfile has been rotated (replaced by a new file), the rest of the old file is read before following the new file from its beginning. If the logfile has been truncated in place, it is read again from its beginning. Counts are never reset, so they cover all the lines read since following began
+		Input:
+			cookie_map::dict -- date to cookie map along with number of occurences of each cookie on the queried dates, updated with the counts of the appended lines
+		Output:
+			changed_dates::set -- queried dates whose counts changed
+		'''
+		changed_dates = set()
+
+		def count(lines):
+			appended_cookie_map, _ = self._count_cookies(lines, set(self.query_dates))
+			self._merge_cookie_maps(cookie_map, appended_cookie_map)
+			changed_dates.update(appended_cookie_map.keys())
+
+		count(self._read_followed_lines())
+
+		try:
+			stat = os.stat(self.filepath)
+		except OSError:
+			# The logfile is being rotated, the new file is followed once it is created
+			return changed_dates
+
+		follow_stat = os.fstat(self.follow_file.fileno())
+		if (stat.st_dev, stat.st_ino) != (follow_stat.st_dev, follow_stat.st_ino):
+			# Rotated: lines appended to the old file before the rotation are read, including a last line without a newline
+			count(self._read_followed_lines())
+			last_line = self.follow_file.read()
+			if len(last_line) > 0 and not(self.follow_header_pending):
+				count(self._split_lines(last_line))
+			self.follow_file.close()
+			self._open_followed_logfile()
+			count(self._read_followed_lines())
+		elif stat.st_size < self.follow_file.tell():
+			# Truncated in place
+			self.follow_file.seek(0)
+			self.follow_header_pending = True
+			count(self._read_followed_lines())
+
+		return changed_dates
+
+
+	def follow_most_active_cookie(self, max_polls=None, poll_interval=None):
+		'''
+		Follows the cookie log file as lines are appended to it (also across rotations, like tail -F), keeping the cookie counts of the queried dates in memory and updating them with the appended lines only. The most active cookies (or the top cookies if self.top is set) are printed, in the same format as print_most_active_cookie(), whenever they change or every self.follow_interval seconds. Consecutive outputs are separated by a blank line
+		Input:
+			max_polls::int (default=None) -- number of polls after which to stop, None to follow until interrupted
+			poll_interval::float (default=None) -- number of seconds to wait between polls, self.follow_poll_interval if None
+		Output: NA
+		'''
+		if len(self.filepaths) > 1:
+			raise CustomError("ERROR: Only a single cookie log file can be followed!")
+		if CookieLogDecompressor.get_compression(self.filepath) is not None:
+			raise CustomError("ERROR: A compressed cookie log file can not be followed!")
+		if self.stream is not None:
+			raise CustomError("ERROR: A stream can not be followed!")
+		poll_interval = self.follow_poll_interval if poll_interval is None else poll_interval
+		cookie_map = {}
+		results = None
+		last_print_time = None
+		polls = 0
+
+		self._open_followed_logfile()
+		try:
+			while True:
+				changed_dates = self._poll_followed_logfile(cookie_map)
+				polls += 1
+
+				# Only the results of the dates whose counts changed are extracted again
+				if results is None:
+					new_results = self._get_results_from_counts(cookie_map, self.query_dates)
+				else:
+					new_results = {**results, **self._get_results_from_counts(cookie_map, [query_date for query_date in self.query_dates if query_date in changed_dates])}
+				interval_elapsed = results is not None and self.follow_interval is not None and time.monotonic() - last_print_time >= self.follow_interval
+				if new_results != results or interval_elapsed:
+					lines = self._format_results(new_results)
+					if results is not None:
+						lines.insert(0, "")
+					if len(lines) > 0:
+						print("\n".join(lines), flush=True)
+					results = new_results
+					last_print_time = time.monotonic()
+
+				if max_polls is not None and polls >= max_polls:
+					break
+				time.sleep(poll_interval)
+		finally:
+			self.follow_file.close()
+		return
@@ -0,0 +1,276 @@
+from argparse import Namespace
+import asyncio
+import json
+import os
+import urllib.parse
+
+from InputValidator import InputValidator
+from CustomError import CustomError
+from CookieLogProcessor import CookieLogProcessor
+from CookieLogIndex import CookieLogIndex
+from CookieLogDecompressor import CookieLogDecompressor
+
+
+
+class CookieLogServer():
+	'''
+	Class to serve most active cookie queries of a cookie log file from an asyncio event loop, over a Unix socket or HTTP on localhost.
+	The cookie counts of all the dates of the logfile are aggregated once and kept in memory. They are reloaded when the logfile changes, by parsing only the appended lines if the logfile has only grown.
+	'''
+
+	# Host the HTTP server is bound to
+	http_host = "127.0.0.1"
+
+	# Maximum size of a request line (Unix socket) or request head (HTTP)
+	max_request_size = 1 << 16
+
+	def __init__(self, args):
+		'''
+		Class constructor to validate command line arguments and create the processor of the served logfile
+		Input:
+			args::namespace -- command line arguments
+			args.logfilename::str -- cookie log filename
+			args.serve::str -- address to serve on, "unix:PATH" or "http:PORT" (0 for any free port)
+			args.engine::str (optional, default="text") -- engine to scan the logfile with, one of CookieLogProcessor.engines
+		'''
+		validation_flag, error_message = InputValidator().validate_address(args.serve)
+		if not(validation_flag):
+			raise CustomError(f"Class::CookieLogServer() creation failed: {error_message}")
+		self.scheme, _, self.location = args.serve.strip().partition(":")
+		self.engine = getattr(args, "engine", None)
+		self.processor = CookieLogProcessor(Namespace(logfilename=args.logfilename, date=None, all_dates=True, engine=self.engine))
+		if len(self.processor.filepaths) > 1:
+			raise CustomError("Class::CookieLogServer() creation failed: ERROR: Only a single cookie log file can be served!")
+		if CookieLogDecompressor.get_compression(self.processor.filepath) is not None:
+			raise CustomError("Class::CookieLogServer() creation failed: ERROR: A compressed cookie log file can not be served!")
+		if self.processor.stream is not None:
+			raise CustomError("Class::CookieLogServer() creation failed: ERROR: A stream can not be served!")
+		# Variable to store the cookie counts of all the dates of the complete (newline terminated) lines of the logfile
+		self.cookie_map = {}
+		# Variable to store the cookie counts of the last line of the logfile if it has no newline, which are recounted on every reload
+		self.trailing_cookie_map = {}
+		# Variable to store the number of non-blank lines of the logfile
+		self.line_count = 0
+		# Variable to store the device, inode, size, mtime (in nanoseconds), loaded offset and prefix digest of the logfile when it was loaded, None if it is not loaded yet
+		self.signature = None
+		# Port the HTTP server is bound to, once started
+		self.port = None
+		self.server = None
+		self.reload_lock = None
+
+
+	def _get_stat_key(self, stat):
+		'''
+		Returns the part of the stat of the logfile which changes whenever the logfile changes
+		Input:
+			stat::os.stat_result -- stat of the logfile
+		Output: (device, inode, size, mtime in nanoseconds) tuple
+		'''
+		return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+	def _is_changed(self):
+		'''
+		Checks whether the logfile changed since it was loaded
+		Input: NA
+		Output: bool -- True if the logfile has to be (re)loaded
+		'''
+		return self.signature is None or self._get_stat_key(os.stat(self.processor.filepath)) != self.signature["stat"]
+
+
+	def _load(self):
+		'''
+		Loads the cookie counts of all the dates of the logfile. If the logfile has only grown since it was last loaded (same inode, larger size and unchanged prefix digest), only the appended lines are parsed and their counts added, else the whole logfile is parsed. This runs in a worker thread so that the event loop is not blocked. The new counts are built apart from the loaded ones, which are replaced at the end, so the loaded counts are never changed in place
+		Input: NA
+		Output: NA
+		'''
+		processor = self.processor
+		digest_index = CookieLogIndex(processor.index_path)
+		stat = os.stat(processor.filepath)
+		with open(processor.filepath, "rb") as file_pointer:
+			file_size = file_pointer.seek(0, os.SEEK_END)
+			appended = self.signature is not None and self.signature["stat"][:2] == (stat.st_dev, stat.st_ino) and self.signature["stat"][2] < file_size and digest_index.get_prefix_digest(processor.filepath, self.signature["offset"]) == self.signature["prefix_digest"]
+			if appended:
+				start = self.signature["offset"]
+				loaded_cookie_map, loaded_line_count = self.cookie_map, self.line_count
+			else:
+				start = processor._get_data_offset(file_pointer)
+				loaded_cookie_map, loaded_line_count = {}, 0
+			end = processor._get_complete_lines_end(file_pointer, start, file_size)
+
+		appended_cookie_map, line_count = processor._count_byte_range(start, end, None)
+		# Only the cookie counts of the dates of the appended lines are copied before adding to them
+		cookie_map = dict(loaded_cookie_map)
+		for date in appended_cookie_map:
+			cookie_map[date] = dict(cookie_map.get(date, {}))
+		processor._merge_cookie_maps(cookie_map, appended_cookie_map)
+		trailing_cookie_map, trailing_line_count = processor._count_byte_range(end, file_size, None)
+		signature = {"stat": self._get_stat_key(stat), "offset": end, "prefix_digest": digest_index.get_prefix_digest(processor.filepath, end), "trailing_line_count": trailing_line_count}
+		self.cookie_map, self.line_count, self.trailing_cookie_map, self.signature = cookie_map, loaded_line_count + line_count, trailing_cookie_map, signature
+		return
+
+
+	async def _reload_if_changed(self):
+		'''
+		Reloads the cookie counts in a worker thread if the logfile changed. It is called with reload_lock held, so that concurrent queries wait for a single reload
+		Input: NA
+		Output: NA
+		'''
+		if self._is_changed():
+			await asyncio.get_running_loop().run_in_executor(None, self._load)
+		return
+
+
+	def answer(self, query):
+		'''
+		Answers a query from the loaded cookie counts, in the same output format as the command line
+		Input:
+			query::dict -- command line options of the query: "date" (str or list), "date_range" ([start, end]), "top" (int) and "logfilename" (str), all optional
+		Output:
+			lines::list -- output lines, as printed by CookieLogProcessor.print_most_active_cookie()
+		'''
+		if query.get("logfilename") is not None and os.path.basename(str(query["logfilename"]).strip()) != os.path.basename(self.processor.filepath):
+			raise CustomError(f"ERROR: The server serves the cookie log file {self.processor.logfilename}, not {query['logfilename']}!")
+		processor = CookieLogProcessor(Namespace(logfilename=self.processor.logfilename, date=query.get("date"), date_range=query.get("date_range"), top=query.get("top")))
+
+		if self.line_count + self.signature["trailing_line_count"] == 0:
+			return ["ERROR: Input cookie logfile is empty!"]
+
+		cookie_map = self.cookie_map
+		if len(self.trailing_cookie_map) > 0:
+			# The counts of the last line without a newline are added to copies of the counts of the queried dates
+			cookie_map = {date: dict(cookie_map.get(date, {})) for date in processor.query_dates}
+			processor._merge_cookie_maps(cookie_map, self.trailing_cookie_map)
+		return processor._format_results(processor._get_results_from_counts(cookie_map, processor.query_dates))
+
+
+	async def _answer_request(self, query):
+		'''
+		Reloads the cookie counts if needed and answers a query. Queries are answered with reload_lock held, so that they never see the counts of a reload in progress
+		Input:
+			query::dict -- command line options of the query (see answer())
+		Output:
+			response::dict -- {"lines": output lines} or {"error": error message}
+		'''
+		try:
+			async with self.reload_lock:
+				await self._reload_if_changed()
+				return {"lines": self.answer(query)}
+		except CustomError as e:
+			return {"error": str(e)}
+		except OSError:
+			# The logfile is removed or being replaced
+			return {"error": f"ERROR: The cookie log file {self.processor.logfilename} can not be read!"}
+
+
+	async def _handle_unix_connection(self, reader, writer):
+		'''
+		Handles a connection to the Unix socket, on which each request is a line of JSON (see answer()) answered by a line of JSON (see _answer_request())
+		Input:
+			reader::asyncio.StreamReader -- reader of the connection
+			writer::asyncio.StreamWriter -- writer of the connection
+		Output: NA
+		'''
+		try:
+			while True:
+				request = await reader.readline()
+				if len(request) == 0:
+					break
+				try:
+					query = json.loads(request)
+					if not(isinstance(query, dict)):
+						raise ValueError
+				except ValueError:
+					response = {"error": "ERROR: Request should be a JSON object!"}
+				else:
+					response = await self._answer_request(query)
+				writer.write((json.dumps(response) + "\n").encode())
+				await writer.drain()
+		except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+			pass
+		finally:
+			writer.close()
+		return
+
+
+	async def _handle_http_connection(self, reader, writer):
+		'''
+		Handles an HTTP connection, on which a GET request with the query options as parameters (e.g. /?date=2018-12-09&date=2018-12-08&top=3 or /?date_range=2018-12-01,2018-12-09) is answered with the output lines as text
+		Input:
+			reader::asyncio.StreamReader -- reader of the connection
+			writer::asyncio.StreamWriter -- writer of the connection
+		Output: NA
+		'''
+		try:
+			head = await reader.readuntil(b"\r\n\r\n")
+			method, target = head.decode("latin-1").split(" ")[:2]
+			parameters = urllib.parse.parse_qs(urllib.parse.urlsplit(target).query)
+			query = {"logfilename": parameters.get("logfilename", [None])[0], "date": parameters.get("date")}
+			if "date_range" in parameters:
+				query["date_range"] = parameters["date_range"][0].split(",")
+			if "top" in parameters:
+				query["top"] = int(parameters["top"][0]) if parameters["top"][0].lstrip("-").isdigit() else parameters["top"][0]
+
+			if method != "GET":
+				status, body = "405 Method Not Allowed", "ERROR: Only GET requests are supported!\n"
+			else:
+				response = await self._answer_request(query)
+				if "error" in response:
+					status, body = "400 Bad Request", response["error"] + "\n"
+				else:
+					status, body = "200 OK", "".join(line + "\n" for line in response["lines"])
+			body = body.encode()
+			writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; charset=utf-8\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+			await writer.drain()
+		except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+			pass
+		finally:
+			writer.close()
+		return
+
+
+	async def start(self):
+		'''
+		Loads the cookie counts of the logfile and starts serving on the address
+		Input: NA
+		Output: NA
+		'''
+		self.reload_lock = asyncio.Lock()
+		async with self.reload_lock:
+			await self._reload_if_changed()
+		if self.scheme == "unix":
+			if os.path.exists(self.location):
+				# Remove a stale socket of a previous server
+				os.remove(self.location)
+			self.server = await asyncio.start_unix_server(self._handle_unix_connection, path=self.location, limit=self.max_request_size)
+		else:
+			self.server = await asyncio.start_server(self._handle_http_connection, host=self.http_host, port=int(self.location), limit=self.max_request_size)
+			self.port = self.server.sockets[0].getsockname()[1]
+		return
+
+
+	async def stop(self):
+		'''
+		Stops serving and removes the Unix socket
+		Input: NA
+		Output: NA
+		'''
+		self.server.close()
+		await self.server.wait_closed()
+		if self.scheme == "unix" and os.path.exists(self.location):
+			os.remove(self.location)
+		return
+
+
+	async def serve_forever(self):
+		'''
+		Serves queries until the task is cancelled (e.g. on KeyboardInterrupt)
+		Input: NA
+		Output: NA
+		'''
+		await self.start()
+		try:
+			await self.server.serve_forever()
+		finally:
+			await self.stop()
+		return
@@ -0,0 +1,158 @@
+import contextlib
+import time
+
+
+
+class CookieLogStats():
+	'''
+	Class to collect statistics of the processing of cookie log files: seconds spent in each stage, number of lines read, accepted and skipped (by reason of skipping) and number of bytes processed.
+	The bytes processed are the bytes of the byte ranges of the logfiles scanned, which start after the header (all the bytes of a compressed logfile are counted), whatever the engine. Lines counted from an index or a cache are not parsed, so the numbers of lines accepted, skipped and blank are then unknown.
+	Stages are timed with time.perf_counter(). The per-line stages (reading and parsing lines) are timed around each line, other stages around a whole pass or block. Statistics of worker processes are merged into the statistics of the parent process, so the seconds of a stage are summed over the processes.
+	'''
+
+	# Stages of the processing: reading (and decoding) the lines, parsing them (validation and timestamp decoding), aggregating the cookie counts of each date, extracting the most active (or top) cookies from the counts, and counting as a whole (all of the above but extracting, along with reading indexes or caches and dispatching to worker processes)
+	stages = ["read", "parse", "aggregate", "extract", "count"]
+
+	def __init__(self):
+		'''
+		Class constructor to create empty statistics
+		'''
+		self.seconds = dict.fromkeys(self.stages, 0.0)
+		# Number of non-blank lines read, None if unknown (e.g. only the block of the queried date of a sorted logfile was read)
+		self.line_count = 0
+		self.blank_line_count = 0
+		# Variable to store the number of lines skipped for each reason (CookieLogProcessor.SKIP_* reasons)
+		self.skip_counts = {}
+		# Whether all the skipped lines were recorded, False if lines were counted from an index or a cache without being parsed
+		self.skip_counts_known = True
+		self.byte_count = 0
+
+
+	@contextlib.contextmanager
+	def time(self, stage, nested_stages=()):
+		'''
+		Context manager timing a stage. The seconds of nested stages timed within it are not added to the stage
+		Input:
+			stage::str -- timed stage (one of stages)
+			nested_stages::list (default=()) -- stages timed within the stage
+		Output: NA
+		'''
+		nested_seconds = sum(self.seconds[nested_stage] for nested_stage in nested_stages)
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			elapsed = time.perf_counter() - start
+			self.seconds[stage] += elapsed - (sum(self.seconds[nested_stage] for nested_stage in nested_stages) - nested_seconds)
+
+
+	def time_iterator(self, stage, iterable):
+		'''
+		Times the iteration over an iterable as a stage, i.e. the time taken to produce each item
+		Input:
+			stage::str -- timed stage (one of stages)
+			iterable::iterable -- items to time the production of
+		Output:
+			item -- generator yielding each item of the iterable
+		'''
+		clock = time.perf_counter
+		iterator = iter(iterable)
+		elapsed = 0.0
+		try:
+			while True:
+				start = clock()
+				try:
+					item = next(iterator)
+				except StopIteration:
+					elapsed += clock() - start
+					return
+				elapsed += clock() - start
+				yield item
+		finally:
+			self.seconds[stage] += elapsed
+
+
+	def time_function(self, stage, function):
+		'''
+		Wraps a function so that its calls are timed as a stage
+		Input:
+			stage::str -- timed stage (one of stages)
+			function::callable -- function to time
+		Output:
+			timed_function::callable -- function calling function and adding the time taken to the stage
+		'''
+		clock = time.perf_counter
+		seconds = self.seconds
+
+		def timed_function(*args):
+			start = clock()
+			result = function(*args)
+			seconds[stage] += clock() - start
+			return result
+
+		return timed_function
+
+
+	def add_skip(self, skip_reason, blank):
+		'''
+		Records a skipped line
+		Input:
+			skip_reason::str -- reason for skipping the line
+			blank::bool -- True if the line is blank, in which case it is only counted as a blank line
+		Output: NA
+		'''
+		if blank:
+			self.blank_line_count += 1
+		else:
+			self.skip_counts[skip_reason] = self.skip_counts.get(skip_reason, 0) + 1
+		return
+
+
+	def add_lines(self, line_count):
+		'''
+		Records the number of non-blank lines read
+		Input:
+			line_count::int -- number of non-blank lines read, None if unknown
+		Output: NA
+		'''
+		self.line_count = None if self.line_count is None or line_count is None else self.line_count + line_count
+		return
+
+
+	def merge(self, other):
+		'''
+		Adds the statistics of another object (e.g. of a worker process) to the statistics, except the number of lines read which is counted by the parent process
+		Input:
+			other::CookieLogStats -- statistics to merge
+		Output:
+			self::CookieLogStats -- the updated statistics
+		'''
+		for stage, seconds in other.seconds.items():
+			self.seconds[stage] += seconds
+		self.blank_line_count += other.blank_line_count
+		for skip_reason, count in other.skip_counts.items():
+			self.skip_counts[skip_reason] = self.skip_counts.get(skip_reason, 0) + count
+		self.skip_counts_known = self.skip_counts_known and other.skip_counts_known
+		self.byte_count += other.byte_count
+		return self
+
+
+	def to_dict(self):
+		'''
+		Returns the statistics as a JSON serializable dict
+		Input: NA
+		Output:
+			stats::dict -- number of lines read (non-blank), accepted, skipped and blank, number of lines skipped by reason, number of bytes processed and seconds of each stage. Numbers of lines are None if unknown
+		'''
+		skipped_count = sum(self.skip_counts.values()) if self.skip_counts_known else None
+		return {
+			"lines": {
+				"read": self.line_count,
+				"accepted": None if self.line_count is None or skipped_count is None else self.line_count - skipped_count,
+				"skipped": skipped_count,
+				"blank": self.blank_line_count if self.skip_counts_known else None,
+			},
+			"skipped_by_reason": dict(sorted(self.skip_counts.items())) if self.skip_counts_known else None,
+			"bytes_processed": self.byte_count,
+			"seconds": {stage: round(seconds, 6) for stage, seconds in self.seconds.items()},
+		}
@@ -0,0 +1,188 @@
+from datetime import date as datetime_date
+from array import array
+import heapq
+import io
+import tempfile
+
+
+
+class CookiePartitioner():
+	'''
+	Class to aggregate the (date, cookie) occurences of a cookie log file exactly within a memory budget, by spilling to disk once the budget is reached (external hash partitioned aggregation).
+	Occurences are counted in memory along with the index of their first occurence. Whenever the number of aggregated (date, cookie) pairs reaches the budget, the partial counts are appended to temporary partition files chosen by a hash of the (date, cookie) pair, so that all the partial counts of a pair end up in the same partition. Each partition is then aggregated in memory on its own (and partitioned again with another hash if it still does not fit), and only the candidates of each date (the cookies with the highest count, or the top cookies) are kept across partitions.
+	Partition files are written and read sequentially.
+	The budget bounds the partial counts along with the buffers of the partition files, not the candidates: all the cookies tied for the highest count are part of the answer, so they are held in memory whatever the budget (compactly, as an array of indexes of first occurence and a list of cookies).
+	'''
+
+	# Approximate number of bytes taken by each aggregated (date, cookie) pair (16 characters cookie), used to derive the number of pairs held in memory from the budget
+	entry_size = 280
+
+	# Number of partition files the partial counts are spilled to
+	partition_count = 32
+
+	# Approximate number of bytes of the buffers of an open partition file. Partition files of two levels are open at once while a partition is partitioned again
+	buffer_size = io.DEFAULT_BUFFER_SIZE
+
+	def __init__(self, memory_budget, top=None, directory=None):
+		'''
+		Class constructor to create an empty aggregation
+		Input:
+			memory_budget::int -- number of bytes of the aggregated (date, cookie) pairs held in memory and of the buffers of the partition files
+			top::int (default=None) -- number of top cookies to keep as candidates of each date, None to keep the cookies with the highest count
+			directory::str (default=None) -- directory of the temporary partition files, the default temporary directory if None
+		'''
+		# Number of (date, cookie) pairs aggregated in memory, above which they are spilled to the partition files
+		self.entry_limit = max(1, (memory_budget - 2 * self.partition_count * self.buffer_size) // self.entry_size)
+		self.top = top
+		self.directory = directory
+		# Variable to store the [count, index of first occurence] of each (date, cookie) pair aggregated in memory
+		self.counts = {}
+		self.record_count = 0
+		# Partition files of the first level, None until the first spill
+		self.partition_files = None
+		# Variable to store the number of times the partial counts were spilled
+		self.spill_count = 0
+		# Variable to store the candidates of each date, as a min-heap of (count, -index of first occurence, cookie) tuples if self.top is set, else as [highest count, array of the indexes of first occurence, list of the cookies] of the cookies tied for the highest count
+		self.candidates = {}
+
+
+	def add(self, date, cookie):
+		'''
+		Adds an occurence of a cookie on a date. Occurences are indexed in the order they are added, which is the order of the logfile
+		Input:
+			date::datetime.date -- date of the occurence
+			cookie::str -- cookie string
+		Output: NA
+		'''
+		counter = self.counts.get((date, cookie))
+		if counter is None:
+			self.counts[(date, cookie)] = [1, self.record_count]
+			if len(self.counts) > self.entry_limit:
+				if self.partition_files is None:
+					self.partition_files = self._create_partition_files()
+				self._spill(self.counts, self.partition_files, 0)
+				self.counts = {}
+		else:
+			counter[0] += 1
+		self.record_count += 1
+		return
+
+
+	def _create_partition_files(self):
+		'''
+		Creates the temporary partition files, which are removed when closed
+		Input: NA
+		Output:
+			partition_files::list -- temporary files opened for writing and reading
+		'''
+		return [tempfile.TemporaryFile(mode="w+", dir=self.directory) for _ in range(self.partition_count)]
+
+
+	def _spill(self, counts, partition_files, level):
+		'''
+		Appends partial counts to the partition files, as "date ordinal,cookie,count,index of first occurence" lines. The partition of a (date, cookie) pair depends on the level, so that a partition which does not fit in memory is split by the next level
+		Input:
+			counts::dict -- (date, cookie) to [count, index of first occurence] map
+			partition_files::list -- partition files
+			level::int -- level of the partitioning
+		Output: NA
+		'''
+		ordinals = {}
+		for (date, cookie), (count, first_index) in counts.items():
+			if date not in ordinals:
+				ordinals[date] = date.toordinal()
+			partition_files[hash((level, date, cookie)) % len(partition_files)].write(f"{ordinals[date]},{cookie},{count},{first_index}\n")
+		self.spill_count += 1
+		return
+
+
+	def _aggregate_partitions(self, partition_files, level):
+		'''
+		Aggregates each partition file in memory and collects its candidates, partitioning a partition again if it does not fit in memory. Partition files are closed (hence removed) once aggregated
+		Input:
+			partition_files::list -- partition files of the level
+			level::int -- level of the partitioning of the files
+		Output: NA
+		'''
+		dates = {}
+		for partition_file in partition_files:
+			partition_file.seek(0)
+			counts, sub_partition_files = {}, None
+			for line in partition_file:
+				ordinal, cookie, count, first_index = line.split(",")
+				if ordinal not in dates:
+					dates[ordinal] = datetime_date.fromordinal(int(ordinal))
+				key = (dates[ordinal], cookie)
+				counter = counts.get(key)
+				if counter is None:
+					counts[key] = [int(count), int(first_index)]
+					if len(counts) > self.entry_limit:
+						if sub_partition_files is None:
+							sub_partition_files = self._create_partition_files()
+						self._spill(counts, sub_partition_files, level)
+						counts = {}
+				else:
+					counter[0] += int(count)
+					counter[1] = min(counter[1], int(first_index))
+			partition_file.close()
+
+			if sub_partition_files is None:
+				self._collect_candidates(counts)
+			else:
+				self._spill(counts, sub_partition_files, level)
+				del counts
+				self._aggregate_partitions(sub_partition_files, level + 1)
+		return
+
+
+	def _collect_candidates(self, counts):
+		'''
+		Collects the candidates of each date from complete counts, i.e. the cookies tied for the highest count (or the top cookies, ties being broken by the first occurence)
+		Input:
+			counts::dict -- (date, cookie) to [count, index of first occurence] map, complete for the cookies it holds
+		Output: NA
+		'''
+		for (date, cookie), (count, first_index) in counts.items():
+			if self.top is not None:
+				candidates = self.candidates.setdefault(date, [])
+				candidate = (count, -first_index, cookie)
+				if len(candidates) < self.top:
+					heapq.heappush(candidates, candidate)
+				elif candidate > candidates[0]:
+					heapq.heapreplace(candidates, candidate)
+				continue
+			candidates = self.candidates.get(date)
+			if candidates is not None and count < candidates[0]:
+				continue
+			if candidates is None or count > candidates[0]:
+				candidates = self.candidates[date] = [count, array("q"), []]
+			candidates[1].append(first_index)
+			candidates[2].append(cookie)
+		return
+
+
+	def get_cookie_map(self):
+		'''
+		Completes the aggregation and returns the candidates of each date, which give the same most active cookies (or top cookies) as the complete counts
+		Input: NA
+		Output:
+			cookie_map::dict -- date to cookie map along with number of occurences of each candidate cookie on a given day (in the order of first occurence)
+		'''
+		if self.partition_files is None:
+			self._collect_candidates(self.counts)
+		else:
+			self._spill(self.counts, self.partition_files, 0)
+			self._aggregate_partitions(self.partition_files, 1)
+			self.partition_files = None
+		self.counts = {}
+
+		# The candidates of each date are released once their cookie map is built, so that both are not held in memory at once
+		cookie_map = {}
+		for date in list(self.candidates.keys()):
+			candidates = self.candidates.pop(date)
+			if self.top is not None:
+				cookie_map[date] = {cookie: count for count, _, cookie in sorted(candidates, key=lambda candidate: -candidate[1])}
+				continue
+			count, first_indexes, cookies = candidates
+			cookie_map[date] = {cookies[position]: count for position in sorted(range(len(cookies)), key=first_indexes.__getitem__)}
+		return cookie_map
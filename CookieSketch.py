@@ -0,0 +1,138 @@
+from collections.abc import Mapping
+import heapq
+
+
+
+class CookieSketch(Mapping):
+	'''
+	Class to find the most active cookies of a day in a fixed amount of memory with the Space-Saving heavy hitter algorithm, as a read-only mapping of cookie to estimated count (in the order the cookies started being tracked) like the dict it replaces.
+	At most capacity cookies are tracked. A cookie which is not tracked replaces the tracked cookie with the lowest count, taking over its count as error. Hence the estimated count of a tracked cookie exceeds its true count by at most its error, and a cookie which is not tracked occured at most as many times as the lowest estimated count (at most total / capacity).
+	'''
+
+	# Approximate number of bytes taken by each tracked cookie (16 characters), used to derive the capacity from a memory budget
+	counter_size = 330
+
+	def __init__(self, capacity):
+		'''
+		Class constructor to create an empty sketch
+		Input:
+			capacity::int -- maximum number of tracked cookies
+		'''
+		self.capacity = capacity
+		# Variable to store the [estimated count, error, sequence number] of each tracked cookie, in the order of the sequence numbers
+		self.counters = {}
+		# Min-heap of the (count, sequence number, cookie) of the tracked cookies. Counts only grow, so a count in the heap may be lower than the estimated count, in which case it is updated when it reaches the top of the heap
+		self.heap = []
+		# Variable to store the number of occurences of all the cookies
+		self.total = 0
+		self.sequence = 0
+
+
+	def add(self, cookie, count=1):
+		'''
+		Adds occurences of a cookie
+		Input:
+			cookie::str -- cookie string
+			count::int (default=1) -- number of occurences to add
+		Output: NA
+		'''
+		self.total += count
+		counter = self.counters.get(cookie)
+		if counter is not None:
+			counter[0] += count
+			return
+
+		if len(self.counters) < self.capacity:
+			self.counters[cookie] = [count, 0, self.sequence]
+			heapq.heappush(self.heap, (count, self.sequence, cookie))
+		else:
+			# The cookie replaces the tracked cookie with the lowest count
+			min_count, _, evicted_cookie = self._get_min_entry()
+			del self.counters[evicted_cookie]
+			self.counters[cookie] = [min_count + count, min_count, self.sequence]
+			heapq.heapreplace(self.heap, (min_count + count, self.sequence, cookie))
+		self.sequence += 1
+		return
+
+
+	def _get_min_entry(self):
+		'''
+		Brings the tracked cookie with the lowest estimated count to the top of the heap, updating the outdated counts on the way
+		Input: NA
+		Output:
+			entry::tuple -- (count, sequence number, cookie) of the tracked cookie with the lowest count
+		'''
+		while True:
+			entry = self.heap[0]
+			count = self.counters[entry[2]][0]
+			if count == entry[0]:
+				return entry
+			heapq.heapreplace(self.heap, (count, entry[1], entry[2]))
+
+
+	def get_error_bound(self):
+		'''
+		Returns the highest number of occurences by which an estimated count may exceed the true count, which is also the highest number of occurences a cookie which is not tracked may have
+		Input: NA
+		Output: lowest estimated count if cookies were replaced, else 0 (int)
+		'''
+		if self.sequence == len(self.counters):
+			# No cookie was replaced, so all the counts are exact
+			return 0
+		return self._get_min_entry()[0]
+
+
+	def get_error(self, cookie):
+		'''
+		Returns the highest number of occurences by which the estimated count of a tracked cookie exceeds its true count
+		Input:
+			cookie::str -- tracked cookie string
+		Output: error of the estimated count (int)
+		'''
+		return self.counters[cookie][1]
+
+
+	def is_exact(self, cookies):
+		'''
+		Checks whether extracted cookies are provably the same (in the same order and with the same counts) as the cookies extracted from exact counts, i.e. the extracted cookies have exact counts and no other cookie may have as many occurences, except tracked cookies with exact counts tied with the lowest extracted one (which started being tracked later, hence occured first later)
+		Input:
+			cookies::list -- cookies extracted from the sketch (most active cookies, or cookies of the top (cookie, count) tuples)
+		Output: bool -- True if the extracted cookies are exact
+		'''
+		if len(cookies) == 0:
+			return self.total == 0
+		if any(self.counters[cookie][1] > 0 for cookie in cookies):
+			return False
+		lowest_count = min(self.counters[cookie][0] for cookie in cookies)
+		if self.get_error_bound() >= lowest_count:
+			return False
+		extracted_cookies = set(cookies)
+		return all(count < lowest_count or (count == lowest_count and error == 0) for cookie, (count, error, _) in self.counters.items() if cookie not in extracted_cookies)
+
+
+	def __getitem__(self, cookie):
+		'''
+		Returns the estimated number of occurences of a tracked cookie
+		Input:
+			cookie::str -- cookie string
+		Output: estimated number of occurences of the cookie (int), KeyError is raised if it is not tracked
+		'''
+		return self.counters[cookie][0]
+
+
+	def __iter__(self):
+		'''
+		Iterates over the tracked cookies in the order they started being tracked, which is the order of first occurence for the cookies with exact counts
+		Input: NA
+		Output: iterator of cookie strings
+		'''
+		return iter(self.counters)
+
+
+	def __len__(self):
+		'''
+		Returns the number of tracked cookies
+		Input: NA
+		Output: number of tracked cookies (int)
+		'''
+		return len(self.counters)
@@ -0,0 +1,70 @@
+import hashlib
+import math
+
+from CustomError import CustomError
+
+
+
+class HyperLogLog():
+	'''
+	Class to estimate the number of distinct cookies (e.g. of a day) in a fixed amount of memory with the HyperLogLog algorithm.
+	Each cookie is hashed to 64 bits with BLAKE2b. The first precision bits of the hash select a register, which keeps the highest position of the first 1 bit found in the other bits of the hashes. With the default precision, the 4096 registers take 4 KB and the standard error of the estimate is 1.04 / sqrt(4096), i.e. about 1.6%.
+	Adding a cookie twice does not change the registers, and the sketch of the union of two sets of cookies is the register-wise maximum of their sketches, so sketches of different chunks or files can be merged.
+	'''
+
+	# Default number of bits of the hash selecting the register
+	default_precision = 12
+
+	def __init__(self, precision=None):
+		'''
+		Class constructor to create an empty sketch
+		Input:
+			precision::int (default=None) -- number of bits of the hash selecting the register (4 to 16), default_precision if None
+		'''
+		self.precision = self.default_precision if precision is None else precision
+		self.registers = bytearray(1 << self.precision)
+
+
+	def add(self, cookie):
+		'''
+		Adds a cookie to the sketch
+		Input:
+			cookie::str -- cookie string
+		Output: NA
+		'''
+		hash_value = int.from_bytes(hashlib.blake2b(cookie.encode(), digest_size=8).digest(), "big")
+		register = hash_value >> (64 - self.precision)
+		# Position of the first 1 bit of the remaining bits of the hash (64 - precision + 1 if they are all 0)
+		rank = 64 - self.precision - (hash_value & ((1 << (64 - self.precision)) - 1)).bit_length() + 1
+		if rank > self.registers[register]:
+			self.registers[register] = rank
+		return
+
+
+	def merge(self, other):
+		'''
+		Adds the cookies of another sketch of the same precision to the sketch, which then estimates the number of distinct cookies of both
+		Input:
+			other::HyperLogLog -- sketch to merge
+		Output:
+			self::HyperLogLog -- the updated sketch
+		'''
+		if other.precision != self.precision:
+			raise CustomError("ERROR: HyperLogLog sketches of different precisions can not be merged!")
+		self.registers = bytearray(map(max, self.registers, other.registers))
+		return self
+
+
+	def estimate(self):
+		'''
+		Estimates the number of distinct cookies added to the sketch. Linear counting of the empty registers is used for small numbers of cookies, for which it is more accurate
+		Input: NA
+		Output: estimated number of distinct cookies (int)
+		'''
+		register_count = len(self.registers)
+		alpha = 0.7213 / (1 + 1.079 / register_count)
+		estimate = alpha * register_count * register_count / math.fsum(2.0 ** -rank for rank in self.registers)
+		empty_count = self.registers.count(0)
+		if estimate <= 2.5 * register_count and empty_count > 0:
+			estimate = register_count * math.log(register_count / empty_count)
+		return round(estimate)
@@ -1,6 +1,7 @@
 from CustomError import CustomError
 from datetime import datetime
 import os
+import re
 
 
 
@@ -18,7 +19,7 @@ class InputValidator():
 		'''
 		Validating input cookie log filename
 		Input: 
-			logfilename::str -- command line argument of the cookie log filename
+			logfilename::str -- command line argument of the cookie log filename (in the current working directory, or absolute)
 		Output: 
 			bool -- Returns True to caller if logfile is successfully validated else returns False.
 			error_message::str -- Return appropriate message in case validation is unsuccessful else None
@@ -32,10 +33,15 @@ class InputValidator():
 			self.error_message = "ERROR: Filename not provided!"
 			return False, self.error_message
 		
-		# Validating if incorrect log file is provided by the user
-		if not(logfilename.endswith(".csv")):
+		# Validating if incorrect log file is provided by the user. Compressed logfiles are decompressed while they are read
+		if not(logfilename.endswith((".csv", ".csv.gz", ".csv.bz2", ".csv.xz"))):
 			# raise CustomError("Provided logfile has incorrect filetype! .csv required!")
-			self.error_message = "ERROR: Provided logfile has incorrect filetype! .csv required!"
+			self.error_message = "ERROR: Provided logfile has incorrect filetype! .csv (or .csv.gz, .csv.bz2, .csv.xz) required!"
+			return False, self.error_message
+
+		# Validating if a file given by its absolute path exists
+		if os.path.isabs(logfilename) and not(os.path.exists(logfilename)):
+			self.error_message = "ERROR: The cookie log file {} does not exist!".format(logfilename)
 			return False, self.error_message
 
 		# Validating if the file exists in the current directory
@@ -107,3 +113,94 @@ class InputValidator():
 			return False, self.error_message
 		
 		return True, None
+
+
+	def validate_positive_integer(self, value, name):
+		'''
+		Validate an optional numeric command line argument
+		Input:
+			value::int -- value of the command line argument
+			name::str -- name of the command line argument (used in the error message)
+		Output:
+			bool -- Returns True to caller if value is a positive integer else returns False
+			error_message::str -- Return appropriate message in case validation is unsuccessful else None
+		'''
+		if isinstance(value, bool) or not(isinstance(value, int)) or value < 1:
+			self.error_message = f"ERROR: {name} should be a positive integer!"
+			return False, self.error_message
+
+		return True, None
+
+
+	def validate_fraction(self, value, name):
+		'''
+		Validate an optional command line argument which is a fraction strictly between 0 and 1
+		Input:
+			value::float -- value of the command line argument
+			name::str -- name of the command line argument (used in the error message)
+		Output:
+			bool -- Returns True to caller if value is strictly between 0 and 1 else returns False
+			error_message::str -- Return appropriate message in case validation is unsuccessful else None
+		'''
+		if isinstance(value, bool) or not(isinstance(value, (int, float))) or not(0 < value < 1):
+			self.error_message = f"ERROR: {name} should be a number between 0 and 1!"
+			return False, self.error_message
+
+		return True, None
+
+
+	def parse_memory_size(self, size):
+		'''
+		Parses a memory size given in bytes with an optional K, M or G suffix (e.g. "64M")
+		Input:
+			size::str -- memory size
+		Output: number of bytes (int), None if the size is not valid
+		'''
+		match = re.fullmatch(r"(\d+)([KMG]?)B?", str(size).strip().upper())
+		if match is None:
+			return None
+		return int(match.group(1)) << (10 * " KMG".index(match.group(2) or " "))
+
+
+	def validate_memory_size(self, size, name, minimum):
+		'''
+		Validate an optional command line argument which is a memory size (see parse_memory_size())
+		Input:
+			size::str -- value of the command line argument
+			name::str -- name of the command line argument (used in the error message)
+			minimum::int -- lowest number of bytes
+		Output:
+			bool -- Returns True to caller if size is successfully validated else returns False
+			error_message::str -- Return appropriate message in case validation is unsuccessful else None
+		'''
+		size_bytes = self.parse_memory_size(size)
+		if size_bytes is None:
+			self.error_message = f"ERROR: {name} should be a number of bytes with an optional K, M or G suffix!"
+			return False, self.error_message
+
+		if size_bytes < minimum:
+			self.error_message = f"ERROR: {name} should be at least {minimum} bytes!"
+			return False, self.error_message
+
+		return True, None
+
+
+	def validate_address(self, address):
+		'''
+		Validate the address of a query server, either "unix:PATH" for a Unix socket or "http:PORT" for HTTP on localhost
+		Input:
+			address::str -- command line argument of the server address
+		Output:
+			bool -- Returns True to caller if address is successfully validated else returns False
+			error_message::str -- Return appropriate message in case validation is unsuccessful else None
+		'''
+		scheme, _, location = str(address).strip().partition(":")
+
+		if scheme == "unix" and len(location) > 0:
+			return True, None
+
+		if scheme == "http" and location.isdigit() and int(location) < 65536:
+			return True, None
+
+		self.error_message = "ERROR: Server address should be unix:PATH or http:PORT!"
+		return False, self.error_message
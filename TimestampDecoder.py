@@ -0,0 +1,103 @@
+from datetime import datetime, date
+import math
+import re
+
+
+
+class TimestampDecoder():
+	'''
+	Class to decode timestamps of the cookie log file into the calendar day in the timestamp's own UTC offset, i.e. the same day as datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S%z").date()
+	'''
+
+	# Strict pattern of the common ISO 8601 timestamp format YYYY-MM-DDTHH:MM:SS+HH:MM (or Z as the offset). Hours, minutes, seconds and offsets are range checked by the pattern itself
+	timestamp_pattern = re.compile(r"([0-9]{4}-[0-9]{2}-[0-9]{2})T((?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9])([+-](?:[01][0-9]|2[0-3]):[0-5][0-9]|Z)\Z")
+
+	# Maximum number of (date prefix, offset) pairs to memoize
+	cache_size = 4096
+
+	def __init__(self, datetime_format="%Y-%m-%dT%H:%M:%S%z"):
+		'''
+		Class constructor to set the datetime format used for timestamps not in the common format
+		Input:
+			datetime_format::str (default="%Y-%m-%dT%H:%M:%S%z") -- datetime format of the timestamps
+		'''
+		self.datetime_format = datetime_format
+		# Variable to memoize the day (or None if invalid) of each (date prefix, offset) pair
+		self.cache = {}
+
+
+	def decode(self, timestamp):
+		'''
+		Decodes the timestamp into its calendar day. Timestamps in the common format are decoded by the compiled pattern and memoized by their date prefix and offset, any other timestamp is parsed with datetime.strptime()
+		Input:
+			timestamp::str -- timestamp string
+		Output:
+			date::datetime.date -- day of the timestamp, None if the timestamp is not valid
+		'''
+		match = self.timestamp_pattern.match(timestamp)
+		if match is None:
+			return self._decode_with_strptime(timestamp)
+
+		key = match.group(1, 3)
+		if key in self.cache:
+			return self.cache[key]
+
+		if len(self.cache) >= self.cache_size:
+			self.cache.clear()
+		day = self.decode_date_prefix(key[0])
+		self.cache[key] = day
+		return day
+
+
+	def decode_instant(self, timestamp):
+		'''
+		Decodes the timestamp into its instant in UTC, so that timestamps with different UTC offsets can be ordered. Timestamps not in the common format are parsed with datetime.strptime()
+		Input:
+			timestamp::str -- timestamp string
+		Output:
+			instant::int -- number of seconds from 0001-01-01T00:00:00 UTC (possibly negative), None if the timestamp is not valid
+		'''
+		match = self.timestamp_pattern.match(timestamp)
+		if match is None:
+			try:
+				moment = datetime.strptime(timestamp, self.datetime_format)
+			except:
+				return None
+			offset = moment.utcoffset()
+			# Offsets may have (fractions of) seconds, the instant is rounded down to a second
+			return math.floor(moment.toordinal() * 86400 + moment.hour * 3600 + moment.minute * 60 + moment.second - (0 if offset is None else offset.total_seconds()))
+
+		day = self.decode(timestamp)
+		if day is None:
+			return None
+		date_prefix, time, offset = match.group(1, 2, 3)
+		offset_seconds = 0 if offset == "Z" else (1 if offset[0] == "+" else -1) * (int(offset[1:3]) * 3600 + int(offset[4:6]) * 60)
+		return day.toordinal() * 86400 + int(time[0:2]) * 3600 + int(time[3:5]) * 60 + int(time[6:8]) - offset_seconds
+
+
+	def decode_date_prefix(self, date_prefix):
+		'''
+		Decodes the YYYY-MM-DD prefix of a timestamp into a date
+		Input:
+			date_prefix::str or bytes -- date prefix of the timestamp
+		Output:
+			date::datetime.date -- decoded date, None if it is not a valid calendar date
+		'''
+		try:
+			return date(int(date_prefix[0:4]), int(date_prefix[5:7]), int(date_prefix[8:10]))
+		except ValueError:
+			return None
+
+
+	def _decode_with_strptime(self, timestamp):
+		'''
+		Decodes a timestamp not in the common format with datetime.strptime(), which also accepts variants such as single digit fields, offsets without a colon or a lowercase "t"
+		Input:
+			timestamp::str -- timestamp string
+		Output:
+			date::datetime.date -- day of the timestamp, None if the timestamp is not valid
+		'''
+		try:
+			return datetime.strptime(timestamp, self.datetime_format).date()
+		except:
+			return None
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+
+# Importing necessary modules
+from argparse import Namespace
+from datetime import datetime
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from CookieLogProcessor import CookieLogProcessor
+from CookieCounter import CookieCounter
+from CustomError import CustomError
+from CookieLogDecompressor import CookieLogDecompressor
+from CookieLogGenerator import CookieLogGenerator
+from InputValidator import InputValidator
+from TimestampDecoder import TimestampDecoder
+
+
+
+# Configurations benchmarked by the run command: name to the processor options they set
+CONFIGURATIONS = {
+	"text": {"engine": "text"},
+	"mmap": {"engine": "mmap"},
+	"numpy": {"engine": "numpy"},
+	"regex": {"engine": "regex"},
+	"low_memory": {"low_memory": True},
+	"approx": {"approx": True},
+	"memory_budget": {"memory_budget": "64M"},
+	"text_pipeline": {"engine": "text", "pipeline": True},
+	"numpy_pipeline": {"engine": "numpy", "pipeline": True},
+}
+
+
+
+
+def generate_lines(line_count, seed=0):
+	'''
+	Generates lines of a cookie log file (without the header) with a small share of malformed lines
+	Input:
+		line_count::int -- number of lines to generate
+		seed::int (default=0) -- seed of the random number generator
+	Output:
+		lines::list -- generated lines
+	'''
+	generator = random.Random(seed)
+	lines = []
+	for _ in range(line_count):
+		cookie = "".join(generator.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(16))
+		timestamp = "2018-12-{:02d}T{:02d}:{:02d}:{:02d}+00:00".format(generator.randint(1, 28), generator.randint(0, 23), generator.randint(0, 59), generator.randint(0, 59))
+		if generator.random() < 0.02:
+			# Malformed line
+			cookie = cookie[:8] + " " + cookie[8:]
+		lines.append(f"{cookie},{timestamp}\n")
+	return lines
+
+
+
+
+def parse_entry_legacy(processor, entry):
+	'''
+	Parses a line with the call chain used before CookieLogProcessor._parse_entry(), i.e. _preprocess_line(), _skip_entry() and _process_date()
+	Input:
+		processor::CookieLogProcessor -- processor object
+		entry::str -- a raw line from the cookie log file
+	Output: (cookie, date) tuple if the line is valid, else None
+	'''
+	if "," not in entry:
+		return None
+	items = processor._preprocess_line(entry.split(",")[:2])
+	if processor._skip_entry(items):
+		return None
+	return items[0], processor._process_date(items[1])
+
+
+
+
+def time_per_line(function, lines, repeat=3):
+	'''
+	Measures the cost of parsing one line with the given function, taking the best of several runs
+	Input:
+		function::callable -- function to parse a line
+		lines::list -- lines to parse
+		repeat::int (default=3) -- number of runs
+	Output: time per line in microseconds (float)
+	'''
+	best = float("inf")
+	for _ in range(repeat):
+		start = time.perf_counter()
+		for line in lines:
+			function(line)
+		best = min(best, time.perf_counter() - start)
+	return best / len(lines) * 1e6
+
+
+
+
+def benchmark_line_validation(processor, line_count):
+	'''
+	Compares the per-line cost of the legacy validation call chain with CookieLogProcessor._parse_entry()
+	Input:
+		processor::CookieLogProcessor -- processor object
+		line_count::int -- number of lines to parse
+	Output: NA
+	'''
+	lines = generate_lines(line_count)
+	legacy_cost = time_per_line(lambda entry: parse_entry_legacy(processor, entry), lines)
+	fused_cost = time_per_line(processor._parse_entry, lines)
+	print(f"Line validation ({line_count} lines)")
+	print(f"  legacy call chain: {legacy_cost:.2f} us/line")
+	print(f"  _parse_entry():    {fused_cost:.2f} us/line ({legacy_cost / fused_cost:.1f}x faster)")
+	return
+
+
+
+
+def benchmark_timestamp_decoding(line_count):
+	'''
+	Compares the per-timestamp cost of datetime.strptime() with TimestampDecoder.decode()
+	Input:
+		line_count::int -- number of timestamps to decode
+	Output: NA
+	'''
+	timestamps = [line.split(",")[1].strip() for line in generate_lines(line_count)]
+	decoder = TimestampDecoder()
+	strptime_cost = time_per_line(lambda timestamp: datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S%z").date(), timestamps)
+	decoder_cost = time_per_line(decoder.decode, timestamps)
+	print(f"Timestamp decoding ({line_count} timestamps)")
+	print(f"  datetime.strptime():       {strptime_cost:.2f} us/timestamp")
+	print(f"  TimestampDecoder.decode(): {decoder_cost:.2f} us/timestamp ({strptime_cost / decoder_cost:.1f}x faster)")
+	return
+
+
+
+
+def benchmark_cookie_counting_memory(cookie_count):
+	'''
+	Compares the memory and time taken to count distinct cookies in a dict with a CookieCounter. Memory and time are measured in separate runs, as tracing allocations slows them down
+	Input:
+		cookie_count::int -- number of distinct cookies to count
+	Output: NA
+	'''
+	generator = random.Random(0)
+	cookies = ["".join(generator.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(16)) for _ in range(cookie_count)]
+
+	def count_dict():
+		cookie_counts = {}
+		for cookie in cookies:
+			# Cookies are copied as the parser creates a new string per line
+			cookie = cookie.encode().decode()
+			cookie_counts[cookie] = cookie_counts.get(cookie, 0) + 1
+		return cookie_counts
+
+	def count_counter():
+		cookie_counts = CookieCounter()
+		for cookie in cookies:
+			cookie_counts.add(cookie.encode().decode())
+		return cookie_counts
+
+	print(f"Cookie counting ({cookie_count} distinct cookies)")
+	sizes = {}
+	for name, function in [("dict", count_dict), ("CookieCounter", count_counter)]:
+		tracemalloc.start()
+		cookie_counts = function()
+		sizes[name] = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+		del cookie_counts
+		start = time.perf_counter()
+		function()
+		elapsed = time.perf_counter() - start
+		print(f"  {name + ':':15}{sizes[name] / cookie_count:.1f} bytes/cookie, {elapsed / cookie_count * 1e6:.2f} us/cookie")
+	print(f"  CookieCounter takes {sizes['dict'] / sizes['CookieCounter']:.1f}x less memory")
+	return
+
+
+
+
+def create_generator(args):
+	'''
+	Creates the synthetic cookie log generator set by the command line arguments
+	Input:
+		args::namespace -- command line arguments (see add_generator_arguments())
+	Output:
+		generator::CookieLogGenerator -- generator object
+	'''
+	return CookieLogGenerator(days=args.days, cookie_count=args.cookies, zipf_skew=args.skew, timezones=args.timezones.split(","), malformed_ratio=args.malformed, seed=args.seed)
+
+
+
+
+def count_lines(filepath):
+	'''
+	Counts the lines of a (possibly compressed) cookie log file, excluding the header
+	Input:
+		filepath::str -- path of the cookie log file
+	Output: number of lines (int)
+	'''
+	opener = CookieLogDecompressor.openers.get(CookieLogDecompressor.get_compression(filepath), open)
+	line_count = 0
+	with opener(filepath, "rb") as file_pointer:
+		while True:
+			block = file_pointer.read(1 << 20)
+			if len(block) == 0:
+				break
+			line_count += block.count(b"\n")
+	return max(0, line_count - 1)
+
+
+
+
+def evict_page_cache(filepath):
+	'''
+	Evicts the pages of a file from the page cache, so that the next read of the file is a cold read from the disk
+	Input:
+		filepath::str -- path of the file
+	Output: NA
+	'''
+	file_descriptor = os.open(filepath, os.O_RDONLY)
+	try:
+		os.fsync(file_descriptor)
+		os.posix_fadvise(file_descriptor, 0, 0, os.POSIX_FADV_DONTNEED)
+	finally:
+		os.close(file_descriptor)
+	return
+
+
+
+
+def measure_configuration(filepath, dates, options, connection):
+	'''
+	Measures one query of the cookie log file with a configuration, in a child process so that its peak RSS is its own
+	Input:
+		filepath::str -- path of the cookie log file
+		dates::list -- queried dates
+		options::dict -- processor options of the configuration
+		connection::multiprocessing.connection.Connection -- connection to send the measures to the parent process
+	Output: NA
+	'''
+	start = time.perf_counter()
+	try:
+		processor = CookieLogProcessor(Namespace(logfilename=filepath, date=dates, **options))
+		results = processor.get_most_active_cookies()
+	except CustomError as e:
+		connection.send({"error": str(e)})
+		connection.close()
+		return
+	wall_time = time.perf_counter() - start
+	# ru_maxrss is in kilobytes on Linux
+	peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+	digest = hashlib.sha1(repr(sorted((str(date), cookies) for date, cookies in results.items())).encode()).hexdigest()[:16]
+	connection.send({"wall_time": wall_time, "peak_rss": peak_rss, "digest": digest})
+	connection.close()
+	return
+
+
+
+
+def run_configuration(filepath, dates, options, repeat, cold_cache=False):
+	'''
+	Measures the queries of the cookie log file with a configuration, each in a new process, keeping the best wall time and the highest peak RSS
+	Input:
+		filepath::str -- path of the cookie log file
+		dates::list -- queried dates
+		options::dict -- processor options of the configuration
+		repeat::int -- number of queries
+		cold_cache::bool (default=False) -- evict the cookie log file from the page cache before each query
+	Output:
+		measures::dict -- wall time (seconds), peak RSS (bytes) and digest of the answer, or error message
+	'''
+	context = multiprocessing.get_context("spawn")
+	best = None
+	for _ in range(repeat):
+		if cold_cache:
+			evict_page_cache(filepath)
+		receiver, sender = context.Pipe(duplex=False)
+		process = context.Process(target=measure_configuration, args=(filepath, dates, options, sender))
+		process.start()
+		sender.close()
+		try:
+			measures = receiver.recv()
+		except EOFError:
+			measures = {"error": f"ERROR: The benchmark process exited with code {process.exitcode}!"}
+		process.join()
+		if "error" in measures:
+			return measures
+		if best is None:
+			best = measures
+		else:
+			best["wall_time"] = min(best["wall_time"], measures["wall_time"])
+			best["peak_rss"] = max(best["peak_rss"], measures["peak_rss"])
+	return best
+
+
+
+
+def run_benchmark(filepath, dates, configurations, repeat=1, cold_cache=False):
+	'''
+	Benchmarks the queries of a cookie log file with several configurations (see CONFIGURATIONS)
+	Input:
+		filepath::str -- path of the cookie log file
+		dates::list -- queried dates
+		configurations::list -- names of the configurations to benchmark
+		repeat::int (default=1) -- number of queries of each configuration
+		cold_cache::bool (default=False) -- evict the cookie log file from the page cache before each query
+	Output:
+		report::dict -- machine-readable report: file details, and for each configuration its wall time, lines/sec, MB/s and peak RSS, and whether its answer agrees with the first configuration
+	'''
+	file_size = os.path.getsize(filepath)
+	line_count = count_lines(filepath)
+	report = {"logfile": filepath, "dates": dates, "size_bytes": file_size, "lines": line_count, "cold_cache": cold_cache, "results": []}
+	reference_digest = None
+	for name in configurations:
+		measures = run_configuration(filepath, dates, CONFIGURATIONS[name], repeat, cold_cache)
+		if "error" in measures:
+			report["results"].append({"configuration": name, "error": measures["error"]})
+			continue
+		if reference_digest is None:
+			reference_digest = measures["digest"]
+		report["results"].append({
+			"configuration": name,
+			"wall_time": round(measures["wall_time"], 4),
+			"lines_per_second": round(line_count / measures["wall_time"]),
+			"mb_per_second": round(file_size / measures["wall_time"] / (1 << 20), 2),
+			"peak_rss_mb": round(measures["peak_rss"] / (1 << 20), 1),
+			"answer_digest": measures["digest"],
+			"agrees": measures["digest"] == reference_digest,
+		})
+	return report
+
+
+
+
+def get_disagreements(report):
+	'''
+	Lists the configurations of a benchmark report whose answer differs from the answer of the first configuration
+	Input:
+		report::dict -- benchmark report (see run_benchmark())
+	Output:
+		disagreements::list -- message of each configuration giving a different answer, empty if all agree
+	'''
+	results = [result for result in report["results"] if "error" not in result]
+	return [f"{result['configuration']}: answer digest {result['answer_digest']}, {results[0]['configuration']} answer digest {results[0]['answer_digest']}" for result in results if not(result["agrees"])]
+
+
+
+
+def compare_with_baseline(report, baseline, tolerance):
+	'''
+	Compares a benchmark report with a baseline report of the same configurations. Configurations missing from either report are not compared
+	Input:
+		report::dict -- benchmark report (see run_benchmark())
+		baseline::dict -- baseline benchmark report
+		tolerance::float -- fraction by which lines/sec may drop and peak RSS may grow before being reported as a regression
+	Output:
+		regressions::list -- message of each regression, empty if there is none
+	'''
+	baseline_results = {result["configuration"]: result for result in baseline.get("results", []) if "error" not in result}
+	regressions = []
+	for result in report["results"]:
+		baseline_result = baseline_results.get(result["configuration"])
+		if baseline_result is None:
+			continue
+		if "error" in result:
+			regressions.append(f"{result['configuration']}: {result['error']}")
+			continue
+		if result["lines_per_second"] < baseline_result["lines_per_second"] * (1 - tolerance):
+			regressions.append(f"{result['configuration']}: {result['lines_per_second']} lines/sec, baseline {baseline_result['lines_per_second']} lines/sec")
+		if result["peak_rss_mb"] > baseline_result["peak_rss_mb"] * (1 + tolerance):
+			regressions.append(f"{result['configuration']}: {result['peak_rss_mb']} MB peak RSS, baseline {baseline_result['peak_rss_mb']} MB")
+	return regressions
+
+
+
+
+def run_micro_benchmarks(args):
+	'''
+	Runs the benchmarks of the line validation, timestamp decoding and cookie counting on synthetic lines
+	Input:
+		args::namespace -- command line arguments
+	Output: NA
+	'''
+	# The processor only needs a valid logfile and date to be created, its methods are benchmarked on synthetic lines
+	processor = CookieLogProcessor(Namespace(logfilename="cookie_log.csv", date="2018-12-09"))
+	benchmark_line_validation(processor, args.lines)
+	benchmark_timestamp_decoding(args.lines)
+	benchmark_cookie_counting_memory(args.lines)
+	return
+
+
+
+
+def run_end_to_end_benchmark(args):
+	'''
+	Runs the run command: benchmarks the queries of a cookie log file (generated in a temporary directory unless given), prints the JSON report and compares it with a baseline
+	Input:
+		args::namespace -- command line arguments
+	Output: exit status, 1 if the configurations do not agree on the answer or a regression was found (int)
+	'''
+	for name in args.configurations:
+		if name not in CONFIGURATIONS:
+			print("ERROR: --configurations should be among: {}".format(", ".join(CONFIGURATIONS)), file=sys.stderr)
+			return 2
+	with tempfile.TemporaryDirectory() as directory:
+		filepath = args.logfile
+		if filepath is None:
+			filepath = os.path.join(directory, "cookie_log.csv")
+			create_generator(args).write(filepath, size=InputValidator().parse_memory_size(args.size))
+		report = run_benchmark(os.path.abspath(filepath), args.dates, args.configurations, args.repeat, args.cold_cache)
+	report_json = json.dumps(report, indent=2)
+	print(report_json)
+	if args.output is not None:
+		with open(args.output, "w") as file_pointer:
+			file_pointer.write(report_json + "\n")
+
+	disagreements = get_disagreements(report)
+	for disagreement in disagreements:
+		print(f"DISAGREEMENT: {disagreement}", file=sys.stderr)
+	if args.baseline is not None:
+		with open(args.baseline) as file_pointer:
+			baseline = json.load(file_pointer)
+		regressions = compare_with_baseline(report, baseline, args.tolerance)
+		for regression in regressions:
+			print(f"REGRESSION: {regression}", file=sys.stderr)
+		if len(regressions) > 0:
+			return 1
+	return 1 if len(disagreements) > 0 else 0
+
+
+
+
+def add_generator_arguments(parser):
+	'''
+	Adds the command line arguments of the synthetic cookie log generator to a parser
+	Input:
+		parser::argparse.ArgumentParser -- parser of a command
+	Output: NA
+	'''
+	parser.add_argument("--size", default="100M", help="Enter the approximate size of the generated log file, in bytes with an optional K, M or G suffix.")
+	parser.add_argument("--days", type=int, default=7, help="Enter the number of days of the generated lines.")
+	parser.add_argument("--cookies", type=int, default=100000, help="Enter the number of distinct cookies of the generated lines.")
+	parser.add_argument("--skew", type=float, default=1.1, help="Enter the exponent of the Zipf distribution of the cookies (0 for uniform).")
+	parser.add_argument("--timezones", default="+00:00", help="Enter the comma separated UTC offsets of the generated timestamps, e.g. +00:00,-05:00,+05:30.")
+	parser.add_argument("--malformed", type=float, default=0.0, help="Enter the share of malformed generated lines.")
+	parser.add_argument("--seed", type=int, default=0, help="Enter the seed of the generator.")
+	return
+
+
+
+
+def parse_args(argv=None):
+	'''
+	Parses command line arguments provided by the user
+	Input: Command line arguments: number of lines for the micro benchmarks, or the generate or run command and their options
+	Output: Returns parsed command line arguments
+	'''
+	parser = argparse.ArgumentParser()
+	parser.add_argument("-n", "--lines", type=int, default=200000, help="Enter the number of synthetic lines to benchmark with.")
+	subparsers = parser.add_subparsers(dest="command")
+
+	generate_parser = subparsers.add_parser("generate", help="Generate a synthetic cookie log file.")
+	generate_parser.add_argument("output", help="Enter the path of the generated log file.")
+	add_generator_arguments(generate_parser)
+
+	run_parser = subparsers.add_parser("run", help="Benchmark queries of a cookie log file and print a JSON report.")
+	run_parser.add_argument("--logfile", default=None, help="Enter the path of the log file to benchmark, a log file is generated if not given.")
+	run_parser.add_argument("-d", "--dates", nargs="+", default=["2018-12-09"], help="Enter the queried dates.")
+	run_parser.add_argument("--configurations", nargs="+", default=["text", "mmap", "numpy"], help="Enter the configurations to benchmark, among: {}.".format(", ".join(CONFIGURATIONS)))
+	run_parser.add_argument("--repeat", type=int, default=1, help="Enter the number of queries of each configuration (the best wall time is kept).")
+	run_parser.add_argument("--cold-cache", action="store_true", help="Evict the log file from the page cache before each query (with posix_fadvise), to measure cold reads.")
+	run_parser.add_argument("--output", default=None, help="Enter the path of a file to also write the JSON report to.")
+	run_parser.add_argument("--baseline", default=None, help="Enter the path of a baseline JSON report to fail on regressions against.")
+	run_parser.add_argument("--tolerance", type=float, default=0.1, help="Enter the fraction by which lines/sec may drop and peak RSS may grow against the baseline.")
+	add_generator_arguments(run_parser)
+	args = parser.parse_args(argv)
+
+	return args
+
+
+
+
+if __name__ == "__main__":
+
+	args = parse_args()
+
+	if args.command == "generate":
+		line_count = create_generator(args).write(args.output, size=InputValidator().parse_memory_size(args.size))
+		print(f"Generated {line_count} lines in {args.output}")
+	elif args.command == "run":
+		sys.exit(run_end_to_end_benchmark(args))
+	else:
+		run_micro_benchmarks(args)
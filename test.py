@@ -2,9 +2,25 @@ import unittest
 from CustomError import CustomError
 from InputValidator import InputValidator
 from CookieLogProcessor import CookieLogProcessor
+from TimestampDecoder import TimestampDecoder
+from CookieLogIndex import CookieLogIndex
+from CookieLogCache import CookieLogCache
+from CookieCounter import CookieCounter
+from CookieSketch import CookieSketch
+from CookiePartitioner import CookiePartitioner
+from HyperLogLog import HyperLogLog
+from CookieLogDecompressor import CookieLogDecompressor
+from CookieLogBlockReader import CookieLogBlockReader
+from CookieLogGenerator import CookieLogGenerator
+from CookieLogStats import CookieLogStats
+from CookieLogServer import CookieLogServer
+from CookieLogClient import CookieLogClient
 from argparse import Namespace
 from datetime import datetime
-import os, re
+from array import array
+from collections import Counter
+import benchmark
+import os, re, math, inspect, tempfile, random, io, contextlib, asyncio, tracemalloc, gzip, bz2, lzma, json, time, sys, importlib.util, subprocess
 
 
 
@@ -52,6 +68,56 @@ class TestInputValidator(unittest.TestCase):
 		result, _ = self.validator.validate_filename("cookie_log.csv")
 		self.assertTrue(result)
 
+		result, _ = self.validator.validate_filename(os.path.join(os.getcwd(), "cookie_log.csv"))
+		self.assertTrue(result)
+
+		result, _ = self.validator.validate_filename("cookie_log.csv.gz")
+		self.assertFalse(result)
+
+		result, _ = self.validator.validate_filename("cookie_log.csv.zip")
+		self.assertFalse(result)
+
+	def test_positive_integer(self):
+		# Test cases for validating handling of optional numeric arguments
+		print("Performing Tests for InputValidator.validate_positive_integer()")
+		for value_ in [1, 2, 32]:
+			result, _ = self.validator.validate_positive_integer(value_, "--top")
+			self.assertTrue(result)
+		for value_ in [0, -1, 1.5, "2", None, True]:
+			result, _ = self.validator.validate_positive_integer(value_, "--top")
+			self.assertFalse(result)
+
+	def test_fraction(self):
+		# Test cases for validating handling of optional fraction arguments
+		print("Performing Tests for InputValidator.validate_fraction()")
+		for value_ in [0.5, 0.001, 0.999]:
+			result, _ = self.validator.validate_fraction(value_, "--approx-error")
+			self.assertTrue(result)
+		for value_ in [0, 1, -0.5, 1.5, "0.5", None, True]:
+			result, _ = self.validator.validate_fraction(value_, "--approx-error")
+			self.assertFalse(result)
+
+	def test_memory_size(self):
+		# Test cases for validating and parsing memory sizes
+		print("Performing Tests for InputValidator.validate_memory_size()")
+		for size_, bytes_ in [("1000", 1000), ("64K", 65536), ("64kb", 65536), (" 2M ", 2 << 20), ("1G", 1 << 30)]:
+			self.assertEqual(self.validator.parse_memory_size(size_), bytes_)
+			result, _ = self.validator.validate_memory_size(size_, "--approx-memory", 1000)
+			self.assertTrue(result)
+		for size_ in ["", "M", "1.5M", "-1K", "1T", "999", None]:
+			result, _ = self.validator.validate_memory_size(size_, "--approx-memory", 1000)
+			self.assertFalse(result)
+
+	def test_address(self):
+		# Test cases for validating handling of server addresses
+		print("Performing Tests for InputValidator.validate_address()")
+		for address_ in ["unix:/tmp/cookies.sock", "unix:cookies.sock", "http:0", "http:8080"]:
+			result, _ = self.validator.validate_address(address_)
+			self.assertTrue(result)
+		for address_ in ["", "unix:", "http:", "http:-1", "http:65536", "http:x", "tcp:8080", "/tmp/cookies.sock", None]:
+			result, _ = self.validator.validate_address(address_)
+			self.assertFalse(result)
+
 	def test_date(self):
 		# Test cases for validating handling of input date
 		print("Performing Tests for InputValidator.validate_date()")
@@ -113,6 +179,617 @@ class TestInputValidator(unittest.TestCase):
 
 
 
+class TestTimestampDecoder(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on TimestampDecoder class functions
+	'''
+
+	def setUp(self):
+		# Function to setup common test variables before each test function
+		self.decoder = TimestampDecoder()
+		self.random = random.Random(2018)
+
+	def _strptime_date(self, timestamp):
+		# Function to obtain the expected day of a timestamp, as parsed by datetime.strptime()
+		try:
+			return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S%z").date()
+		except:
+			return None
+
+	def _random_timestamp(self):
+		# Function to generate a random timestamp with fields in and out of range, different offset formats, and occasionally a random mutation
+		fields = ["{:04d}".format(self.random.choice([self.random.randint(1994, 2030), 0, 2000, 2100])), "-", "{:02d}".format(self.random.randint(0, 13)), "-", "{:02d}".format(self.random.randint(0, 32)), self.random.choice(["T", "T", "T", "t", " "]), "{:02d}".format(self.random.randint(0, 25)), ":", "{:02d}".format(self.random.randint(0, 61)), ":", "{:02d}".format(self.random.randint(0, 61))]
+		fields.append(self.random.choice(["+00:00", "-05:00", "+05:30", "+23:59", "-23:59", "+24:00", "+12:60", "Z", "z", "+0530", "+05:3000", "+05:30:15", "+05:30:15.25", "", "+5:30"]))
+		if self.random.random() < 0.3:
+			# Single digit fields are also accepted by datetime.strptime()
+			index = self.random.choice([2, 4, 6, 8, 10])
+			fields[index] = fields[index].lstrip("0") or "0"
+		timestamp = "".join(fields)
+		if self.random.random() < 0.2:
+			index = self.random.randint(0, len(timestamp))
+			timestamp = timestamp[:index] + self.random.choice(["", "0", "9", "-", ":", "T", " ", "\u0665", "x"]) + timestamp[index + 1:]
+		return timestamp
+
+	def test_decode(self):
+		# Function to test decoding of timestamps against datetime.strptime()
+		print("Performing Tests for TimestampDecoder.decode()")
+		test_cases = ["2018-12-09T14:19:00+00:00", "2018-12-09T14:19:00 +00:00", "2018-12-09T14:19:00", "2018-12-09T", "2018-12-09", " 2018-12-09T14:19:00+00:00 ", "2018-12-09T00:00:00+00:00", "2018-12-09Thh:mm:00+00:00", "adjcbkYDE3628@#$%!", "", "2018-12-09T14:19:00+pf:mn", "2018/12/09T14:19:00+00:00", "2018-12-09T99:99:00+00:00", "2018-12-09 14:19:00+00:00", "2018-13-89T14:19:00+00:00", "2016-02-29T23:59:59-23:59", "2018-02-29T10:00:00+00:00", "0000-01-01T00:00:00Z", "2018-12-09T23:30:00-05:00", "2018-12-09T01:30:00+05:30"]
+		for test_ in test_cases:
+			self.assertEqual(self.decoder.decode(test_), self._strptime_date(test_), test_)
+			# Decoding again is served from the cache
+			self.assertEqual(self.decoder.decode(test_), self._strptime_date(test_), test_)
+
+	def test_decode_random(self):
+		# Property test: for randomly generated and mutated timestamps, the decoded day is always the same as with datetime.strptime()
+		print("Performing randomized Tests for TimestampDecoder.decode()")
+		for _ in range(20000):
+			test_ = self._random_timestamp()
+			self.assertEqual(self.decoder.decode(test_), self._strptime_date(test_), test_)
+
+	def test_decode_instant(self):
+		# Property test: for randomly generated and mutated timestamps, the decoded instant is the same as the one of datetime.strptime() (in seconds from 0001-01-01T00:00:00 UTC)
+		print("Performing randomized Tests for TimestampDecoder.decode_instant()")
+		epoch_ = datetime.strptime("0001-01-01T00:00:00+00:00", "%Y-%m-%dT%H:%M:%S%z")
+		for _ in range(20000):
+			test_ = self._random_timestamp()
+			try:
+				expected_ = math.floor((datetime.strptime(test_, "%Y-%m-%dT%H:%M:%S%z") - epoch_).total_seconds()) + 86400
+			except:
+				expected_ = None
+			self.assertEqual(self.decoder.decode_instant(test_), expected_, test_)
+		self.assertLess(self.decoder.decode_instant("2018-12-05T00:58:00+00:00"), self.decoder.decode_instant("2018-12-04T16:59:00-08:00"))
+
+	def test_cache(self):
+		# Function to test that the cache is keyed by date prefix and offset and stays bounded
+		print("Performing Tests for TimestampDecoder cache")
+		decoder = TimestampDecoder()
+		decoder.cache_size = 4
+		for hour_ in range(24):
+			decoder.decode(f"2018-12-09T{hour_:02d}:00:00+00:00")
+		self.assertEqual(decoder.cache, {("2018-12-09", "+00:00"): datetime(2018, 12, 9).date()})
+		for day_ in range(1, 11):
+			decoder.decode(f"2018-12-{day_:02d}T00:00:00-05:00")
+		self.assertLessEqual(len(decoder.cache), 4)
+
+
+
+
+class TestCookieLogIndex(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on CookieLogIndex class functions
+	'''
+
+	def setUp(self):
+		# Function to setup a temporary logfile and index path before each test function
+		file_descriptor, self.filepath = tempfile.mkstemp(suffix=".csv")
+		with os.fdopen(file_descriptor, "w") as f:
+			f.write("cookie,timestamp\nAtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00\n")
+		self.index = CookieLogIndex(self.filepath + ".idx")
+
+	def tearDown(self):
+		# Function to remove the temporary logfile and index
+		for path_ in [self.filepath, self.filepath + ".idx"]:
+			if os.path.exists(path_):
+				os.remove(path_)
+
+	def test_save_load(self):
+		# Function to test writing and reading back the index
+		print("Performing Tests for CookieLogIndex.save() and CookieLogIndex.load()")
+		self.assertFalse(self.index.load(self.filepath))
+		dates = [datetime(2018, 12, 9).date(), datetime(2018, 12, 8).date()]
+		cookie_map = {dates[0]: {"b": 2, "a": 2, "c": 1}, dates[1]: {"\u00e9": 1}}
+		self.index.save(self.index.get_signature(self.filepath, 17), 6, {dates[0]: [17, 100], dates[1]: [100, 200]}, cookie_map)
+		index = CookieLogIndex(self.filepath + ".idx")
+		self.assertTrue(index.load(self.filepath))
+		self.assertEqual(index.line_count, 6)
+		self.assertEqual(list(index.days.keys()), dates)
+		self.assertEqual(index.days[dates[1]]["range"], [100, 200])
+		for date_ in dates:
+			self.assertEqual(list(index.get_day_counts(date_).items()), list(cookie_map[date_].items()))
+		self.assertEqual(index.get_day_counts(datetime(2018, 12, 7).date()), {})
+
+	def test_signature(self):
+		# Function to test that appending to the logfile keeps the index loadable, while any other change invalidates it
+		print("Performing Tests for CookieLogIndex.get_signature()")
+		size_ = os.path.getsize(self.filepath)
+		signature = self.index.get_signature(self.filepath, size_)
+		self.assertEqual(signature, self.index.get_signature(self.filepath, size_))
+		self.assertEqual(signature["offset"], size_)
+		self.index.save(signature, 1, {}, {})
+		with open(self.filepath, "a") as f:
+			f.write("x")
+		# Appended bytes after the indexed offset
+		self.assertTrue(CookieLogIndex(self.index.index_path).load(self.filepath))
+		stat = os.stat(self.filepath)
+		with open(self.filepath, "r+") as f:
+			f.write("C")
+		os.utime(self.filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+		# Same size and mtime, different content
+		self.assertNotEqual(signature["prefix_digest"], self.index.get_signature(self.filepath, size_)["prefix_digest"])
+		os.utime(self.filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+		self.assertFalse(CookieLogIndex(self.index.index_path).load(self.filepath))
+		with open(self.filepath, "w") as f:
+			f.write("cookie,timestamp\n")
+		# Truncated logfile
+		self.assertFalse(CookieLogIndex(self.index.index_path).load(self.filepath))
+
+	def test_rewrite_middle(self):
+		# Function to test that a line rewritten in the middle of a large logfile, without changing its size, invalidates the index, and that a rewrite of the end of the indexed prefix followed by an append invalidates it as well
+		print("Performing Tests for CookieLogIndex.load() after rewriting the middle of the logfile")
+		line_ = "AtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00\n"
+		with open(self.filepath, "w") as f:
+			f.write("cookie,timestamp\n" + line_ * 10000)
+		size_ = os.path.getsize(self.filepath)
+		self.index.save(self.index.get_signature(self.filepath, size_), 10000, {}, {})
+		with open(self.filepath, "a") as f:
+			f.write(line_)
+		index_ = CookieLogIndex(self.index.index_path)
+		self.assertTrue(index_.load(self.filepath))
+		self.assertEqual(index_.get_signature(self.filepath, size_ + len(line_))["prefix_digest"], self.index.get_prefix_digest(self.filepath, size_ + len(line_)))
+		with open(self.filepath, "r+") as f:
+			f.seek(size_ - len(line_))
+			f.write(line_.replace("AtY0", "SAZu"))
+		self.assertFalse(CookieLogIndex(self.index.index_path).load(self.filepath))
+		size_ = os.path.getsize(self.filepath)
+		self.index.save(self.index.get_signature(self.filepath, size_), 10001, {}, {})
+		with open(self.filepath, "r+") as f:
+			f.seek(size_ // 2 - size_ // 2 % len(line_))
+			f.write(line_.replace("AtY0", "SAZu"))
+		os.utime(self.filepath, ns=(os.stat(self.filepath).st_atime_ns, os.stat(self.filepath).st_mtime_ns + 1000))
+		self.assertFalse(CookieLogIndex(self.index.index_path).load(self.filepath))
+
+
+
+
+class TestCookieLogCache(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on CookieLogCache class functions
+	'''
+
+	def setUp(self):
+		# Function to setup a temporary logfile and cache path before each test function
+		file_descriptor, self.filepath = tempfile.mkstemp(suffix=".csv")
+		with os.fdopen(file_descriptor, "w") as f:
+			f.write("cookie,timestamp\nAtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00\n")
+		self.cache = CookieLogCache(self.filepath + ".ckc")
+
+	def tearDown(self):
+		# Function to unmap and remove the temporary logfile and cache
+		self.cache.close()
+		for path_ in [self.filepath, self.filepath + ".ckc"]:
+			if os.path.exists(path_):
+				os.remove(path_)
+
+	def test_write_load(self):
+		# Function to test writing and memory-mapping back the cache
+		print("Performing Tests for CookieLogCache.write() and CookieLogCache.load()")
+		self.assertFalse(self.cache.load(self.filepath))
+		dates = [datetime(2018, 12, 9).date(), datetime(2018, 12, 8).date(), datetime(2018, 12, 7).date()]
+		self.cache.write(self.cache.get_signature(self.filepath), 7, {dates[0]: array("I", [1, 0, 1, 2]), dates[1]: array("I", [2, 2, 1]), dates[2]: array("I")}, ["a", "b", "c"])
+		self.assertTrue(self.cache.load(self.filepath))
+		self.assertEqual(self.cache.line_count, 7)
+		self.assertEqual(list(self.cache.days.keys()), dates)
+		self.assertEqual(list(self.cache.get_day_counts(dates[0]).items()), [("b", 2), ("a", 1), ("c", 1)])
+		self.assertEqual(list(self.cache.get_day_counts(dates[1]).items()), [("c", 2), ("b", 1)])
+		self.assertEqual(self.cache.get_day_counts(dates[2]), {})
+		self.assertEqual(self.cache.get_day_counts(datetime(2018, 12, 6).date()), {})
+
+		# A changed logfile makes the cache stale
+		stat = os.stat(self.filepath)
+		with open(self.filepath, "r+") as f:
+			f.write("C")
+		os.utime(self.filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+		self.assertFalse(CookieLogCache(self.cache.cache_path).load(self.filepath))
+
+
+
+
+class TestCookieCounter(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on CookieCounter and CookieInterner class functions
+	'''
+
+	def test_add(self):
+		# Function to test that the counter counts like a dict, keeping the cookies in the order of first occurence
+		print("Performing Tests for CookieCounter.add()")
+		counter, expected = CookieCounter(), {}
+		generator = random.Random(3)
+		for _ in range(5000):
+			cookie = "cookie{:010d}".format(generator.randint(0, 999))
+			counter.add(cookie)
+			expected[cookie] = expected.get(cookie, 0) + 1
+		self.assertEqual(list(counter.items()), list(expected.items()))
+		self.assertEqual(counter, expected)
+		self.assertEqual(len(counter), len(expected))
+		self.assertEqual(list(counter.values()), list(expected.values()))
+		self.assertIsNone(counter.interner.cookie_ends)
+		self.assertIsNone(counter.get("unknown"))
+		self.assertNotIn("unknown", counter)
+		self.assertRaises(KeyError, counter.__getitem__, "unknown")
+
+	def test_variable_length(self):
+		# Function to test that cookies of different lengths are interned (and decoded back) once offsets are stored
+		print("Performing Tests for CookieInterner.lookup()")
+		counter = CookieCounter()
+		cookies = ["AtY0laUfhglK3lC7", "SAZuXPGUrfbcn5UA", "a", "", "SAZuXPGUrfbcn5UA", "fbcn5UAVanZf6UtGxx", "a"]
+		for cookie in cookies:
+			counter.add(cookie)
+		self.assertIsNotNone(counter.interner.cookie_ends)
+		self.assertEqual(list(counter.items()), [("AtY0laUfhglK3lC7", 1), ("SAZuXPGUrfbcn5UA", 2), ("a", 2), ("", 1), ("fbcn5UAVanZf6UtGxx", 1)])
+		self.assertEqual(counter.interner.lookup(b"fbcn5UAVanZf6UtGxx"), 4)
+		self.assertIsNone(counter.interner.lookup(b"fbcn5UAVanZf6UtG"))
+
+		# Counters are merged like dicts
+		counter["a"] = counter.get("a", 0) + 3
+		counter["new"] = counter.get("new", 0) + 1
+		self.assertEqual(counter["a"], 5)
+		self.assertEqual(list(counter)[-1], "new")
+
+	def test_memory(self):
+		# Function to test that a counter of many distinct cookies takes at least 3 times less memory than a dict
+		print("Performing Tests for CookieCounter memory usage")
+		cookies = ["{:016x}".format(index_ * 7919) for index_ in range(100000)]
+		sizes = []
+		for counter_type_ in [dict, CookieCounter]:
+			tracemalloc.start()
+			counter = counter_type_()
+			for cookie in cookies:
+				# Cookies are copied as the parser creates a new string per line
+				cookie = cookie.encode().decode()
+				if counter_type_ is dict:
+					counter[cookie] = counter.get(cookie, 0) + 1
+				else:
+					counter.add(cookie)
+			sizes.append(tracemalloc.get_traced_memory()[0])
+			tracemalloc.stop()
+			del counter
+		self.assertGreaterEqual(sizes[0] / sizes[1], 3)
+
+
+
+class TestCookieSketch(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on CookieSketch class functions
+	'''
+
+	def test_add(self):
+		# Function to test the error bounds of the estimated counts on a skewed stream of cookies, and that the number of tracked cookies stays bounded
+		print("Performing Tests for CookieSketch.add()")
+		generator = random.Random(5)
+		sketch, counts = CookieSketch(50), {}
+		for _ in range(20000):
+			cookie = "cookie{}".format(int(generator.paretovariate(1.0)))
+			sketch.add(cookie)
+			counts[cookie] = counts.get(cookie, 0) + 1
+		self.assertEqual(len(sketch), 50)
+		self.assertEqual(len(sketch.heap), 50)
+		self.assertEqual(sketch.total, 20000)
+		self.assertLessEqual(sketch.get_error_bound(), sketch.total // sketch.capacity)
+		for cookie, count in sketch.items():
+			self.assertLessEqual(counts[cookie], count)
+			self.assertLessEqual(count - sketch.get_error(cookie), counts[cookie])
+		for cookie, count in counts.items():
+			if cookie not in sketch:
+				self.assertLessEqual(count, sketch.get_error_bound())
+
+		# The heavy hitters are found along with their exact counts
+		most_active_cookies = [cookie for cookie, count in sketch.items() if count == max(sketch.values())]
+		self.assertEqual(most_active_cookies, ["cookie1"])
+		self.assertTrue(sketch.is_exact(most_active_cookies))
+		self.assertEqual(sketch["cookie1"], counts["cookie1"])
+
+	def test_is_exact(self):
+		# Function to test when the extracted cookies are provably exact
+		print("Performing Tests for CookieSketch.is_exact()")
+		sketch = CookieSketch(2)
+		self.assertTrue(sketch.is_exact([]))
+		for cookie in ["a", "b", "a", "b"]:
+			sketch.add(cookie)
+		self.assertEqual(sketch.get_error_bound(), 0)
+		self.assertTrue(sketch.is_exact(["a", "b"]))
+		self.assertTrue(sketch.is_exact(["a"]))
+
+		sketch.add("c")
+		self.assertEqual(list(sketch.items()), [("b", 2), ("c", 3)])
+		self.assertEqual(sketch.get_error("c"), 2)
+		self.assertEqual(sketch.get_error_bound(), 2)
+		self.assertFalse(sketch.is_exact(["c"]))
+		for _ in range(2):
+			sketch.add("b")
+		self.assertTrue(sketch.is_exact(["b"]))
+		self.assertFalse(sketch.is_exact(["b", "c"]))
+
+
+
+class TestCookiePartitioner(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on CookiePartitioner class functions
+	'''
+
+	def test_get_cookie_map(self):
+		# Function to test that the candidates aggregated across (nested) partitions give the same most active and top cookies as complete counts, ties included
+		print("Performing Tests for CookiePartitioner.get_cookie_map()")
+		generator = random.Random(17)
+		dates = [datetime(2018, 12, day_).date() for day_ in [9, 8, 7]]
+		records = [(generator.choice(dates), "cookie{}".format(generator.randint(0, 300))) for _ in range(5000)]
+		counts = {}
+		for date_, cookie_ in records:
+			counts.setdefault(date_, {})
+			counts[date_][cookie_] = counts[date_].get(cookie_, 0) + 1
+		processor = CookieLogProcessor(Namespace(logfilename="test_cookie_log.csv", date="2018-12-09"))
+		for top_ in [None, 1, 5]:
+			for entry_limit_ in [10 ** 6, 200, 20]:
+				partitioner = CookiePartitioner(CookiePartitioner.entry_size, top_)
+				partitioner.entry_limit = entry_limit_
+				for date_, cookie_ in records:
+					partitioner.add(date_, cookie_)
+				cookie_map = partitioner.get_cookie_map()
+				self.assertEqual(partitioner.spill_count > 0, entry_limit_ < 10 ** 6)
+				for date_ in dates:
+					if top_ is None:
+						self.assertEqual(processor._get_most_active_from_counts(cookie_map[date_]), processor._get_most_active_from_counts(counts[date_]))
+					else:
+						self.assertEqual(processor._get_top_from_counts(cookie_map[date_], top_), processor._get_top_from_counts(counts[date_], top_))
+
+		# Cookies which all occur once are all tied, and kept in the order of their first occurence across partitions
+		partitioner = CookiePartitioner(CookiePartitioner.entry_size)
+		partitioner.entry_limit = 20
+		for index_ in range(1000):
+			partitioner.add(dates[0], "cookie{}".format(index_))
+		self.assertEqual(list(partitioner.get_cookie_map()[dates[0]].items()), [("cookie{}".format(index_), 1) for index_ in range(1000)])
+		self.assertEqual(partitioner.candidates, {})
+
+
+
+class TestHyperLogLog(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on HyperLogLog class functions
+	'''
+
+	def test_estimate(self):
+		# Function to test that the estimates are within a few standard errors, for small and large numbers of distinct cookies
+		print("Performing Tests for HyperLogLog.estimate()")
+		sketch = HyperLogLog()
+		self.assertEqual(len(sketch.registers), 4096)
+		self.assertEqual(sketch.estimate(), 0)
+		for cookie_count_ in [1, 10, 100, 1000, 20000, 60000]:
+			sketch = HyperLogLog()
+			for index_ in range(cookie_count_):
+				sketch.add(f"cookie{index_}")
+				# Duplicates do not change the estimate
+				sketch.add(f"cookie{index_}")
+			self.assertLessEqual(abs(sketch.estimate() - cookie_count_), max(1, 0.05 * cookie_count_))
+
+	def test_merge(self):
+		# Function to test that merging sketches gives the sketch of the union of the cookies
+		print("Performing Tests for HyperLogLog.merge()")
+		sketches = [HyperLogLog() for _ in range(3)]
+		for index_ in range(30000):
+			sketches[index_ % 2].add(f"cookie{index_ // 3}")
+			sketches[2].add(f"cookie{index_ // 3}")
+		self.assertEqual(sketches[0].merge(sketches[1]).registers, sketches[2].registers)
+		self.assertEqual(sketches[0].estimate(), sketches[2].estimate())
+		self.assertRaises(CustomError, sketches[0].merge, HyperLogLog(10))
+
+
+
+class TestCookieLogStats(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on CookieLogStats class functions
+	'''
+
+	def test_time(self):
+		# Function to test that a stage does not include the seconds of the stages timed within it
+		print("Performing Tests for CookieLogStats.time()")
+		def slow_lines_():
+			time.sleep(0.02)
+			yield "line"
+
+		stats_ = CookieLogStats()
+		start_ = time.perf_counter()
+		with stats_.time("aggregate", ["read", "parse"]):
+			for line_ in stats_.time_iterator("read", slow_lines_()):
+				stats_.time_function("parse", time.sleep)(0.03)
+			time.sleep(0.01)
+		elapsed_ = time.perf_counter() - start_
+		# Only lower bounds are asserted for the sleeps, which may take longer on a loaded machine
+		self.assertGreaterEqual(stats_.seconds["read"], 0.015)
+		self.assertGreaterEqual(stats_.seconds["parse"], 0.025)
+		self.assertGreaterEqual(stats_.seconds["aggregate"], 0.005)
+		# The stages do not overlap, so they add up to at most the time elapsed, which would not be the case if the nested stages were included in the aggregate stage
+		self.assertLessEqual(stats_.seconds["read"] + stats_.seconds["parse"] + stats_.seconds["aggregate"], elapsed_)
+		self.assertEqual(stats_.seconds["extract"], 0)
+
+	def test_merge(self):
+		# Function to test merging the statistics of a worker process
+		print("Performing Tests for CookieLogStats.merge()")
+		stats_, worker_stats_ = CookieLogStats(), CookieLogStats()
+		stats_.add_skip("whitespace", False)
+		worker_stats_.add_skip("whitespace", False)
+		worker_stats_.add_skip("missing_comma", False)
+		worker_stats_.add_skip("missing_comma", True)
+		worker_stats_.byte_count = 10
+		stats_.merge(worker_stats_).add_lines(5)
+		self.assertEqual(stats_.to_dict()["lines"], {"read": 5, "accepted": 2, "skipped": 3, "blank": 1})
+		self.assertEqual(stats_.to_dict()["skipped_by_reason"], {"missing_comma": 1, "whitespace": 2})
+		self.assertEqual(stats_.to_dict()["bytes_processed"], 10)
+		stats_.add_lines(None)
+		self.assertEqual(stats_.to_dict()["lines"]["accepted"], None)
+		worker_stats_.skip_counts_known = False
+		stats_ = CookieLogStats().merge(worker_stats_)
+		stats_.add_lines(5)
+		self.assertEqual(stats_.to_dict()["lines"], {"read": 5, "accepted": None, "skipped": None, "blank": None})
+		self.assertIsNone(stats_.to_dict()["skipped_by_reason"])
+
+
+
+class TestCookieLogGenerator(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on CookieLogGenerator class functions
+	'''
+
+	def test_iter_lines(self):
+		# Function to test that generated lines are deterministic, sorted by day (newest first), skewed and malformed as configured
+		print("Performing Tests for CookieLogGenerator.iter_lines()")
+		generator_ = CookieLogGenerator(days=3, cookie_count=1000, zipf_skew=1.2, timezones=["+00:00", "-05:00"], malformed_ratio=0.1, seed=7)
+		lines_ = list(generator_.iter_lines(3000))
+		self.assertEqual(lines_, list(CookieLogGenerator(days=3, cookie_count=1000, zipf_skew=1.2, timezones=["+00:00", "-05:00"], malformed_ratio=0.1, seed=7).iter_lines(3000)))
+		self.assertNotEqual(lines_, list(CookieLogGenerator(days=3, cookie_count=1000, zipf_skew=1.2, timezones=["+00:00", "-05:00"], malformed_ratio=0.1, seed=8).iter_lines(3000)))
+		self.assertEqual(lines_[0], "cookie,timestamp\n")
+		self.assertEqual(len(lines_), 3001)
+
+		processor_ = CookieLogProcessor(Namespace(logfilename="cookie_log.csv", date="2018-12-09"))
+		parsed_ = [processor_._parse_entry(line_) for line_ in lines_[1:]]
+		valid_ = [(cookie_, date_) for cookie_, date_, skip_reason_ in parsed_ if skip_reason_ is None]
+		self.assertTrue(0.08 < 1 - len(valid_) / 3000 < 0.12)
+		# Lines are sorted by instant, while the days in the offsets of the timestamps may not be sorted
+		instants_ = [TimestampDecoder().decode_instant(line_.strip().split(",")[1]) for line_, (_, _, skip_reason_) in zip(lines_[1:], parsed_) if skip_reason_ is None]
+		self.assertEqual(instants_, sorted(instants_, reverse=True))
+		self.assertNotEqual([str(date_) for _, date_ in valid_], sorted([str(date_) for _, date_ in valid_], reverse=True))
+		self.assertEqual(sorted(set(str(date_) for _, date_ in valid_)), ["2018-12-06", "2018-12-07", "2018-12-08", "2018-12-09"])
+		self.assertTrue(3 * 86400 - 3600 < max(instants_) - min(instants_) < 3 * 86400)
+		self.assertEqual(set(line_.strip()[-6:] for line_ in lines_[1:] if len(line_.strip()) > 0), {"+00:00", "-05:00"})
+		counts_ = Counter(cookie_ for cookie_, _ in valid_)
+		self.assertTrue(all(re.fullmatch(r"[0-9A-Za-z]{16}", cookie_) for cookie_ in counts_))
+		self.assertEqual(counts_.most_common(1)[0][0], generator_.get_cookie(0))
+		self.assertEqual(len(set(generator_.get_cookie(rank_) for rank_ in range(1000))), 1000)
+
+	def test_write(self):
+		# Function to test that the written logfile has the requested number of lines or about the requested size, and gives the most active cookies of its lines
+		print("Performing Tests for CookieLogGenerator.write()")
+		file_descriptor_, filepath_ = tempfile.mkstemp(suffix=".csv", dir=os.getcwd())
+		os.close(file_descriptor_)
+		self.addCleanup(os.remove, filepath_)
+		generator_ = CookieLogGenerator(days=2, cookie_count=50, seed=3)
+		self.assertEqual(generator_.write(filepath_, line_count=500), 500)
+		with open(filepath_) as f:
+			lines_ = f.read().splitlines()
+		self.assertEqual(len(lines_), 501)
+		counts_ = Counter(line_.split(",")[0] for line_ in lines_[1:] if "2018-12-09T" in line_)
+		highest_count_ = max(counts_.values())
+		processor_ = CookieLogProcessor(Namespace(logfilename=os.path.basename(filepath_), date="2018-12-09"))
+		self.assertEqual(sorted(processor_.get_most_active_cookie()), sorted(cookie_ for cookie_, count_ in counts_.items() if count_ == highest_count_))
+
+		generator_.write(filepath_, size=100000)
+		self.assertTrue(90000 < os.path.getsize(filepath_) < 110000)
+
+
+
+class TestBenchmark(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on the benchmark harness functions
+	'''
+
+	def test_compare_with_baseline(self):
+		# Function to test that drops of lines/sec and growths of peak RSS beyond the tolerance are reported as regressions
+		print("Performing Tests for benchmark.compare_with_baseline()")
+		baseline_ = {"results": [{"configuration": "text", "lines_per_second": 1000, "peak_rss_mb": 50.0}, {"configuration": "mmap", "lines_per_second": 2000, "peak_rss_mb": 60.0}]}
+		report_ = {"results": [{"configuration": "text", "lines_per_second": 950, "peak_rss_mb": 54.0}, {"configuration": "numpy", "lines_per_second": 10, "peak_rss_mb": 500.0}]}
+		self.assertEqual(benchmark.compare_with_baseline(report_, baseline_, 0.1), [])
+		report_["results"].append({"configuration": "mmap", "lines_per_second": 1700, "peak_rss_mb": 70.0})
+		self.assertEqual(len(benchmark.compare_with_baseline(report_, baseline_, 0.1)), 2)
+		self.assertEqual(benchmark.compare_with_baseline(report_, baseline_, 0.2), [])
+		report_["results"][0] = {"configuration": "text", "error": "ERROR: failed"}
+		self.assertEqual(benchmark.compare_with_baseline(report_, baseline_, 0.2), ["text: ERROR: failed"])
+
+	def test_get_disagreements(self):
+		# Function to test that configurations giving a different answer than the first one are reported, and make the run command fail
+		print("Performing Tests for benchmark.get_disagreements()")
+		report_ = {"results": [{"configuration": "text", "error": "ERROR: failed"}, {"configuration": "mmap", "answer_digest": "a", "agrees": True}, {"configuration": "numpy", "answer_digest": "a", "agrees": True}]}
+		self.assertEqual(benchmark.get_disagreements(report_), [])
+		report_["results"].append({"configuration": "regex", "answer_digest": "b", "agrees": False})
+		self.assertEqual(benchmark.get_disagreements(report_), ["regex: answer digest b, mmap answer digest a"])
+		args_ = benchmark.parse_args(["run", "--logfile", "cookie_log.csv", "-d", "2018-12-09", "--configurations", "text", "mmap"])
+		self.addCleanup(setattr, benchmark, "run_benchmark", benchmark.run_benchmark)
+		benchmark.run_benchmark = lambda *args: report_
+		with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()) as errors_:
+			self.assertEqual(benchmark.run_end_to_end_benchmark(args_), 1)
+		self.assertIn("DISAGREEMENT: regex", errors_.getvalue())
+		report_["results"].pop()
+		with contextlib.redirect_stdout(io.StringIO()):
+			self.assertEqual(benchmark.run_end_to_end_benchmark(args_), 0)
+
+
+
+class TestCookieLogServer(unittest.TestCase):
+	'''
+	Test cases to perform unit tests on CookieLogServer and CookieLogClient class functions
+	'''
+
+	def setUp(self):
+		# Function to setup a temporary logfile in the current working directory before each test function
+		file_descriptor, self.filepath = tempfile.mkstemp(suffix=".csv", dir=os.getcwd())
+		with os.fdopen(file_descriptor, "w") as f:
+			f.write(open(os.path.join(os.getcwd(), "test_cookie_log.csv"), "r").read())
+		self.logfilename = os.path.basename(self.filepath)
+		self.socket_path = self.filepath + ".sock"
+
+	def tearDown(self):
+		# Function to remove the temporary logfile and socket
+		for path_ in [self.filepath, self.socket_path]:
+			if os.path.exists(path_):
+				os.remove(path_)
+
+	def _query(self, address, **options):
+		# Function to query a server with the client in a worker thread, returning the output lines or the error message
+		args_ = Namespace(logfilename=self.logfilename, date=options.get("date"), date_range=options.get("date_range"), top=options.get("top"))
+		def query():
+			try:
+				return CookieLogClient(address).query(args_)
+			except CustomError as e:
+				return str(e)
+		return asyncio.get_running_loop().run_in_executor(None, query)
+
+	def test_serve(self):
+		# Function to test that the server answers like the command line over both protocols, concurrently, and reloads the changed logfile
+		print("Performing Tests for CookieLogServer.answer() and CookieLogClient.query()")
+		queries_ = [{"date": ["2018-12-09"]}, {"date": ["2018-12-09", "2018-12-07"]}, {"date_range": ["2018-12-07", "2018-12-09"], "top": 2}, {"date": ["2018-11-07"]}]
+		expected_ = []
+		for query_ in queries_:
+			processor_, output_ = CookieLogProcessor(Namespace(logfilename=self.logfilename, **{"date": None, "top": None, **query_})), io.StringIO()
+			with contextlib.redirect_stdout(output_):
+				processor_.print_most_active_cookie()
+			expected_.append(output_.getvalue().splitlines())
+
+		async def serve():
+			servers_ = [CookieLogServer(Namespace(logfilename=self.logfilename, serve=f"unix:{self.socket_path}")), CookieLogServer(Namespace(logfilename=self.logfilename, serve="http:0", engine="mmap"))]
+			for server_ in servers_:
+				await server_.start()
+			addresses_ = [f"unix:{self.socket_path}", f"http:{servers_[1].port}"]
+			try:
+				for address_ in addresses_:
+					self.assertEqual(await asyncio.gather(*[self._query(address_, **query_) for query_ in queries_]), expected_)
+					self.assertIn("ERROR: The entered date is a date in future!", await self._query(address_, date=["2050-12-09"]))
+					self.assertEqual(await self._query(address_), "Class::CookieLogProcessor() creation failed: ERROR: No date provided!")
+
+				# Appended lines (the last one without a newline) are added to the loaded counts
+				f = open(self.filepath, "a")
+				f.write("\nfbcn5UAVanZf6UtG,2018-12-07T01:00:00+00:00\nfbcn5UAVanZf6UtG,2018-12-07T02:00:00+00:00")
+				f.close()
+				for address_ in addresses_:
+					self.assertEqual(await self._query(address_, date=["2018-12-07"]), ["fbcn5UAVanZf6UtG"])
+				self.assertEqual(servers_[0].signature["trailing_line_count"], 1)
+
+				# A rewritten logfile is loaded again
+				f = open(self.filepath, "w")
+				f.write("cookie,timestamp\nSAZuXPGUrfbcn5UA,2018-12-07T01:00:00+00:00\n")
+				f.close()
+				for address_ in addresses_:
+					self.assertEqual(await self._query(address_, date=["2018-12-07", "2018-12-09"]), ["2018-12-07,SAZuXPGUrfbcn5UA"])
+			finally:
+				for server_ in servers_:
+					await server_.stop()
+		asyncio.run(serve())
+		self.assertFalse(os.path.exists(self.socket_path))
+
+		with self.assertRaises(CustomError):
+			CookieLogServer(Namespace(logfilename=self.logfilename, serve="tcp:8080"))
+		with self.assertRaises(CustomError):
+			CookieLogClient(f"unix:{self.socket_path}").query(Namespace(logfilename=self.logfilename, date=["2018-12-09"]))
+
+
+
+
 class TestCookieLogProcessor(unittest.TestCase):
 	'''
 	Test cases to perform unit tests on CookieLogProcessor class functions
@@ -176,6 +853,16 @@ class TestCookieLogProcessor(unittest.TestCase):
 				f.close()
 				self.assertEqual(len(processor._read_logfile()), len(data))
 
+	def test_iter_logfile(self):
+		# Function to test that streaming the cookie logfile yields the same lines as reading the whole file at once
+		print("Performing Tests for CookieLogProcessor._iter_logfile()")
+		for filename_ in ["cookie_log.csv", "test_cookie_log.csv"]:
+			self.args.logfilename, self.args.date = filename_, "2018-12-09"
+			processor = CookieLogProcessor(self.args)
+			lines = processor._iter_logfile()
+			self.assertTrue(inspect.isgenerator(lines))
+			self.assertEqual([line.rstrip("\n") for line in lines], processor._read_logfile())
+
 	def test_check_date_format(self):
 		# Function to test correct parsing of two types of date formats: one used in query (command line argument) and one used in log file.
 		# Correct filename, query date is passed as it is not being tested here, the function itself is being tested
@@ -270,6 +957,34 @@ class TestCookieLogProcessor(unittest.TestCase):
 		self.assertEqual(processor._skip_entry(["AtY0laUfhglK3lC7 ","Ffdfcvkih"]), True)
 		self.assertEqual(processor._skip_entry(["AtY0\n\t\f\vlaUfh glK3lC7","2018-12-09 14:19:00+00:00"]), True)
 
+	def test_parse_entry(self):
+		# Function to test that the single pass line parser accepts and skips the same lines as _skip_entry(), and returns the appropriate skip reasons
+		print("Performing Tests for CookieLogProcessor._parse_entry()")
+		self.args.logfilename, self.args.date = "cookie_log.csv", "2023-11-14"
+		processor = CookieLogProcessor(self.args)
+		f = open(os.path.join(os.getcwd(), "test_cookie_log.csv"), "r")
+		test_cases = f.read().split("\n")
+		f.close()
+		test_cases += ["", "   ", "\r\n", "a,b,c", "  ,  ", ",", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00\r\n", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00,extra, items", "A+-.B,2018-12-09T14:19:00Z", "\u00a0AtY0laUfhglK3lC7\u00a0,\u20032018-12-09T14:19:00+00:00", "AtY0laUfhglK3lC7,2018-12-09t14:19:00+0530", "AtY0laUfhglK3lC7,2018-1-9T4:19:0-05:00", "AtY0laUfhglK3lC7,2018-12-09T14:19:60+00:00", "AtY0laUfhglK3lC7,2018-02-30T14:19:00+00:00", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+24:00", "AtY0laUfhglK3lC7,2018-12-09T14:19:00z", "Aty\u00e9,2018-12-09T14:19:00+00:00", "AtY0laUfhglK3lC7,\t2018-12-09T23:59:59-11:59\t,"]
+		for test_ in test_cases:
+			expected = None
+			if "," in test_:
+				items = processor._preprocess_line(test_.split(",")[:2])
+				if not(processor._skip_entry(items)):
+					expected = (items[0], processor._process_date(items[1]))
+			cookie, date, skip_reason = processor._parse_entry(test_)
+			if expected is None:
+				self.assertEqual((cookie, date), (None, None), test_)
+				self.assertIsNotNone(skip_reason, test_)
+			else:
+				self.assertEqual((cookie, date, skip_reason), expected + (None,), test_)
+
+		self.assertEqual(processor._parse_entry("AtY0laUfhglK3lC7 2018-12-09T14:19:00+00:00")[2], CookieLogProcessor.SKIP_MISSING_COMMA)
+		self.assertEqual(processor._parse_entry("AtY0 laUfhglK3lC7,2018-12-09T14:19:00+00:00")[2], CookieLogProcessor.SKIP_WHITESPACE)
+		self.assertEqual(processor._parse_entry(",2018-12-09T14:19:00+00:00")[2], CookieLogProcessor.SKIP_EMPTY)
+		self.assertEqual(processor._parse_entry("AtY0@laUfhglK3lC7,2018-12-09T14:19:00+00:00")[2], CookieLogProcessor.SKIP_BAD_CHARACTERS)
+		self.assertEqual(processor._parse_entry("AtY0laUfhglK3lC7,2018-12-0914:19:00+00:00")[2], CookieLogProcessor.SKIP_BAD_TIMESTAMP)
+
 	def test_get_sorted_mapping(self):
 		# Function to test sorting of a dictionary
 		print("Performing Tests for CookieLogProcessor._get_sorted_mapping()")
@@ -295,6 +1010,39 @@ class TestCookieLogProcessor(unittest.TestCase):
 		self.assertEqual(CookieLogProcessor._get_maximum_dict_value(CookieLogProcessor, {"a": "a", "b": "c", "c": "b"}), "c")
 		self.assertEqual(CookieLogProcessor._get_maximum_dict_value(CookieLogProcessor, {"a": "c", "b": "c", "c": "c"}), "c")
 
+	def test_get_most_active_from_counts(self):
+		# Function to test that all cookies tied for the highest count are selected, in the order of their first occurence
+		print("Performing Tests for CookieLogProcessor._get_most_active_from_counts()")
+		self.assertEqual(CookieLogProcessor._get_most_active_from_counts(CookieLogProcessor, {}), [])
+		self.assertEqual(CookieLogProcessor._get_most_active_from_counts(CookieLogProcessor, {"a": 1, "b": 3, "c": 2}), ["b"])
+		self.assertEqual(CookieLogProcessor._get_most_active_from_counts(CookieLogProcessor, {"c": 3, "a": 1, "b": 3}), ["c", "b"])
+		self.assertEqual(CookieLogProcessor._get_most_active_from_counts(CookieLogProcessor, {"b": 1, "a": 1, "c": 1}), ["b", "a", "c"])
+		counts = {f"cookie{index}": (index * 7919) % 1000 for index in range(5000)}
+		sorted_counts = CookieLogProcessor._get_sorted_mapping(CookieLogProcessor, counts, True)
+		highest_frequency = CookieLogProcessor._get_maximum_dict_value(CookieLogProcessor, counts)
+		self.assertEqual(CookieLogProcessor._get_most_active_from_counts(CookieLogProcessor, counts), [cookie for cookie in sorted_counts if sorted_counts[cookie] == highest_frequency])
+
+	def test_get_top_from_counts(self):
+		# Function to test that the top cookies are selected in descending order of count, with ties in the order of their first occurence
+		print("Performing Tests for CookieLogProcessor._get_top_from_counts()")
+		self.assertEqual(CookieLogProcessor._get_top_from_counts(CookieLogProcessor, {}, 3), [])
+		self.assertEqual(CookieLogProcessor._get_top_from_counts(CookieLogProcessor, {"a": 1, "b": 3, "c": 2}, 2), [("b", 3), ("c", 2)])
+		self.assertEqual(CookieLogProcessor._get_top_from_counts(CookieLogProcessor, {"a": 1, "b": 3, "c": 1, "d": 3}, 3), [("b", 3), ("d", 3), ("a", 1)])
+		self.assertEqual(CookieLogProcessor._get_top_from_counts(CookieLogProcessor, {"a": 1, "b": 3}, 5), [("b", 3), ("a", 1)])
+		counts = {f"cookie{index}": (index * 7919) % 1000 for index in range(5000)}
+		self.assertEqual(CookieLogProcessor._get_top_from_counts(CookieLogProcessor, counts, 20), list(CookieLogProcessor._get_sorted_mapping(CookieLogProcessor, counts, True).items())[:20])
+
+	def test_get_top_cookies(self):
+		# Function to test extraction of the top cookies with counts of the queried dates
+		print("Performing Tests for CookieLogProcessor.get_top_cookies()")
+		self.args.logfilename, self.args.date, self.args.top = "test_cookie_log.csv", ["2018-12-09", "2018-12-08", "2021-12-07"], 2
+		processor = CookieLogProcessor(self.args)
+		self.assertEqual(processor.get_top_cookies(), {datetime(2018, 12, 9).date(): [("AtY0laUfhglK3lC7", 5), ("SAZuXPGUrfbcn5UA", 1)], datetime(2018, 12, 8).date(): [("SAZuXPGUrfbcn5UA", 1), ("4sMM2LxV07bPJzwf", 1)], datetime(2021, 12, 7).date(): []})
+		self.assertEqual(processor.get_top_cookies(1)[datetime(2018, 12, 9).date()], [("AtY0laUfhglK3lC7", 5)])
+		for top_ in [0, -1, "2", 1.5]:
+			self.args.top = top_
+			self.assertRaises(CustomError, CookieLogProcessor, self.args)
+
 	def test_get_most_active_cookie(self):
 		# Function to test if the most active cookie is returned or not
 		print("Performing Tests for CookieLogProcessor.get_most_active_cookie()")
@@ -323,6 +1071,770 @@ class TestCookieLogProcessor(unittest.TestCase):
 		processor = CookieLogProcessor(self.args)
 		self.assertEqual(processor.get_most_active_cookie(), [])
 
+	def test_count_cookies(self):
+		# Function to test that only the queried dates are aggregated
+		print("Performing Tests for CookieLogProcessor._count_cookies()")
+		self.args.logfilename, self.args.date = "cookie_log.csv", "2018-12-09"
+		processor = CookieLogProcessor(self.args)
+		cookie_map, line_count = processor._count_cookies(processor._iter_logfile())
+		self.assertEqual(line_count, 8)
+		self.assertEqual(list(cookie_map.keys()), [datetime(2018, 12, day_).date() for day_ in [9, 8, 7]])
+		cookie_map, line_count = processor._count_cookies(processor._iter_logfile(), {datetime(2018, 12, 8).date()})
+		self.assertEqual(line_count, 8)
+		self.assertEqual(cookie_map, {datetime(2018, 12, 8).date(): {"SAZuXPGUrfbcn5UA": 1, "4sMM2LxV07bPJzwf": 1, "fbcn5UAVanZf6UtG": 1}})
+
+	def test_get_most_active_cookies(self):
+		# Function to test querying multiple dates (repeated dates, a date range or a file of dates) at once
+		print("Performing Tests for CookieLogProcessor.get_most_active_cookies()")
+		dates = ["2018-12-10", "2018-12-09", "2018-12-08", "2018-12-07", "2018-12-06", "2018-11-07", "2018-10-06"]
+		expected = {}
+		for date_ in dates:
+			self.args.logfilename, self.args.date = "test_cookie_log.csv", date_
+			expected[datetime.strptime(date_, "%Y-%m-%d").date()] = CookieLogProcessor(self.args).get_most_active_cookie()
+
+		self.args.logfilename, self.args.date = "test_cookie_log.csv", dates + ["2018-12-09"]
+		processor = CookieLogProcessor(self.args)
+		self.assertEqual(processor.query_date, datetime(2018, 12, 10).date())
+		self.assertEqual(processor.query_dates, list(expected.keys()))
+		self.assertEqual(processor.get_most_active_cookies(), expected)
+		self.assertEqual(list(processor.get_most_active_cookies().keys()), list(expected.keys()))
+
+		self.args.date, self.args.date_range = None, ["2018-12-06", "2018-12-10"]
+		processor = CookieLogProcessor(self.args)
+		self.assertEqual(processor.query_dates, [datetime(2018, 12, day_).date() for day_ in range(6, 11)])
+		self.assertEqual(processor.get_most_active_cookies(), {date_: expected[date_] for date_ in processor.query_dates})
+
+		self.args.date_range = ["2018-12-10", "2018-12-06"]
+		self.assertRaises(CustomError, CookieLogProcessor, self.args)
+		self.args.date_range = ["2018-12-10", "2018-12-xx"]
+		self.assertRaises(CustomError, CookieLogProcessor, self.args)
+		del self.args.date_range
+
+		self.args.dates_file = self._write_logfile(["", "2018-11-07", " 2018-12-08 ", ""])
+		processor = CookieLogProcessor(self.args)
+		self.assertEqual(processor.get_most_active_cookies(), {datetime(2018, 11, 7).date(): [], datetime(2018, 12, 8).date(): expected[datetime(2018, 12, 8).date()]})
+		self.args.dates_file = "missing_dates_file.txt"
+		self.assertRaises(CustomError, CookieLogProcessor, self.args)
+		self.args.dates_file = self._write_logfile(["2018-12-08", "2050-12-08"])
+		self.assertRaises(CustomError, CookieLogProcessor, self.args)
+		self.args.dates_file = None
+		self.assertRaises(CustomError, CookieLogProcessor, self.args)
+
+	def test_count_sorted_logfile(self):
+		# Function to test that binary searching the queried date in a sorted logfile gives the same result as a full scan, and falls back to a full scan for unsorted logfiles
+		print("Performing Tests for CookieLogProcessor._count_sorted_logfile()")
+		for filename_ in ["cookie_log.csv", "test_cookie_log.csv"]:
+			for date_ in ["2018-12-10", "2018-12-09", "2018-12-08", "2018-12-07", "2018-12-01", "2018-11-07", "2018-10-06"]:
+				self.args.logfilename, self.args.date = filename_, date_
+				expected = CookieLogProcessor(self.args).get_most_active_cookie()
+				self.args.sorted_log = True
+				self.assertEqual(CookieLogProcessor(self.args).get_most_active_cookie(), expected)
+				del self.args.sorted_log
+
+		# A larger logfile sorted by timestamp (newest first) with a few malformed lines
+		lines = ["cookie,timestamp"]
+		for day_ in range(28, 0, -1):
+			for hour_ in range(23, -1, -1):
+				lines.append(f"cookie{(day_ * hour_) % 7},2018-02-{day_:02d}T{hour_:02d}:00:00+00:00")
+				if hour_ % 5 == 0:
+					lines.append(f"bad cookie,2018-02-{day_:02d}T{hour_:02d}:00:00+00:00")
+		filename_ = self._write_logfile(lines)
+		for date_ in ["2018-03-01", "2018-02-28", "2018-02-14", "2018-02-01", "2018-01-31"]:
+			self.args.logfilename, self.args.date = filename_, date_
+			expected = CookieLogProcessor(self.args).get_most_active_cookie()
+			self.args.sorted_log = True
+			processor = CookieLogProcessor(self.args)
+			self.assertIsNotNone(processor._count_sorted_logfile(processor.query_date))
+			self.assertEqual(processor.get_most_active_cookie(), expected)
+			del self.args.sorted_log
+
+		# The same logfile sorted oldest first is detected as not sorted
+		filename_ = self._write_logfile(lines[:1] + lines[:0:-1])
+		self.args.logfilename, self.args.date, self.args.sorted_log = filename_, "2018-02-14", True
+		processor = CookieLogProcessor(self.args)
+		self.assertIsNone(processor._count_sorted_logfile(processor.query_date))
+		self.args.sorted_log = False
+		self.assertEqual(processor.get_most_active_cookie(), CookieLogProcessor(self.args).get_most_active_cookie())
+
+		# Two lines of the queried date out of order, between the probes of the binary search, are found while reading the window
+		lines_ = list(lines)
+		position_ = lines_.index("cookie0,2018-02-14T12:00:00+00:00")
+		lines_[position_], lines_[position_ + 1] = lines_[position_ + 1], lines_[position_]
+		self.args.logfilename, self.args.sorted_log = self._write_logfile(lines_), True
+		processor = CookieLogProcessor(self.args)
+		self.assertIsNone(processor._count_sorted_logfile(processor.query_date))
+		self.args.sorted_log = False
+		self.assertEqual(processor.get_most_active_cookie(), CookieLogProcessor(self.args).get_most_active_cookie())
+
+		# A logfile sorted by instant with mixed UTC offsets, whose days in their own offsets are not sorted
+		lines = ["cookie,timestamp"] + ["A{},2018-12-06T10:{:02d}:00+00:00".format(index_ % 3, 59 - index_ // 400) for index_ in range(20000)]
+		lines += ["B,2018-12-05T01:00:00+00:00", "C,2018-12-04T16:59:00-08:00", "B,2018-12-05T00:58:00+00:00", "C,2018-12-04T16:57:00-08:00", "E,2018-12-05T08:30:00+09:00"]
+		lines += ["D{},2018-12-04T10:{:02d}:00+00:00".format(index_ % 3, 59 - index_ // 400) for index_ in range(20000)]
+		filename_ = self._write_logfile(lines)
+		for date_ in ["2018-12-06", "2018-12-05", "2018-12-04", "2018-12-03"]:
+			self.args.logfilename, self.args.date, self.args.top = filename_, date_, 3
+			expected = CookieLogProcessor(self.args).get_top_cookies()
+			self.args.sorted_log = True
+			processor = CookieLogProcessor(self.args)
+			self.assertIsNotNone(processor._count_sorted_logfile(processor.query_date))
+			self.assertEqual(processor.get_top_cookies(), expected)
+			del self.args.sorted_log, self.args.top
+
+	def test_get_chunk_ranges(self):
+		# Function to test splitting the logfile into contiguous byte ranges aligned to line starts
+		print("Performing Tests for CookieLogProcessor._get_chunk_ranges()")
+		self.args.logfilename, self.args.date = "test_cookie_log.csv", "2018-12-09"
+		processor = CookieLogProcessor(self.args)
+		processor.min_chunk_size = 1
+		f = open(processor.filepath, "rb")
+		data = f.read()
+		f.close()
+		for chunk_count_ in [1, 2, 5, 100]:
+			chunk_ranges = processor._get_chunk_ranges(chunk_count_)
+			self.assertLessEqual(len(chunk_ranges), chunk_count_)
+			self.assertEqual(chunk_ranges[0][0], data.index(b"\n") + 1)
+			self.assertEqual(chunk_ranges[-1][1], len(data))
+			for index_ in range(len(chunk_ranges)):
+				self.assertLess(chunk_ranges[index_][0], chunk_ranges[index_][1])
+				self.assertEqual(data[chunk_ranges[index_][0] - 1:chunk_ranges[index_][0]], b"\n")
+				if index_ > 0:
+					self.assertEqual(chunk_ranges[index_ - 1][1], chunk_ranges[index_][0])
+
+	def test_count_parallel(self):
+		# Function to test that the merged counts of chunks scanned in parallel are equal to (and in the same order as) the counts of a serial scan
+		print("Performing Tests for CookieLogProcessor._count_parallel()")
+		generator = random.Random(7)
+		lines = ["cookie,timestamp"]
+		for _ in range(3000):
+			lines.append("{}{},2018-12-{:02d}T{:02d}:00:00{}".format(generator.choice(["", " ", "bad "]), "cookie{}".format(int(generator.paretovariate(1.2))), generator.randint(1, 9), generator.randint(0, 23), generator.choice(["+00:00", "-05:00", "+00:00\r", ",extra"])))
+		for filename_ in ["test_cookie_log.csv", self._write_logfile(lines)]:
+			self.args.logfilename, self.args.date = filename_, ["2018-12-09", "2018-12-08", "2018-12-07", "2018-12-01"]
+			serial_processor = CookieLogProcessor(self.args)
+			self.args.workers = 3
+			processor = CookieLogProcessor(self.args)
+			processor.min_chunk_size = 64
+			self.assertGreater(len(processor._get_chunk_ranges(12)), 1)
+			for query_dates_ in [set(processor.query_dates), None]:
+				cookie_map, line_count = processor._count_parallel(query_dates_)
+				serial_cookie_map, serial_line_count = serial_processor._count_cookies(serial_processor._iter_logfile(), query_dates_)
+				self.assertEqual(line_count, serial_line_count)
+				self.assertEqual(cookie_map, serial_cookie_map)
+				self.assertEqual([list(cookie_counts.items()) for cookie_counts in cookie_map.values()], [list(cookie_counts.items()) for cookie_counts in serial_cookie_map.values()])
+			self.assertEqual(processor.get_most_active_cookies(), serial_processor.get_most_active_cookies())
+			del self.args.workers
+
+	def test_count_mmap_range(self):
+		# Function to test that the mmap engine gives the same counts (in the same order) as the text engine
+		print("Performing Tests for CookieLogProcessor._count_mmap_range()")
+		f = open(os.path.join(os.getcwd(), "test_cookie_log.csv"), "r")
+		lines = f.read().split("\n")
+		f.close()
+		lines += ["", "  ", "A+-.B,2018-12-09T14:19:00Z", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+0000", "AtY0laUfhglK3lC7,2018-12-09t14:19:00+00:00\r", "\u00e9t\u00e9,2018-12-09T14:19:00+00:00", "\u00a0AtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00", "AtY0laUfhglK3lC7,2018-02-30T14:19:00+00:00", "AtY0laUfhglK3lC7,2018-12-09T24:19:00+00:00", "AtY0laUfhglK3lC7 , 2018-12-08T14:19:00-05:00 ,x"]
+		for lines_ in [lines, [line + "\r" for line in lines], lines[:5] + ["SAZuXPGUrfbcn5UA,2018-12-09T14:19:00+00:00\rSAZuXPGUrfbcn5UA,2018-12-09T15:19:00+00:00"] + lines[5:]]:
+			filename_ = self._write_logfile(lines_)
+			self.args.logfilename, self.args.date = filename_, ["2018-12-09", "2018-12-08"]
+			text_processor = CookieLogProcessor(self.args)
+			self.args.engine = "mmap"
+			processor = CookieLogProcessor(self.args)
+			for query_dates_ in [set(processor.query_dates), None]:
+				cookie_map, line_count = processor._count_byte_range(*processor._get_chunk_ranges(1)[0], query_dates_)
+				text_cookie_map, text_line_count = text_processor._count_cookies(text_processor._iter_logfile(), query_dates_)
+				self.assertEqual(line_count, text_line_count)
+				self.assertEqual([list(cookie_counts.items()) for cookie_counts in cookie_map.values()], [list(cookie_counts.items()) for cookie_counts in text_cookie_map.values()])
+			self.assertEqual(processor.get_most_active_cookies(), text_processor.get_most_active_cookies())
+			self.args.workers = 2
+			processor = CookieLogProcessor(self.args)
+			processor.min_chunk_size = 64
+			self.assertEqual(processor.get_most_active_cookies(), text_processor.get_most_active_cookies())
+			del self.args.engine, self.args.workers
+
+		self.args.logfilename, self.args.date, self.args.engine = "cookie_log.csv", "2018-12-09", "unknown"
+		self.assertRaises(CustomError, CookieLogProcessor, self.args)
+
+	@unittest.skipIf(importlib.util.find_spec("numpy") is None, "NumPy is not installed")
+	def test_count_numpy_range(self):
+		# Function to test that the numpy engine gives the same counts (in the same order) as the text engine
+		print("Performing Tests for CookieLogProcessor._count_numpy_range()")
+		f = open(os.path.join(os.getcwd(), "test_cookie_log.csv"), "r")
+		lines = f.read().split("\n")
+		f.close()
+		lines += ["", "  ", ",2018-12-09T14:19:00+00:00", "A+-.B,2018-12-09T14:19:00Z", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+0000", "AtY0laUfhglK3lC7,2018-12-09t14:19:00+00:00", "\u00e9t\u00e9,2018-12-09T14:19:00+00:00", "A\u0000B,2018-12-09T14:19:00+00:00", "\u00a0AtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00", "AtY0laUfhglK3lC7,2018-02-30T14:19:00+00:00", "AtY0laUfhglK3lC7,0000-12-09T14:19:00+00:00", "AtY0laUfhglK3lC7,2018-12-09T24:19:00+00:00", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+24:00", "AtY0laUfhglK3lC7 , 2018-12-08T14:19:00-05:00 ,x", "AtY0laUfhglK3lC7,2018-12-08T14:19:00-05:00,x", "AtY0laUfhglK3lC7,2016-02-29T14:19:00-05:00", "C" * 65 + ",2018-12-09T14:19:00+00:00", "C" * 65 + ",2018-12-09T15:19:00+00:00", "!#$%&'*+-.^_`|~,2018-12-08T10:00:00+00:00", "no comma"]
+		for lines_ in [lines, [line + "\r" for line in lines], lines[:5] + ["SAZuXPGUrfbcn5UA,2018-12-09T14:19:00+00:00\rSAZuXPGUrfbcn5UA,2018-12-09T15:19:00+00:00"] + lines[5:]]:
+			filename_ = self._write_logfile(lines_)
+			self.args.logfilename, self.args.date = filename_, ["2018-12-09", "2018-12-08", "2016-02-29"]
+			text_processor = CookieLogProcessor(self.args)
+			self.args.engine = "numpy"
+			processor = CookieLogProcessor(self.args)
+			for block_size_ in [processor.block_size, 100]:
+				processor.block_size = block_size_
+				for query_dates_ in [set(processor.query_dates), None]:
+					cookie_map, line_count = processor._count_byte_range(*processor._get_chunk_ranges(1)[0], query_dates_)
+					text_cookie_map, text_line_count = text_processor._count_cookies(text_processor._iter_logfile(), query_dates_)
+					self.assertEqual(line_count, text_line_count)
+					self.assertEqual([list(cookie_counts.items()) for cookie_counts in cookie_map.values()], [list(cookie_counts.items()) for cookie_counts in text_cookie_map.values()])
+				self.assertEqual(processor.get_top_cookies(3), text_processor.get_top_cookies(3))
+			del self.args.engine
+
+	def test_pipeline(self):
+		# Function to test that reading blocks with the pipelined reader gives the same results as reading them directly, also for lines longer than a block
+		print("Performing Tests for CookieLogBlockReader()")
+		f = open(os.path.join(os.getcwd(), "test_cookie_log.csv"), "r")
+		lines = f.read().split("\n")
+		f.close()
+		lines += ["", "C" * 300 + ",2018-12-09T14:19:00+00:00", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00\r", "no comma"]
+		filename_ = self._write_logfile(lines)
+		with open(filename_, "rb") as f:
+			data_ = f.read()
+		for block_size_ in [16, 100, 1 << 20]:
+			for start_ in [0, data_.index(b"\n") + 1]:
+				reader_ = CookieLogBlockReader(filename_, start_, len(data_), block_size_)
+				blocks_ = [bytes(block) for block in reader_]
+				reader_.close()
+				self.assertEqual(b"".join(blocks_), data_[start_:])
+				self.assertTrue(all(block[-1:] in [b"\n", b"\r"] for block in blocks_[:-1]))
+		self.args.logfilename, self.args.date = filename_, ["2018-12-09", "2018-12-08"]
+		for engine_ in ["text", "mmap", "numpy"]:
+			self.args.engine = engine_
+			self.args.pipeline = False
+			processor_ = CookieLogProcessor(self.args)
+			self.args.pipeline = True
+			pipeline_processor_ = CookieLogProcessor(self.args)
+			for block_size_ in [pipeline_processor_.block_size, 100]:
+				processor_.block_size = pipeline_processor_.block_size = block_size_
+				self.assertEqual(pipeline_processor_.get_top_cookies(3), processor_.get_top_cookies(3))
+		del self.args.engine, self.args.pipeline
+		self.assertRaises(CustomError, list, CookieLogBlockReader("not_a_file.csv", 0, 10, 100))
+
+	def test_count_numpy_range_fallback(self):
+		# Function to test that the numpy engine falls back to the mmap engine when NumPy is not installed, and that NumPy is only imported by the numpy engine
+		print("Performing Tests for CookieLogProcessor._count_byte_range() without NumPy")
+		self.args.logfilename, self.args.date, self.args.engine = "test_cookie_log.csv", ["2018-12-09", "2018-12-08"], "numpy"
+		processor = CookieLogProcessor(self.args)
+		processor._import_numpy = lambda: None
+		processor._count_numpy_range = None
+		self.args.engine = "text"
+		self.assertEqual(processor.get_most_active_cookies(), CookieLogProcessor(self.args).get_most_active_cookies())
+		code_ = "import sys, CookieLogProcessor, CookieLogServer, CookieLogClient; print('numpy' in sys.modules)"
+		self.assertEqual(subprocess.run([sys.executable, "-c", code_], capture_output=True, text=True).stdout, "False\n")
+
+	def test_count_regex_range(self):
+		# Function to test that the regex engine gives the same counts (in the same order) and statistics as the text engine
+		print("Performing Tests for CookieLogProcessor._count_regex_range()")
+		f = open(os.path.join(os.getcwd(), "test_cookie_log.csv"), "r")
+		lines = f.read().split("\n")
+		f.close()
+		lines += ["", "  ", ",2018-12-09T14:19:00+00:00", "A+-.B,2018-12-09T14:19:00Z", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+0000", "AtY0laUfhglK3lC7,2018-12-09t14:19:00+00:00", "\u00e9t\u00e9,2018-12-09T14:19:00+00:00", "A\u0000B,2018-12-09T14:19:00+00:00", "\u00a0AtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00", "\u001cAtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00\u001c", "AtY0laUfhglK3lC7,2018-02-30T14:19:00+00:00", "AtY0laUfhglK3lC7,0000-12-09T14:19:00+00:00", "AtY0laUfhglK3lC7,2018-12-09T24:19:00+00:00", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00X", "AtY0laUfhglK3lC7 , 2018-12-08T14:19:00-05:00 ,x", "AtY0laUfhglK3lC7,2018-12-08T14:19:00-05:00,x", "AtY0laUfhglK3lC7,2016-02-29T14:19:00-05:00", "C" * 65 + ",2018-12-09T14:19:00+00:00", "!#$%&'*+-.^_`|~,2018-12-08T10:00:00+00:00", "no comma"]
+		for lines_ in [lines, [line + "\r" for line in lines], lines[:5] + ["SAZuXPGUrfbcn5UA,2018-12-09T14:19:00+00:00\rSAZuXPGUrfbcn5UA,2018-12-09T15:19:00+00:00"] + lines[5:], lines[:9]]:
+			filename_ = self._write_logfile(lines_)
+			self.args.logfilename, self.args.date, self.args.stats = filename_, ["2018-12-09", "2018-12-08", "2016-02-29"], True
+			text_processor = CookieLogProcessor(self.args)
+			self.args.engine = "regex"
+			processor = CookieLogProcessor(self.args)
+			for block_size_ in [processor.block_size, 100]:
+				processor.block_size = block_size_
+				for query_dates_ in [set(processor.query_dates), None]:
+					cookie_map, line_count = processor._count_byte_range(*processor._get_chunk_ranges(1)[0], query_dates_)
+					text_cookie_map, text_line_count = text_processor._count_cookies(text_processor._iter_logfile(), query_dates_)
+					self.assertEqual(line_count, text_line_count)
+					self.assertEqual([list(cookie_counts.items()) for cookie_counts in cookie_map.values()], [list(cookie_counts.items()) for cookie_counts in text_cookie_map.values()])
+				self.assertEqual(processor.get_top_cookies(3), text_processor.get_top_cookies(3))
+			# Statistics of a single query
+			processor, text_processor = CookieLogProcessor(self.args), CookieLogProcessor(Namespace(**dict(vars(self.args), engine="text")))
+			processor.block_size = 100
+			self.assertEqual(processor.get_top_cookies(3), text_processor.get_top_cookies(3))
+			self.assertEqual(processor.get_stats()["lines"], text_processor.get_stats()["lines"])
+			self.assertEqual(processor.get_stats()["skipped_by_reason"], text_processor.get_stats()["skipped_by_reason"])
+			del self.args.engine, self.args.stats
+
+	def test_count_cookies_low_memory(self):
+		# Function to test that counting in CookieCounter objects gives the same counts (in the same order) as dicts, also with parallel workers
+		print("Performing Tests for CookieLogProcessor._count_cookies() with low_memory")
+		generator = random.Random(11)
+		lines = ["cookie,timestamp"]
+		for _ in range(2000):
+			lines.append("{}{},2018-12-{:02d}T{:02d}:00:00+00:00".format(generator.choice(["", "", "bad "]), "cookie{}".format(int(generator.paretovariate(1.2))), generator.randint(1, 9), generator.randint(0, 23)))
+		self.args.logfilename, self.args.date, self.args.top = self._write_logfile(lines), ["2018-12-09", "2018-12-08", "2018-12-01"], 3
+		expected_processor = CookieLogProcessor(self.args)
+		expected = expected_processor._count_cookies(expected_processor._iter_logfile(), None)
+		self.args.low_memory, self.args.engine = True, "mmap"
+		for workers_ in [1, 2]:
+			self.args.workers = workers_
+			processor = CookieLogProcessor(self.args)
+			processor.min_chunk_size = 64
+			cookie_map, line_count = processor._count_parallel(None) if workers_ > 1 else processor._count_cookies(processor._iter_logfile(), None)
+			self.assertEqual(line_count, expected[1])
+			self.assertTrue(all(isinstance(cookie_counts, CookieCounter) for cookie_counts in cookie_map.values()))
+			self.assertEqual([list(cookie_counts.items()) for cookie_counts in cookie_map.values()], [list(cookie_counts.items()) for cookie_counts in expected[0].values()])
+			self.assertEqual(processor.get_top_cookies(), expected_processor.get_top_cookies())
+			self.assertEqual(processor.get_most_active_cookies(), expected_processor.get_most_active_cookies())
+
+	def test_approx(self):
+		# Function to test that approx mode gives the exact most active cookies when they are provably exact, and reports the error bound otherwise
+		print("Performing Tests for CookieLogProcessor.print_most_active_cookie() with approx")
+		generator = random.Random(13)
+		lines = ["cookie,timestamp"]
+		for _ in range(3000):
+			lines.append("cookie{},2018-12-{:02d}T{:02d}:00:00+00:00".format(int(generator.paretovariate(1.0)), generator.randint(8, 9), generator.randint(0, 23)))
+		self.args.logfilename, self.args.date = self._write_logfile(lines), ["2018-12-09", "2018-12-08", "2018-12-01"]
+		expected = CookieLogProcessor(self.args).get_most_active_cookies()
+		self.args.approx_error, self.args.workers = 0.05, 2
+		processor = CookieLogProcessor(self.args)
+		self.assertEqual(processor.approx_capacity, 20)
+		self.assertEqual(processor.get_most_active_cookies(), expected)
+		output_, error_output_ = io.StringIO(), io.StringIO()
+		with contextlib.redirect_stdout(output_), contextlib.redirect_stderr(error_output_):
+			processor.print_most_active_cookie()
+		self.assertEqual(output_.getvalue(), "".join(f"{date_.isoformat()},{cookie_}\n" for date_, cookies_ in expected.items() for cookie_ in cookies_))
+		self.assertEqual(error_output_.getvalue(), "2018-12-09: exact\n2018-12-08: exact\n2018-12-01: exact\n")
+
+		# With a single tracked cookie, the answer can not be proven exact
+		del self.args.approx_error
+		self.args.approx_memory, self.args.top = "1K", 2
+		processor = CookieLogProcessor(self.args)
+		self.assertEqual(processor.approx_capacity, 1)
+		output_, error_output_ = io.StringIO(), io.StringIO()
+		with contextlib.redirect_stdout(output_), contextlib.redirect_stderr(error_output_):
+			processor.print_most_active_cookie()
+		self.assertEqual(len(output_.getvalue().splitlines()), 2)
+		self.assertRegex(error_output_.getvalue().splitlines()[0], r"^2018-12-09: approximate, counts may be overestimated by up to \d+ of \d+ occurences")
+
+		for options_ in [{"approx_memory": "1X"}, {"approx_memory": "100"}, {"approx_error": 1.5}, {"approx_error": 0.1, "approx_memory": "1M"}]:
+			args_ = Namespace(logfilename=self.args.logfilename, date="2018-12-09", **options_)
+			self.assertRaises(CustomError, CookieLogProcessor, args_)
+
+	def test_count_with_memory_budget(self):
+		# Function to test that spilling the counts to partition files gives the same results as counting in memory
+		print("Performing Tests for CookieLogProcessor._count_with_memory_budget()")
+		generator = random.Random(19)
+		lines = ["cookie,timestamp"]
+		for _ in range(2000):
+			lines.append("{}cookie{},2018-12-{:02d}T{:02d}:00:00+00:00".format(generator.choice(["", "", "bad "]), generator.randint(0, 200), generator.randint(7, 9), generator.randint(0, 23)))
+		self.args.logfilename, self.args.date = self._write_logfile(lines), ["2018-12-09", "2018-12-08", "2018-12-07", "2018-12-01"]
+		expected_processor = CookieLogProcessor(self.args)
+		self.args.memory_budget = "1M"
+		processor = CookieLogProcessor(self.args)
+		self.assertEqual(processor.memory_budget, 1 << 20)
+		self.assertEqual(CookiePartitioner(processor.memory_budget).entry_limit, (1 << 19) // CookiePartitioner.entry_size)
+		# Only 8 (date, cookie) pairs fit in the budget, the other half of which is taken by the buffers of the partition files
+		self.addCleanup(setattr, CookiePartitioner, "entry_size", CookiePartitioner.entry_size)
+		CookiePartitioner.entry_size = 1 << 16
+		self.assertEqual(processor.get_most_active_cookies(), expected_processor.get_most_active_cookies())
+		self.assertEqual(processor.get_top_cookies(4), expected_processor.get_top_cookies(4))
+		self.assertEqual(processor._count_with_memory_budget(set(processor.query_dates))[1], expected_processor._count_cookies(expected_processor._iter_logfile())[1])
+
+		self.args.memory_budget = "1K"
+		self.assertRaises(CustomError, CookieLogProcessor, self.args)
+
+	def test_get_distinct_cookie_counts(self):
+		# Function to test the estimated number of distinct cookies of each queried date, whether all the cookies are counted or not
+		print("Performing Tests for CookieLogProcessor.get_distinct_cookie_counts()")
+		generator = random.Random(23)
+		lines = ["cookie,timestamp"]
+		for _ in range(3000):
+			lines.append("{}cookie{},2018-12-{:02d}T{:02d}:00:00+00:00".format(generator.choice(["", "", "bad "]), generator.randint(0, 400), generator.randint(8, 9), generator.randint(0, 23)))
+		self.args.logfilename, self.args.date = self._write_logfile(lines), ["2018-12-09", "2018-12-08", "2018-12-01"]
+		processor = CookieLogProcessor(self.args)
+		cookie_map = processor._count_cookies(processor._iter_logfile())[0]
+		self.args.distinct = True
+		for options_ in [{}, {"engine": "mmap", "workers": 2}, {"approx": True}, {"memory_budget": "1M"}, {"index": True}]:
+			args_ = Namespace(**vars(self.args), **options_)
+			processor = CookieLogProcessor(args_)
+			self.addCleanup(lambda path_: os.path.exists(path_) and os.remove(path_), processor.index_path)
+			processor.get_most_active_cookies()
+			distinct_cookie_counts = processor.get_distinct_cookie_counts()
+			self.assertEqual(list(distinct_cookie_counts.keys()), processor.query_dates)
+			self.assertEqual(distinct_cookie_counts[datetime(2018, 12, 1).date()], 0)
+			for date_ in [datetime(2018, 12, 9).date(), datetime(2018, 12, 8).date()]:
+				self.assertLessEqual(abs(distinct_cookie_counts[date_] - len(cookie_map[date_])), 0.05 * len(cookie_map[date_]))
+
+		self.args.date = "2018-12-09"
+		output_, error_output_ = io.StringIO(), io.StringIO()
+		with contextlib.redirect_stdout(output_), contextlib.redirect_stderr(error_output_):
+			CookieLogProcessor(self.args).print_most_active_cookie()
+		self.assertRegex(error_output_.getvalue(), r"^2018-12-09: \d+ distinct cookies \(estimated\)\n$")
+
+	def test_get_stats(self):
+		# Function to test that the statistics count the lines read, accepted and skipped by reason the same way with every engine and option, and time the stages
+		print("Performing Tests for CookieLogProcessor.get_stats()")
+		generator = random.Random(29)
+		lines = ["cookie,timestamp"]
+		for _ in range(2000):
+			lines.append(generator.choice(["cookie{0},2018-12-{1:02d}T10:00:00+00:00"] * 6 + ["cookie {0},2018-12-{1:02d}T10:00:00+00:00", "cookie;{0},2018-12-{1:02d}T10:00:00+00:00", ",2018-12-{1:02d}T10:00:00+00:00", "cookie{0},2018-13-{1:02d}T10:00:00+00:00", "cookie{0} 2018-12-{1:02d}T10:00:00+00:00", ""]).format(generator.randint(0, 50), generator.randint(8, 9)))
+		self.args.logfilename, self.args.date = self._write_logfile(lines), "2018-12-09"
+		processor = CookieLogProcessor(self.args)
+		self.assertIsNone(processor.get_stats())
+		expected_ = {}
+		for line_ in lines[1:]:
+			skip_reason_ = processor._parse_entry(line_)[2]
+			if skip_reason_ is not None and len(line_) > 0:
+				expected_[skip_reason_] = expected_.get(skip_reason_, 0) + 1
+		self.assertEqual(len(expected_), 5)
+		blank_count_ = lines.count("")
+		# Bytes of the lines after the header
+		byte_count_ = os.path.getsize(self.args.logfilename) - len("cookie,timestamp\n")
+
+		self.args.stats = True
+		for options_ in [{}, {"engine": "mmap"}, {"engine": "numpy"}, {"engine": "regex"}, {"engine": "numpy", "workers": 2}, {"engine": "regex", "pipeline": True}, {"low_memory": True}, {"approx": True}, {"memory_budget": "1M"}, {"index": True}, {"cache": True}]:
+			args_ = Namespace(**vars(self.args), **options_)
+			processor = CookieLogProcessor(args_)
+			self.addCleanup(lambda path_=processor.index_path: os.path.exists(path_) and os.remove(path_))
+			self.addCleanup(lambda path_=processor.cache_path: os.path.exists(path_) and os.remove(path_))
+			self.assertEqual(processor.get_most_active_cookie(), CookieLogProcessor(Namespace(logfilename=self.args.logfilename, date="2018-12-09")).get_most_active_cookie())
+			stats_ = processor.get_stats()
+			self.assertEqual(stats_["skipped_by_reason"], dict(sorted(expected_.items())))
+			self.assertEqual(stats_["lines"], {"read": 2000 - blank_count_, "accepted": 2000 - blank_count_ - sum(expected_.values()), "skipped": sum(expected_.values()), "blank": blank_count_})
+			self.assertEqual(stats_["bytes_processed"], byte_count_, options_)
+			self.assertEqual(list(stats_["seconds"].keys()), ["read", "parse", "aggregate", "extract", "count"])
+			self.assertGreater(stats_["seconds"]["parse"], 0)
+			self.assertGreater(stats_["seconds"]["count"], 0)
+
+		# Once built, the index answers without parsing the lines again (but the last line, which has no newline), so only the number of lines read is known
+		processor = CookieLogProcessor(Namespace(**vars(self.args), index=True))
+		processor.get_most_active_cookie()
+		stats_ = processor.get_stats()
+		self.assertEqual(stats_["lines"], {"read": 2000 - blank_count_, "accepted": None, "skipped": None, "blank": None})
+		self.assertIsNone(stats_["skipped_by_reason"])
+		self.assertEqual(stats_["bytes_processed"], len(lines[-1]))
+
+		output_, error_output_ = io.StringIO(), io.StringIO()
+		with contextlib.redirect_stdout(output_), contextlib.redirect_stderr(error_output_):
+			CookieLogProcessor(self.args).print_most_active_cookie()
+		self.assertEqual(json.loads(error_output_.getvalue())["lines"]["skipped"], sum(expected_.values()))
+
+	def test_collect_logfilenames(self):
+		# Function to test expanding directories and glob patterns into cookie log files
+		print("Performing Tests for CookieLogProcessor._collect_logfilenames()")
+		directory_ = tempfile.TemporaryDirectory()
+		self.addCleanup(directory_.cleanup)
+		for name_ in ["b.csv", "a.csv", "c.txt"]:
+			open(os.path.join(directory_.name, name_), "w").write("cookie,timestamp\n")
+		paths_ = [os.path.join(directory_.name, name_) for name_ in ["a.csv", "b.csv"]]
+		self.args.date = "2018-12-09"
+		for logfilename_, expected_ in [("test_cookie_log.csv", ["test_cookie_log.csv"]), (directory_.name, paths_), (os.path.join(directory_.name, "*.csv"), paths_), ([paths_[1], directory_.name, "test_cookie_log.csv", os.path.join(os.getcwd(), "test_cookie_log.csv")], [paths_[1], paths_[0], "test_cookie_log.csv"])]:
+			self.args.logfilename = logfilename_
+			processor = CookieLogProcessor(self.args)
+			self.assertEqual(processor.logfilenames, expected_)
+			self.assertEqual(processor.filepath, processor.filepaths[0])
+		for logfilename_ in [os.path.join(directory_.name, "*.log"), os.path.join(directory_.name, "d.csv"), [paths_[0], "missing.csv"], ["test_cookie_log.csv", os.path.join(directory_.name, "c.txt")]]:
+			self.args.logfilename = logfilename_
+			self.assertRaises(CustomError, CookieLogProcessor, self.args)
+
+	def test_count_logfiles(self):
+		# Function to test that counting several logfiles gives the same results as counting them concatenated
+		print("Performing Tests for CookieLogProcessor._count_logfiles()")
+		generator = random.Random(29)
+		lines = []
+		for _ in range(3000):
+			lines.append("{}cookie{},2018-12-{:02d}T{:02d}:00:00+00:00".format(generator.choice(["", "", "bad "]), int(generator.paretovariate(1.2)), generator.randint(7, 9), generator.randint(0, 23)))
+		filenames_ = [self._write_logfile(["cookie,timestamp"] + lines[index_:index_ + 1000]) for index_ in range(0, 3000, 1000)] + [self._write_logfile(["cookie,timestamp", ""])]
+		self.args.logfilename, self.args.date, self.args.top = self._write_logfile(["cookie,timestamp"] + lines), ["2018-12-09", "2018-12-08", "2018-12-07"], 3
+		expected_processor = CookieLogProcessor(self.args)
+		for options_ in [{}, {"workers": 2, "engine": "mmap"}, {"approx": True}, {"memory_budget": "1M"}, {"index": True}, {"sorted_log": True}]:
+			args_ = Namespace(**{**vars(self.args), "logfilename": filenames_}, **options_)
+			processor = CookieLogProcessor(args_)
+			self.assertEqual(len(processor.filepaths), 4)
+			for filepath_ in processor.filepaths:
+				self.addCleanup(lambda path_: os.path.exists(path_) and os.remove(path_), filepath_ + ".idx")
+			self.assertEqual(processor.get_top_cookies(), expected_processor.get_top_cookies())
+			self.assertEqual(processor.get_most_active_cookies(), expected_processor.get_most_active_cookies())
+
+		self.args.logfilename = filenames_[-1:] * 2
+		output_ = io.StringIO()
+		with contextlib.redirect_stdout(output_):
+			self.assertIsNone(CookieLogProcessor(self.args)._get_cookie_map([datetime(2018, 12, 9).date()]))
+		self.assertEqual(output_.getvalue(), "ERROR: Input cookie logfile is empty!\n")
+		self.args.logfilename = filenames_
+		self.assertRaises(CustomError, CookieLogProcessor(self.args).follow_most_active_cookie)
+
+	def test_from_stream(self):
+		# Function to test that cookie logs read from text and binary streams, iterables of lines and the standard input give the same results as the logfile
+		print("Performing Tests for CookieLogProcessor.from_stream()")
+		generator = random.Random(37)
+		lines = ["", "cookie,timestamp"]
+		for _ in range(3000):
+			lines.append("{}cookie{},2018-12-{:02d}T{:02d}:00:00+00:00{}".format(generator.choice(["", "", "bad "]), int(generator.paretovariate(1.2)), generator.randint(8, 9), generator.randint(0, 23), generator.choice(["", "", "\r"])))
+		self.args.logfilename, self.args.date, self.args.top = self._write_logfile(lines), ["2018-12-09", "2018-12-08"], 3
+		expected_processor = CookieLogProcessor(self.args)
+		expected_lines = list(expected_processor._iter_logfile())
+		expected_top_cookies = expected_processor.get_top_cookies()
+		data_ = "\n".join(lines)
+		for stream_ in [io.StringIO(data_), io.BytesIO(data_.encode()), io.FileIO(self.args.logfilename), data_.splitlines(True), [line_.encode() for line_ in data_.splitlines(True)]]:
+			processor = CookieLogProcessor.from_stream(stream_, self.args.date, top=3, engine="numpy", workers=2, sorted_log=True, distinct=True)
+			self.assertEqual(processor.logfilenames, ["-"])
+			self.assertEqual(processor.get_top_cookies(), expected_top_cookies)
+			self.assertFalse(getattr(stream_, "closed", False))
+			if isinstance(stream_, io.IOBase):
+				stream_.seek(0)
+			self.assertEqual([line_.rstrip("\r\n") for line_ in processor._iter_logfile()], [line_.rstrip("\n") for line_ in expected_lines])
+			if isinstance(stream_, io.IOBase):
+				stream_.close()
+		processor = CookieLogProcessor.from_stream(data_.splitlines(True), self.args.date, memory_budget="1M")
+		self.assertEqual(processor.get_most_active_cookies(), CookieLogProcessor(Namespace(logfilename=self.args.logfilename, date=self.args.date)).get_most_active_cookies())
+
+		# "-" reads the standard input
+		self.addCleanup(setattr, sys, "stdin", sys.stdin)
+		sys.stdin = io.StringIO(data_)
+		self.assertEqual(CookieLogProcessor(Namespace(logfilename="-", date=self.args.date, top=3)).get_top_cookies(), expected_top_cookies)
+
+		for options_ in [{"index": True}, {"cache": True}]:
+			self.assertRaises(CustomError, CookieLogProcessor.from_stream, [], self.args.date, **options_)
+		self.assertRaises(CustomError, CookieLogProcessor, Namespace(logfilename=["-", self.args.logfilename], date=self.args.date))
+		self.assertRaises(CustomError, CookieLogProcessor.from_stream([], self.args.date).follow_most_active_cookie)
+		self.assertRaises(CustomError, CookieLogServer, Namespace(logfilename="-", serve="http:0"))
+
+	def test_iter_compressed_logfile(self):
+		# Function to test that compressed logfiles are read (decompressed in a background thread) exactly as the uncompressed logfile
+		print("Performing Tests for CookieLogProcessor._iter_logfile() with compressed logfiles")
+		generator = random.Random(31)
+		lines = ["", "cookie,timestamp"]
+		for _ in range(5000):
+			lines.append("{}cookie{},2018-12-{:02d}T{:02d}:00:00+00:00{}".format(generator.choice(["", "", "bad "]), int(generator.paretovariate(1.2)), generator.randint(8, 9), generator.randint(0, 23), generator.choice(["", "", "\r"])))
+		self.args.logfilename, self.args.date, self.args.top = self._write_logfile(lines), ["2018-12-09", "2018-12-08"], 3
+		expected_processor = CookieLogProcessor(self.args)
+		expected_lines = list(expected_processor._iter_logfile())
+		self.addCleanup(setattr, CookieLogDecompressor, "block_size", CookieLogDecompressor.block_size)
+		CookieLogDecompressor.block_size = 4096
+		for suffix_, module_ in [(".gz", gzip), (".bz2", bz2), (".xz", lzma)]:
+			filename_ = self.args.logfilename + suffix_
+			with module_.open(filename_, "wb") as f:
+				f.write(open(self.args.logfilename, "rb").read())
+			self.addCleanup(os.remove, filename_)
+			for options_ in [{}, {"engine": "numpy", "workers": 2, "sorted_log": True}, {"cache": True}]:
+				processor = CookieLogProcessor(Namespace(**{**vars(self.args), "logfilename": filename_}, **options_))
+				self.addCleanup(lambda path_=processor.cache_path: os.path.exists(path_) and os.remove(path_))
+				self.assertEqual(list(processor._iter_logfile()), expected_lines)
+				self.assertEqual(processor.get_top_cookies(), expected_processor.get_top_cookies())
+				self.assertEqual(os.path.exists(processor.cache_path), "cache" in options_)
+			self.assertRaises(CustomError, processor.follow_most_active_cookie)
+			# Byte offsets are not available in a compressed logfile, so it can not be indexed
+			self.assertRaises(CustomError, CookieLogProcessor, Namespace(**{**vars(self.args), "logfilename": filename_}, index=True))
+			self.assertRaises(CustomError, CookieLogProcessor, Namespace(**{**vars(self.args), "logfilename": [self.args.logfilename, filename_]}, index=True))
+			self.assertFalse(os.path.exists(filename_ + ".idx"))
+
+			# Stopping early stops the background thread
+			lines_ = processor._iter_logfile()
+			next(lines_)
+			lines_.close()
+
+		# A corrupted compressed logfile can not be decompressed
+		filename_ = self._write_logfile(["cookie,timestamp"] * 100) + ".gz"
+		open(filename_, "wb").write(gzip.compress(b"cookie,timestamp\n" + "".join(f"cookie{index_},2018-12-09T10:00:00+00:00\n" for index_ in range(100000)).encode())[:5000])
+		self.addCleanup(os.remove, filename_)
+		self.args.logfilename = filename_
+		self.assertRaises(CustomError, CookieLogProcessor(self.args).get_top_cookies)
+
+	def test_carriage_return_logfile(self):
+		# Function to test that a logfile with "\r" line terminators only gives the same result with every engine and option as with "\n" line terminators
+		print("Performing Tests for CookieLogProcessor._get_data_offset() with \"\\r\" line terminators")
+		f = open(os.path.join(os.getcwd(), "test_cookie_log.csv"), "r")
+		lines = ["", " "] + f.read().split("\n")
+		f.close()
+		dates_ = ["2018-12-09", "2018-12-08", "2018-12-07"]
+		self.args.logfilename, self.args.date, self.args.top = self._write_logfile(lines), dates_, 3
+		expected = CookieLogProcessor(self.args).get_top_cookies()
+		self.assertNotEqual(expected, {})
+		filename_ = self._write_logfile(["\r".join(lines)])
+		with open(filename_, "rb") as f:
+			self.assertEqual(CookieLogProcessor(self.args)._get_data_offset(f), len("\r \rcookie,timestamp\r"))
+		self.args.logfilename = filename_
+		options_ = [{"engine": engine_} for engine_ in CookieLogProcessor.engines] + [{"engine": engine_, "pipeline": True} for engine_ in CookieLogProcessor.engines]
+		options_ += [{"workers": 2}, {"workers": 2, "engine": "regex"}, {"index": True}, {"cache": True}, {"sorted_log": True}, {"low_memory": True}, {"approx": True}, {"memory_budget": "1M"}]
+		for option_ in options_:
+			processor = CookieLogProcessor(Namespace(**dict(vars(self.args), **option_)))
+			processor.min_chunk_size, processor.block_size = 64, 100
+			self.addCleanup(lambda path_=processor.index_path: os.path.exists(path_) and os.remove(path_))
+			self.addCleanup(lambda path_=processor.cache_path: os.path.exists(path_) and os.remove(path_))
+			for _ in range(2):
+				self.assertEqual(processor.get_top_cookies(), expected, option_)
+		server_ = CookieLogServer(Namespace(logfilename=filename_, serve="http:0"))
+		server_._load()
+		output_ = io.StringIO()
+		with contextlib.redirect_stdout(output_):
+			CookieLogProcessor(self.args).print_most_active_cookie()
+		self.assertEqual(server_.answer({"date": dates_, "top": 3}), output_.getvalue().splitlines())
+		del self.args.top
+
+	def test_count_with_index(self):
+		# Function to test that queries served from the sidecar index give the same result as a scan, and that the index is rebuilt when the logfile changes
+		print("Performing Tests for CookieLogProcessor._count_with_index()")
+		f = open(os.path.join(os.getcwd(), "test_cookie_log.csv"), "r")
+		lines = f.read().split("\n")
+		f.close()
+		filename_ = self._write_logfile(lines)
+		self.args.logfilename, self.args.date = filename_, ["2018-12-09", "2018-12-08", "2018-12-07", "2018-11-07", "2021-12-07"]
+		expected = CookieLogProcessor(self.args).get_most_active_cookies()
+		self.args.index, self.args.top = True, 2
+		processor = CookieLogProcessor(self.args)
+		self.addCleanup(lambda: os.path.exists(processor.index_path) and os.remove(processor.index_path))
+		self.assertFalse(os.path.exists(processor.index_path))
+		self.assertEqual(processor.get_most_active_cookies(), expected)
+		self.assertTrue(os.path.exists(processor.index_path))
+
+		index = CookieLogIndex(processor.index_path)
+		self.assertTrue(index.load(processor.filepath))
+		# The last line of the logfile has no newline, so it is not indexed
+		self.assertEqual(index.line_count + 1, CookieLogProcessor(self.args)._count_cookies(processor._iter_logfile())[1])
+		self.assertEqual(processor._count_with_index(set())[1], index.line_count + 1)
+		self.assertEqual(list(index.days.keys()), [datetime(2018, 12, day_).date() for day_ in [9, 8, 7]])
+		self.assertEqual(index.get_day_counts(datetime(2018, 12, 9).date()), {"AtY0laUfhglK3lC7": 5, "SAZuXPGUrfbcn5UA": 1, "5UAVanZf6UtGyKVS": 1})
+		start_, end_ = index.days[datetime(2018, 12, 7).date()]["range"]
+		f = open(processor.filepath, "rb")
+		f.seek(start_)
+		self.assertEqual(f.read(end_ - start_), b"4sMM2LxV07bPJzwf,2018-12-07T23:30:00+00:00\n")
+		f.close()
+
+		# Served from the index
+		processor = CookieLogProcessor(self.args)
+		self.assertEqual(processor.get_most_active_cookies(), expected)
+		self.assertEqual(processor.get_top_cookies()[datetime(2018, 12, 9).date()], [("AtY0laUfhglK3lC7", 5), ("SAZuXPGUrfbcn5UA", 1)])
+
+		# Appended lines are added to the index without re-reading the indexed lines, a trailing line without a newline is counted but not indexed
+		offset_ = index.signature["offset"]
+		f = open(processor.filepath, "a")
+		f.write("\nfbcn5UAVanZf6UtG,2018-12-07T01:00:00+00:00\nfbcn5UAVanZf6UtG,2018-12-06T02:00:00+00:00\nfbcn5UAVanZf6UtG,2018-12-07T02:00:00+00:00")
+		f.close()
+		self.assertTrue(CookieLogIndex(processor.index_path).load(processor.filepath))
+		processor = CookieLogProcessor(self.args)
+		count_indexed_range, ranges_ = processor._count_indexed_range, []
+		processor._count_indexed_range = lambda f, start_, end_, *rest_: ranges_.append(start_) or count_indexed_range(f, start_, end_, *rest_)
+		self.args.index = False
+		expected = CookieLogProcessor(self.args).get_most_active_cookies()
+		self.assertEqual(expected[datetime(2018, 12, 7).date()], ["fbcn5UAVanZf6UtG"])
+		self.assertEqual(processor.get_most_active_cookies(), expected)
+		self.assertEqual(ranges_[0], offset_)
+		index = CookieLogIndex(processor.index_path)
+		self.assertTrue(index.load(processor.filepath))
+		self.assertLess(index.signature["offset"], os.path.getsize(processor.filepath))
+		self.assertEqual(list(index.days.keys()), [datetime(2018, 12, day_).date() for day_ in [9, 8, 7, 6]])
+		self.assertEqual(index.get_day_counts(datetime(2018, 12, 7).date()), {"4sMM2LxV07bPJzwf": 1, "fbcn5UAVanZf6UtG": 1})
+		self.assertEqual(index.get_day_counts(datetime(2018, 12, 9).date()), {"AtY0laUfhglK3lC7": 5, "SAZuXPGUrfbcn5UA": 1, "5UAVanZf6UtGyKVS": 1})
+
+		# Rewriting the logfile invalidates the index
+		f = open(processor.filepath, "w")
+		f.write("cookie,timestamp\nSAZuXPGUrfbcn5UA,2018-12-07T01:00:00+00:00\n")
+		f.close()
+		self.assertFalse(CookieLogIndex(processor.index_path).load(processor.filepath))
+		self.args.index = True
+		self.assertEqual(CookieLogProcessor(self.args).get_most_active_cookies()[datetime(2018, 12, 7).date()], ["SAZuXPGUrfbcn5UA"])
+		self.assertTrue(CookieLogIndex(processor.index_path).load(processor.filepath))
+
+	def test_count_with_cache(self):
+		# Function to test that queries served from the columnar binary cache give the same result as a scan, and that the cache is converted again when the logfile changes
+		print("Performing Tests for CookieLogProcessor._count_with_cache()")
+		f = open(os.path.join(os.getcwd(), "test_cookie_log.csv"), "r")
+		lines = f.read().split("\n")
+		f.close()
+		filename_ = self._write_logfile(lines + ["", "bad cookie,2018-12-09T10:00:00+00:00", "fbcn5UAVanZf6UtG,2018-12-09T10:00:00+00:00"])
+		self.args.logfilename, self.args.date = filename_, ["2018-12-09", "2018-12-08", "2018-12-07", "2018-11-07"]
+		expected = CookieLogProcessor(self.args).get_most_active_cookies()
+		self.args.cache = True
+		processor = CookieLogProcessor(self.args)
+		self.addCleanup(lambda path_: os.path.exists(path_) and os.remove(path_), processor.cache_path)
+		self.assertEqual(processor.get_most_active_cookies(), expected)
+		self.assertTrue(os.path.exists(processor.cache_path))
+		self.assertEqual(processor._count_with_cache({datetime(2018, 12, 9).date()}), processor._count_cookies(processor._iter_logfile(), {datetime(2018, 12, 9).date()}))
+		self.assertEqual(CookieLogProcessor(self.args).get_top_cookies(3)[datetime(2018, 12, 8).date()], [("SAZuXPGUrfbcn5UA", 1), ("4sMM2LxV07bPJzwf", 1), ("fbcn5UAVanZf6UtG", 1)])
+
+		f = open(processor.filepath, "a")
+		f.write("\n4sMM2LxV07bPJzwf,2018-12-08T01:00:00+00:00")
+		f.close()
+		self.assertEqual(CookieLogProcessor(self.args).get_most_active_cookies()[datetime(2018, 12, 8).date()], ["4sMM2LxV07bPJzwf"])
+
+		filename_ = self._write_logfile(["cookie,timestamp", ""])
+		self.args.logfilename = filename_
+		processor = CookieLogProcessor(self.args)
+		self.addCleanup(os.remove, processor.cache_path)
+		self.assertIsNone(processor._get_cookie_map(processor.query_dates))
+
+	def test_poll_followed_logfile(self):
+		# Function to test that following the logfile counts only complete appended lines, also across rotation and truncation
+		print("Performing Tests for CookieLogProcessor._poll_followed_logfile()")
+		filename_ = self._write_logfile(["", "cookie,timestamp", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00", "SAZuXPGUrfbcn5UA,2018-12-09T10:13:00+00:00", ""])
+		self.args.logfilename, self.args.date = filename_, ["2018-12-09", "2018-12-08"]
+		processor = CookieLogProcessor(self.args)
+		date_, cookie_map = datetime(2018, 12, 9).date(), {}
+		processor._open_followed_logfile()
+		self.addCleanup(lambda: processor.follow_file.close())
+		self.assertEqual(processor._poll_followed_logfile(cookie_map), {date_})
+		self.assertEqual(cookie_map, {date_: {"AtY0laUfhglK3lC7": 1, "SAZuXPGUrfbcn5UA": 1}})
+
+		# A line which is still being written is counted once it is complete
+		f = open(processor.filepath, "a")
+		f.write("SAZuXPGUrfbcn5UA,2018-12-09T1")
+		f.flush()
+		self.assertEqual(processor._poll_followed_logfile(cookie_map), set())
+		f.write("1:00:00+00:00\nAtY0laUfhglK3lC7 ,2018-12-08T10:00:00+00:00\nbad cookie,2018-12-09T10:00:00+00:00\n")
+		f.close()
+		self.assertEqual(processor._poll_followed_logfile(cookie_map), {date_, datetime(2018, 12, 8).date()})
+		self.assertEqual(cookie_map[date_], {"AtY0laUfhglK3lC7": 1, "SAZuXPGUrfbcn5UA": 2})
+
+		# Rotation: the rest of the old file (including a last line without a newline) is read before the new file
+		f = open(processor.filepath, "a")
+		f.write("fbcn5UAVanZf6UtG,2018-12-09T09:00:00+00:00")
+		f.close()
+		os.rename(processor.filepath, processor.filepath + ".1")
+		self.addCleanup(os.remove, processor.filepath + ".1")
+		self.assertEqual(processor._poll_followed_logfile(cookie_map), set())
+		f = open(processor.filepath, "w")
+		f.write("cookie,timestamp\nfbcn5UAVanZf6UtG,2018-12-09T08:00:00+00:00\n")
+		f.close()
+		self.assertEqual(processor._poll_followed_logfile(cookie_map), {date_})
+		self.assertEqual(cookie_map[date_], {"AtY0laUfhglK3lC7": 1, "SAZuXPGUrfbcn5UA": 2, "fbcn5UAVanZf6UtG": 2})
+
+		# Truncation in place: the logfile is read again from its beginning
+		f = open(processor.filepath, "w")
+		f.write("cookie,timestamp\n")
+		f.close()
+		self.assertEqual(processor._poll_followed_logfile(cookie_map), set())
+		f = open(processor.filepath, "a")
+		f.write("5UAVanZf6UtGyKVS,2018-12-09T07:00:00+00:00\n")
+		f.close()
+		self.assertEqual(processor._poll_followed_logfile(cookie_map), {date_})
+		self.assertEqual(cookie_map[date_]["5UAVanZf6UtGyKVS"], 1)
+
+		# Lines terminated by "\r" are complete once the next byte is appended, as it might have been the "\n" of a "\r\n"
+		self.args.logfilename = self._write_logfile(["cookie,timestamp\rAtY0laUfhglK3lC7,2018-12-09T06:00:00+00:00\r"])
+		processor, cookie_map = CookieLogProcessor(self.args), {}
+		processor._open_followed_logfile()
+		self.addCleanup(lambda: processor.follow_file.close())
+		self.assertEqual(processor._poll_followed_logfile(cookie_map), set())
+		f = open(processor.filepath, "a", newline="")
+		f.write("SAZuXPGUrfbcn5UA,2018-12-09T05:00:00+00:00\rfbcn5UAVanZf6UtG,2018-12-08T05:00:00+00:00\r")
+		f.close()
+		self.assertEqual(processor._poll_followed_logfile(cookie_map), {date_})
+		self.assertEqual(cookie_map, {date_: {"AtY0laUfhglK3lC7": 1, "SAZuXPGUrfbcn5UA": 1}})
+
+	def test_follow_most_active_cookie(self):
+		# Function to test that the most active cookies are printed only when they change, unless an interval is set
+		print("Performing Tests for CookieLogProcessor.follow_most_active_cookie()")
+		filename_ = self._write_logfile(["cookie,timestamp", "AtY0laUfhglK3lC7,2018-12-09T14:19:00+00:00", "SAZuXPGUrfbcn5UA,2018-12-09T10:13:00+00:00", ""])
+		self.args.logfilename, self.args.date = filename_, "2018-12-09"
+		processor = CookieLogProcessor(self.args)
+		output_ = io.StringIO()
+		with contextlib.redirect_stdout(output_):
+			processor.follow_most_active_cookie(max_polls=3, poll_interval=0)
+		self.assertEqual(output_.getvalue(), "AtY0laUfhglK3lC7\nSAZuXPGUrfbcn5UA\n")
+
+		self.args.interval, self.args.top = 1, 1
+		processor = CookieLogProcessor(self.args)
+		processor.follow_interval = 0
+		output_ = io.StringIO()
+		with contextlib.redirect_stdout(output_):
+			processor.follow_most_active_cookie(max_polls=2, poll_interval=0)
+		self.assertEqual(output_.getvalue(), "AtY0laUfhglK3lC7,1\n\nAtY0laUfhglK3lC7,1\n")
+
+		self.args.interval = 0
+		with self.assertRaises(CustomError):
+			CookieLogProcessor(self.args)
+
+	def _write_logfile(self, lines):
+		# Function to write a temporary cookie logfile in the current working directory, which is removed after the test
+		file_descriptor, filepath = tempfile.mkstemp(suffix=".csv", dir=os.getcwd())
+		with os.fdopen(file_descriptor, "w") as f:
+			f.write("\n".join(lines))
+		self.addCleanup(os.remove, filepath)
+		return os.path.basename(filepath)
+
 
 
 if __name__ == "__main__":